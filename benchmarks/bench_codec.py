@@ -0,0 +1,62 @@
+"""
+Encode and decode cost of the available JSON codecs over large responses.
+
+    python -m benchmarks.bench_codec [--repeat N] [RECORDED_FRAME ...]
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+from benchmarks.payloads import PAYLOADS
+from xtb.codec import available_codecs, get_codec
+
+
+def best_of(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def load_frames(paths) -> Dict[str, bytes]:
+    if paths:
+        return {
+            Path(p).name: Path(p).read_bytes().rstrip(b'\n') for p in paths
+        }
+    return {
+        name: json.dumps(factory()).encode('utf-8')
+        for name, factory in PAYLOADS.items()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('frames', nargs='*')
+    args = parser.parse_args()
+
+    codecs = available_codecs()
+    print(f'codecs: {", ".join(codecs)}')
+    for name, frame in load_frames(args.frames).items():
+        print(f'-- {name}: {len(frame) / 1e6:.2f} MB')
+        baseline = None
+        for codec_name in reversed(codecs):
+            codec = get_codec(codec_name)
+            decoded = codec.decode(frame)
+            decode = best_of(lambda: codec.decode(frame), args.repeat)
+            encode = best_of(lambda: codec.encode(decoded), args.repeat)
+            baseline = baseline or decode
+            print(
+                f'{codec_name:<8} decode {decode * 1000:8.2f} ms '
+                f'({len(frame) / decode / 1e6:7.1f} MB/s, '
+                f'x{baseline / decode:4.1f})  '
+                f'encode {encode * 1000:8.2f} ms'
+            )
+
+
+if __name__ == '__main__':
+    main()
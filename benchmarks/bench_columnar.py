@@ -0,0 +1,40 @@
+"""
+Time and memory needed to turn a decoded chart response into records
+versus NumPy columns.
+
+    python -m benchmarks.bench_columnar [--candles N]
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.payloads import chart_range
+from xtb import records
+from xtb.columnar import ChartColumns
+
+
+def measure(name: str, build, return_data) -> None:
+    started = time.perf_counter()
+    build(return_data)
+    elapsed = time.perf_counter() - started
+    # Tracing slows the build down, so memory is measured in a second run
+    tracemalloc.start()
+    build(return_data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{name:<14} {elapsed * 1000:9.1f} ms  peak {peak / 1e6:8.1f} MB')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--candles', type=int, default=100_000)
+    args = parser.parse_args()
+
+    return_data = chart_range(args.candles)['returnData']
+    print(f'-- {args.candles} candles')
+    measure('ChartResponse', records.ChartResponse.from_dict, return_data)
+    measure('ChartColumns', ChartColumns.from_dict, return_data)
+
+
+if __name__ == '__main__':
+    main()
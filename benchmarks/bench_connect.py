@@ -0,0 +1,55 @@
+"""
+Cold and warm connect latency of SyncConnector against the local mock
+xAPI TLS server.
+Cold connects resolve the host and run a full TLS handshake, warm
+connects reuse the cached addresses and resume the TLS session.
+
+    python -m benchmarks.bench_connect [--runs N] [--latency S]
+"""
+import argparse
+import time
+from typing import List
+
+from benchmarks.bench_suite import summarize
+from benchmarks.mock_server import MockXtbServer, client_context
+from xtb.connector import ConnectCache, SyncConnector
+from xtb.ratelimit import NoRateLimiter
+
+
+def connect_times(port: int, runs: int, warm: bool) -> List[float]:
+    context = client_context()
+    cache = ConnectCache()
+    timings = []
+    for _ in range(runs):
+        if not warm:
+            context = client_context()
+            cache = ConnectCache()
+        connector = SyncConnector(
+            rate_limiter=NoRateLimiter(), ssl_context=context,
+            connect_cache=cache
+        )
+        started = time.perf_counter()
+        connector.connect('localhost', port)
+        connector.handle_command(command='ping')
+        timings.append(time.perf_counter() - started)
+        connector.close()
+    # The first warm connect fills the caches
+    return timings[1:] if warm else timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.0)
+    args = parser.parse_args()
+
+    with MockXtbServer(latency=args.latency) as server:
+        for name, warm in (('cold', False), ('warm', True)):
+            result = summarize(connect_times(server.port, args.runs, warm))
+            print(f'{name:<6} p50 {result["p50_ms"]:8.3f} ms  '
+                  f'p95 {result["p95_ms"]:8.3f} ms  '
+                  f'mean {result["mean_ms"]:8.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
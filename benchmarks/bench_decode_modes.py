@@ -0,0 +1,52 @@
+"""
+Cost of turning decoded responses into records in every DecodeMode.
+
+    python -m benchmarks.bench_decode_modes [--repeat N]
+"""
+import argparse
+import time
+
+from benchmarks.payloads import all_symbols, chart_range, trades_history
+from xtb import records
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    cases = [
+        ('getAllSymbols', all_symbols(5000)['returnData'],
+         lambda data, mode: records.Symbol.create_collection_from(
+             data, mode=mode
+         )),
+        ('getChartRangeRequest', chart_range(20000)['returnData'],
+         records.ChartResponse.from_dict),
+        ('getTradesHistory', trades_history(5000)['returnData'],
+         lambda data, mode: records.Trade.create_collection_from(
+             data, mode=mode
+         )),
+    ]
+    for name, data, build in cases:
+        print(f'-- {name}')
+        baseline = None
+        for mode in records.DecodeMode:
+            elapsed = best_of(lambda: build(data, mode), args.repeat)
+            baseline = baseline or elapsed
+            print(
+                f'{mode.value:<9} {elapsed * 1000:9.2f} ms '
+                f'(x{baseline / elapsed:7.1f})'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Time to first result and peak memory of eager versus lazy collections
+for a getAllSymbols sized response.
+
+    python -m benchmarks.bench_lazy [--symbols N]
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.payloads import all_symbols
+from xtb import records
+
+
+def first_symbol(raw, lazy: bool) -> str:
+    symbols = records.Symbol.create_collection_from(raw, lazy=lazy)
+    return symbols[0].symbol
+
+
+def lookup(raw, lazy: bool) -> str:
+    name = raw[len(raw) // 2]['symbol']
+    symbols = records.Symbol.create_collection_from(
+        raw, lazy=lazy, key='symbol'
+    )
+    if lazy:
+        return symbols.get(name).symbol
+    return next(s for s in symbols if s.symbol == name).symbol
+
+
+def measure(name: str, func, raw, lazy: bool) -> None:
+    started = time.perf_counter()
+    func(raw, lazy)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    func(raw, lazy)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{name:<22} {elapsed * 1000:9.2f} ms  peak {peak / 1e6:7.2f} MB')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--symbols', type=int, default=5000)
+    args = parser.parse_args()
+
+    raw = all_symbols(args.symbols)['returnData']
+    print(f'-- {args.symbols} symbols')
+    for lazy in (False, True):
+        mode = 'lazy' if lazy else 'eager'
+        measure(f'{mode} first item', first_symbol, raw, lazy)
+        measure(f'{mode} lookup by symbol', lookup, raw, lazy)
+
+
+if __name__ == '__main__':
+    main()
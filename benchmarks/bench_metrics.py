@@ -0,0 +1,55 @@
+"""
+Per command overhead of the metrics instrumentation of SyncConnector,
+measured against an in-memory socket.
+
+    python -m benchmarks.bench_metrics [--commands N]
+"""
+import argparse
+import time
+
+from xtb.connector import SyncConnector
+from xtb.metrics import Metrics
+from xtb.ratelimit import NoRateLimiter
+
+RESPONSE = b'{"status":true,"returnData":{"time":1392211379731}}\n\n'
+
+
+class LoopbackSocket:
+    """
+    Answers every packet with the same response
+    """
+
+    def sendall(self, data: bytes) -> None:
+        pass
+
+    def recv_into(self, buffer) -> int:
+        buffer[:len(RESPONSE)] = RESPONSE
+        return len(RESPONSE)
+
+
+def run(commands: int, metrics) -> float:
+    connector = SyncConnector(rate_limiter=NoRateLimiter(), metrics=metrics)
+    connector._socket = LoopbackSocket()
+    started = time.perf_counter()
+    for _ in range(commands):
+        connector.handle_command(command='getServerTime')
+    return (time.perf_counter() - started) / commands
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--commands', type=int, default=100_000)
+    args = parser.parse_args()
+
+    disabled = run(args.commands, None)
+    enabled = run(args.commands, Metrics())
+    hooked = run(args.commands, Metrics(hooks=[lambda span: None]))
+    print(f'{"disabled":<16} {disabled * 1e6:8.2f} us/command')
+    print(f'{"enabled":<16} {enabled * 1e6:8.2f} us/command  '
+          f'+{(enabled - disabled) * 1e6:.2f} us')
+    print(f'{"enabled + hook":<16} {hooked * 1e6:8.2f} us/command  '
+          f'+{(hooked - disabled) * 1e6:.2f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Per-call latency of SyncConnector.handle_command with the old fixed sleep
+versus the rate limiter.
+
+    python -m benchmarks.bench_ratelimit
+"""
+import statistics
+import time
+from typing import Callable, List
+
+from xtb.connector import SyncConnector
+from xtb.ratelimit import (
+    IntervalRateLimiter, NoRateLimiter, TokenBucketRateLimiter
+)
+
+RESPONSE = b'{"status": true, "returnData": {"version": "2.5.0"}}\n\n'
+
+
+class FakeSocket:
+    """
+    Answers every packet with a canned response after `latency` seconds
+    """
+
+    def __init__(self, latency: float) -> None:
+        self._latency = latency
+
+    def sendall(self, data: bytes) -> None:
+        pass
+
+    def recv_into(self, buffer) -> int:
+        time.sleep(self._latency)
+        buffer[:len(RESPONSE)] = RESPONSE
+        return len(RESPONSE)
+
+
+class FixedSleepConnector(SyncConnector):
+    """
+    The previous behaviour: sleep after every send, unconditionally
+    """
+
+    def _send_packet(self, data):
+        super()._send_packet(data)
+        time.sleep(self.REQUEST_INTERVAL)
+
+
+def measure(
+        connector: SyncConnector,
+        calls: int,
+        think_time: float
+) -> List[float]:
+    latencies = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        connector.handle_command(command='getVersion')
+        latencies.append(time.perf_counter() - started)
+        time.sleep(think_time)
+    return latencies
+
+
+def report(name: str, latencies: List[float]) -> None:
+    print(
+        f'{name:<28} mean {statistics.mean(latencies) * 1000:7.1f} ms  '
+        f'max {max(latencies) * 1000:7.1f} ms  '
+        f'total {sum(latencies):6.2f} s'
+    )
+
+
+def run(
+        name: str,
+        factory: Callable[[], SyncConnector],
+        calls: int,
+        latency: float,
+        think_time: float
+) -> None:
+    connector = factory()
+    connector._socket = FakeSocket(latency)
+    report(name, measure(connector, calls, think_time))
+
+
+def main() -> None:
+    calls = 10
+    latency = 0.05
+    scenarios = [
+        ('isolated calls', 0.25),
+        ('burst', 0.0),
+    ]
+    for scenario, think_time in scenarios:
+        print(
+            f'-- {scenario}: {calls} calls, '
+            f'server latency {latency * 1000:.0f} ms, '
+            f'think time {think_time * 1000:.0f} ms'
+        )
+        run('fixed sleep (before)',
+            lambda: FixedSleepConnector(rate_limiter=NoRateLimiter()),
+            calls, latency, think_time)
+        run('interval limiter',
+            lambda: SyncConnector(rate_limiter=IntervalRateLimiter(0.2)),
+            calls, latency, think_time)
+        run('token bucket (5/s, burst 5)',
+            lambda: SyncConnector(rate_limiter=TokenBucketRateLimiter(5, 5)),
+            calls, latency, think_time)
+
+
+if __name__ == '__main__':
+    main()
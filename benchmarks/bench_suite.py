@@ -0,0 +1,173 @@
+"""
+End to end benchmarks of XtbApi against the local mock xAPI server:
+connect + login time, request latency and throughput, and the cost of
+the large responses in every decode mode.
+The results can be written as JSON and compared with an earlier run.
+
+    python -m benchmarks.bench_suite [--latency S] [--json OUT]
+                                     [--compare BASELINE]
+"""
+import argparse
+import functools
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.mock_server import (
+    MockXtbServer, build_responses, client_context
+)
+from xtb import XtbApi, records
+from xtb.connector import SyncConnector
+from xtb.ratelimit import NoRateLimiter
+
+Result = Dict[str, Any]
+
+
+def summarize(timings: List[float]) -> Result:
+    timings = sorted(timings)
+    return {
+        'runs': len(timings),
+        'mean_ms': statistics.mean(timings) * 1000,
+        'p50_ms': timings[len(timings) // 2] * 1000,
+        'p95_ms': timings[min(len(timings) - 1,
+                              int(len(timings) * 0.95))] * 1000,
+        'min_ms': timings[0] * 1000,
+    }
+
+
+def timed(func: Callable[[], Any], runs: int) -> List[float]:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def make_api(port: int, **kwargs) -> XtbApi:
+    connector = functools.partial(
+        SyncConnector, ssl_context=client_context()
+    )
+    return XtbApi(
+        '127.0.0.1', port, connector=connector,
+        rate_limiter=NoRateLimiter(), **kwargs
+    )
+
+
+def bench_connect(port: int, runs: int) -> Result:
+    def connect_and_login() -> None:
+        api = make_api(port)
+        api.connect()
+        api.login('user', 'password')
+        api.close()
+
+    return summarize(timed(connect_and_login, runs))
+
+
+def bench_latency(api: XtbApi, runs: int) -> Result:
+    return summarize(timed(api.get_server_time, runs))
+
+
+def bench_throughput(api: XtbApi, seconds: float) -> Result:
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        api.ping()
+        count += 1
+    elapsed = time.perf_counter() - started
+    return {'requests': count, 'requests_per_second': count / elapsed}
+
+
+def bench_payloads(port: int, runs: int) -> Dict[str, Result]:
+    calls: Dict[str, Callable[[XtbApi], Any]] = {
+        'getAllSymbols': lambda api: api.get_all_symbols(),
+        'getChartRangeRequest': lambda api: api.get_chart_range_request(
+            end=0, period=1, start=0, symbol='EURUSD', ticks=0
+        ),
+        'getTradesHistory': lambda api: api.get_trades_history(
+            end=0, start=0
+        ),
+    }
+    results = {}
+    for mode in records.DecodeMode:
+        api = make_api(port, decode_mode=mode)
+        api.connect()
+        try:
+            for name, call in calls.items():
+                results[f'{name}/{mode.value}'] = summarize(
+                    timed(lambda: call(api), runs)
+                )
+        finally:
+            api.close()
+    return results
+
+
+def run_suite(args: argparse.Namespace) -> Result:
+    responses = build_responses(args.symbols, args.candles, args.trades)
+    with MockXtbServer(latency=args.latency, responses=responses) as server:
+        results: Dict[str, Result] = {
+            'connect_login': bench_connect(server.port, args.runs)
+        }
+        api = make_api(server.port)
+        api.connect()
+        try:
+            api.login('user', 'password')
+            results['latency_getServerTime'] = bench_latency(api, args.runs)
+            results['throughput_ping'] = bench_throughput(api, args.seconds)
+        finally:
+            api.close()
+        for name, result in bench_payloads(server.port, args.runs).items():
+            results[f'payload_{name}'] = result
+    return {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'config': {
+            'latency': args.latency, 'symbols': args.symbols,
+            'candles': args.candles, 'trades': args.trades,
+            'runs': args.runs,
+        },
+        'results': results,
+    }
+
+
+def print_report(report: Result, baseline: Dict[str, Result]) -> None:
+    for name, result in report['results'].items():
+        value_key = 'requests_per_second' if 'requests_per_second' in \
+            result else 'p50_ms'
+        value = result[value_key]
+        line = f'{name:<44} {value:12.3f} {value_key}'
+        previous = baseline.get(name, {}).get(value_key)
+        if previous:
+            line += f'  ({value / previous:6.2f}x baseline)'
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--seconds', type=float, default=2.0)
+    parser.add_argument('--symbols', type=int, default=5000)
+    parser.add_argument('--candles', type=int, default=50000)
+    parser.add_argument('--trades', type=int, default=10000)
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--compare', help='results of an earlier run')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    report = run_suite(args)
+    print_report(report, baseline)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
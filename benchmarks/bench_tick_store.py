@@ -0,0 +1,80 @@
+"""
+Write throughput, file size and read speed of the binary tick recorder
+versus JSON lines of Tick records.
+
+    python -m benchmarks.bench_tick_store [--ticks N]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.payloads import ticks as tick_payloads
+from xtb import records
+from xtb.tick_store import TickReader, TickRecorder
+
+
+def report(name: str, elapsed: float, count: int, size: int = 0) -> None:
+    rate = count / elapsed if elapsed else 0.0
+    size_text = f'  {size / 1e6:7.2f} MB' if size else ''
+    print(f'{name:<26} {elapsed * 1000:9.2f} ms  {rate:12,.0f} ticks/s'
+          f'{size_text}')
+
+
+def bench_json_lines(path: str, ticks) -> None:
+    started = time.perf_counter()
+    with open(path, 'w', encoding='utf-8') as f:
+        for tick in ticks:
+            f.write(tick.json(by_alias=True))
+            f.write('\n')
+    report('json lines write', time.perf_counter() - started, len(ticks),
+           os.path.getsize(path))
+    started = time.perf_counter()
+    with open(path, encoding='utf-8') as f:
+        count = sum(
+            1 for line in f if records.Tick.from_dict(json.loads(line))
+        )
+    report('json lines read', time.perf_counter() - started, count)
+
+
+def bench_recorder(path: str, ticks, compression) -> None:
+    name = compression or 'raw'
+    started = time.perf_counter()
+    with TickRecorder(path, compression=compression) as recorder:
+        recorder.record_many(ticks)
+        enqueued = time.perf_counter() - started
+    report(f'recorder {name} record()', enqueued, len(ticks))
+    report(f'recorder {name} write', time.perf_counter() - started,
+           len(ticks), os.path.getsize(path))
+    with TickReader(path) as reader:
+        started = time.perf_counter()
+        count = sum(1 for _ in reader.ticks())
+        report(f'reader {name} ticks', time.perf_counter() - started, count)
+        try:
+            started = time.perf_counter()
+            count = sum(len(b['timestamp']) for b in reader.blocks())
+            report(f'reader {name} blocks', time.perf_counter() - started,
+                   count)
+        except ImportError:
+            pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ticks', type=int, default=100_000)
+    args = parser.parse_args()
+
+    ticks = [records.Tick.from_dict(t) for t in tick_payloads(args.ticks)]
+    print(f'-- {args.ticks} ticks')
+    with tempfile.TemporaryDirectory() as directory:
+        bench_json_lines(os.path.join(directory, 'ticks.jsonl'), ticks)
+        for compression in (None, 'zlib'):
+            bench_recorder(
+                os.path.join(directory, f'ticks-{compression}.bin'),
+                ticks, compression
+            )
+
+
+if __name__ == '__main__':
+    main()
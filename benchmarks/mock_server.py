@@ -0,0 +1,237 @@
+"""
+Local mock of the xAPI request server for benchmarks.
+It speaks the xAPI framing over TLS with the self-signed certificate in
+mock_cert.pem (CN=localhost, valid for 127.0.0.1), answers with the
+generated payloads of benchmarks.payloads and can add a fixed latency
+to every response.
+
+    python -m benchmarks.mock_server [--port 5124] [--latency 0.02]
+"""
+import argparse
+import codecs
+import json
+import os
+import socket
+import socketserver
+import ssl
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks import payloads
+
+CERT_FILE = os.path.join(os.path.dirname(__file__), 'mock_cert.pem')
+END_TOKEN = b'\n\n'
+
+
+def build_responses(
+        symbols: int = 5000,
+        candles: int = 50000,
+        trades: int = 10000
+) -> Dict[str, bytes]:
+    """
+    Encodes the response of every supported command once up front,
+    so the server cost does not depend on the payload size
+    """
+    all_symbols = payloads.all_symbols(symbols)
+    tick = payloads.ticks(1)[0]
+    responses: Dict[str, Any] = {
+        'login': {'status': True, 'streamSessionId': 'mock-session'},
+        'logout': {'status': True},
+        'ping': {'status': True},
+        'getVersion': {'status': True, 'returnData': {'version': '2.5.0'}},
+        'getServerTime': {
+            'status': True,
+            'returnData': {
+                'time': payloads.START_MS,
+                'timeString': 'Jan 1, 2022 00:00:00 AM'
+            }
+        },
+        'getAllSymbols': all_symbols,
+        'getSymbol': {
+            'status': True, 'returnData': all_symbols['returnData'][0]
+        },
+        'getChartRangeRequest': payloads.chart_range(candles),
+        'getChartLastRequest': payloads.chart_range(candles),
+        'getTradesHistory': payloads.trades_history(trades),
+        'getTrades': payloads.trades_history(min(trades, 100)),
+        'getTickPrices': {
+            'status': True, 'returnData': {'quotations': [tick]}
+        },
+        'tradeTransaction': {'status': True, 'returnData': {'order': 101}},
+        'tradeTransactionStatus': {
+            'status': True,
+            'returnData': {
+                'ask': 1.1, 'bid': 1.0, 'customComment': None,
+                'message': None, 'order': 101, 'requestStatus': 3
+            }
+        },
+    }
+    return {
+        command: json.dumps(response, separators=(',', ':')).encode()
+        for command, response in responses.items()
+    }
+
+
+UNKNOWN_COMMAND = json.dumps({
+    'status': False, 'errorCode': 'EX007',
+    'errorDescr': 'Unknown command in the mock server'
+}).encode()
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    server: 'MockXtbServer'
+
+    def setup(self) -> None:
+        # The handshake runs on the connection thread, not the acceptor
+        if self.server.context is not None:
+            self.request = self.server.context.wrap_socket(
+                self.request, server_side=True
+            )
+
+    def handle(self) -> None:
+        decoder = json.JSONDecoder()
+        text = codecs.getincrementaldecoder('utf-8')()
+        buffer = ''
+        while True:
+            try:
+                data = self.request.recv(65536)
+            except (OSError, ssl.SSLError):
+                return
+            if not data:
+                return
+            buffer += text.decode(data)
+            while buffer:
+                try:
+                    request, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    break
+                buffer = buffer[end:].lstrip()
+                if not self._respond(request):
+                    return
+
+    def _respond(self, request: Dict[str, Any]) -> bool:
+        server = self.server
+        if server.requests is not None:
+            server.requests.append(request)
+        response = server.responses.get(request.get('command'))
+        if response is None:
+            response = UNKNOWN_COMMAND
+        tag = request.get('customTag')
+        if tag is not None:
+            response = response[:-1] + (
+                b',"customTag":' + json.dumps(tag).encode() + b'}'
+            )
+        if server.latency:
+            time.sleep(server.latency)
+        try:
+            self.request.sendall(response + END_TOKEN)
+        except OSError:
+            return False
+        server.served += 1
+        return True
+
+
+class MockXtbServer(socketserver.ThreadingTCPServer):
+    """
+    Threaded mock server, one thread per connection.
+    Use it as a context manager or call start() and stop().
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+            self,
+            host: str = '127.0.0.1',
+            port: int = 0,
+            *,
+            latency: float = 0.0,
+            responses: Optional[Dict[str, bytes]] = None,
+            certfile: Optional[str] = CERT_FILE,
+            record: bool = False
+    ) -> None:
+        """
+        latency is added to every response in seconds.
+        certfile is None for plain TCP.
+        record keeps the decoded requests in requests.
+        """
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.responses = responses if responses is not None \
+            else build_responses()
+        self.served = 0
+        self.requests: Optional[List[Dict[str, Any]]] = [] if record \
+            else None
+        self.context: Optional[ssl.SSLContext] = None
+        if certfile is not None:
+            self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            self.context.load_cert_chain(certfile)
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'MockXtbServer':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def get_request(self):
+        sock, address = super().get_request()
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock, address
+
+    def handle_error(self, request, client_address) -> None:
+        # Handshake failures and dropped clients are expected
+        pass
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self.serve_forever, name='mock-xapi', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def client_context(certfile: str = CERT_FILE) -> ssl.SSLContext:
+    """
+    Returns a client SSLContext trusting the mock server certificate
+    """
+    return ssl.create_default_context(cafile=certfile)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5124)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--symbols', type=int, default=5000)
+    parser.add_argument('--candles', type=int, default=50000)
+    parser.add_argument('--trades', type=int, default=10000)
+    parser.add_argument('--no-tls', action='store_true')
+    args = parser.parse_args()
+
+    server = MockXtbServer(
+        args.host, args.port, latency=args.latency,
+        responses=build_responses(args.symbols, args.candles, args.trades),
+        certfile=None if args.no_tls else CERT_FILE
+    )
+    print(f'mock xAPI server on {args.host}:{server.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Response payloads shaped like the ones recorded from the xAPI demo server.
+The generators are deterministic so the numbers are comparable between
+runs. A real recording (a file with one raw response frame) can be used
+instead by passing its path to the benchmarks.
+"""
+import random
+from typing import Any, Callable, Dict, List
+
+START_MS = 1_640_995_200_000
+CURRENCIES = ['EUR', 'USD', 'PLN', 'GBP', 'CHF', 'JPY', 'AUD', 'CAD']
+
+
+def symbol_record(idx: int, rnd: random.Random) -> Dict[str, Any]:
+    base, quote = rnd.sample(CURRENCIES, 2)
+    bid = round(rnd.uniform(0.5, 150), 5)
+    time_ms = START_MS + idx * 1000
+    return {
+        'ask': round(bid + 0.0002, 5), 'bid': bid,
+        'categoryName': 'FX', 'contractSize': 100000, 'currency': base,
+        'currencyPair': True, 'currencyProfit': quote,
+        'description': f'{base} to {quote} #{idx}', 'expiration': None,
+        'groupName': 'Major', 'high': round(bid * 1.01, 5), 'initialMargin': 0,
+        'instantMaxVolume': 0, 'leverage': 3.33, 'longOnly': False,
+        'lotMax': 10000.0, 'lotMin': 0.01, 'lotStep': 0.01,
+        'low': round(bid * 0.99, 5), 'marginHedged': 0,
+        'marginHedgedStrong': False, 'marginMaintenance': 0, 'marginMode': 101,
+        'percentage': 100.0, 'pipsPrecision': 4, 'precision': 5,
+        'profitMode': 5, 'quoteId': 10, 'shortSelling': True,
+        'spreadRaw': 0.00016, 'spreadTable': 1.6, 'starting': None,
+        'stepRuleId': 1, 'stopsLevel': 0, 'swap_rollover3days': 0,
+        'swapEnable': True, 'swapLong': -4.56, 'swapShort': 0.98,
+        'swapType': 0, 'symbol': f'{base}{quote}{idx}', 'tickSize': 0.00001,
+        'tickValue': 1.0, 'time': time_ms,
+        'timeString': 'Thu Jan 06 10:00:00 CET 2022',
+        'trailingEnabled': True, 'type': 21
+    }
+
+
+def all_symbols(count: int = 5000, seed: int = 1) -> Dict[str, Any]:
+    rnd = random.Random(seed)
+    return {
+        'status': True,
+        'returnData': [symbol_record(i, rnd) for i in range(count)]
+    }
+
+
+def rate_info(idx: int, rnd: random.Random, period: int) -> Dict[str, Any]:
+    open_ = rnd.randint(100000, 120000)
+    return {
+        'ctm': START_MS + idx * period * 60_000,
+        'ctmString': 'Jan 10, 2022 12:00:00 AM',
+        'open': float(open_),
+        'close': float(rnd.randint(-20, 20)),
+        'high': float(rnd.randint(0, 30)),
+        'low': float(rnd.randint(-30, 0)),
+        'vol': float(rnd.randint(0, 500))
+    }
+
+
+def chart_range(count: int = 50000, seed: int = 2) -> Dict[str, Any]:
+    rnd = random.Random(seed)
+    return {
+        'status': True,
+        'returnData': {
+            'digits': 5, 'exemode': 1,
+            'rateInfos': [rate_info(i, rnd, 1) for i in range(count)]
+        }
+    }
+
+
+def trade_record(idx: int, rnd: random.Random) -> Dict[str, Any]:
+    open_time = START_MS + idx * 60_000
+    return {
+        'close_price': round(rnd.uniform(1, 2), 5),
+        'close_time': open_time + 3_600_000,
+        'close_timeString': 'Fri Dec 10 12:00:00 CET 2021',
+        'closed': True, 'cmd': rnd.choice([0, 1]), 'comment': 'Web Trader',
+        'commission': 0.0, 'customComment': 'strategy-1', 'digits': 5,
+        'expiration': None, 'expirationString': None, 'margin_rate': 0.0,
+        'offset': 0, 'open_price': round(rnd.uniform(1, 2), 5),
+        'open_time': open_time,
+        'open_timeString': 'Fri Dec 10 11:00:00 CET 2021',
+        'order': 76_000_000 + idx, 'order2': 76_500_000 + idx,
+        'position': 76_000_000 + idx, 'profit': round(rnd.uniform(-50, 50), 2),
+        'sl': 0.0, 'storage': -0.5, 'symbol': 'EURUSD',
+        'timestamp': open_time + 3_600_500, 'tp': 0.0,
+        'volume': rnd.choice([0.01, 0.1, 1.0])
+    }
+
+
+def trades_history(count: int = 10000, seed: int = 3) -> Dict[str, Any]:
+    rnd = random.Random(seed)
+    return {
+        'status': True,
+        'returnData': [trade_record(i, rnd) for i in range(count)]
+    }
+
+
+def tick_record(idx: int, rnd: random.Random) -> Dict[str, Any]:
+    bid = round(rnd.uniform(1.05, 1.15), 5)
+    return {
+        'ask': round(bid + 0.0002, 5), 'askVolume': rnd.randint(1, 5) * 500000,
+        'bid': bid, 'bidVolume': rnd.randint(1, 5) * 500000.0,
+        'high': 1.2, 'level': 0, 'low': 1.0, 'quoteId': 1,
+        'spreadRaw': 0.0002, 'spreadTable': 2.0,
+        'symbol': rnd.choice(['EURUSD', 'GBPUSD', 'USDJPY', 'US500']),
+        'timestamp': START_MS + idx * 250
+    }
+
+
+def ticks(count: int = 100_000, seed: int = 1) -> List[Dict[str, Any]]:
+    rnd = random.Random(seed)
+    return [tick_record(idx, rnd) for idx in range(count)]
+
+PAYLOADS: Dict[str, Callable[[], Dict[str, Any]]] = {
+    'getAllSymbols': all_symbols,
+    'getChartRangeRequest': chart_range,
+    'getTradesHistory': trades_history,
+}
+
+
+def payload_names() -> List[str]:
+    return list(PAYLOADS)
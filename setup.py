@@ -4,5 +4,5 @@ from setuptools import find_packages, setup
 setup(
     name='xtb-api',
     version='0.0.1',
-    packages=find_packages(exclude=['test'])
+    packages=find_packages(exclude=['test', 'benchmarks'])
 )
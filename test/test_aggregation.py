@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from xtb import records
+from xtb.aggregation import CET, CandleAggregator, TradingSessions
+
+MINUTE = 60_000
+HOUR = 60 * MINUTE
+# Monday
+START = 1_641_168_000_000
+
+
+def bar(minute: int, price: float, vol: float = 1.0) -> tuple:
+    return (
+        START + minute * MINUTE, price, price + 1, price - 1, price + 0.5,
+        vol
+    )
+
+
+def test_aggregates_higher_periods_incrementally():
+    closed = []
+    aggregator = CandleAggregator(
+        periods=[5, 15], on_bar=lambda period, c: closed.append((period, c))
+    )
+    assert aggregator.add_bars(bar(i, float(i)) for i in range(12)) == 12
+    assert aggregator.bars(5) == [
+        (START, 0.0, 5.0, -1.0, 4.5, 5.0),
+        (START + 5 * MINUTE, 5.0, 10.0, 4.0, 9.5, 5.0),
+        (START + 10 * MINUTE, 10.0, 12.0, 9.0, 11.5, 2.0),
+    ]
+    assert aggregator.bars(15, include_open=False) == []
+    assert [period for period, _ in closed].count(5) == 2
+    assert len(aggregator.bars(1)) == 12
+
+    # An update of the open base bar only changes the open bars
+    aggregator.add_bar((START + 11 * MINUTE, 11.0, 30.0, 10.0, 29.0, 3.0))
+    assert aggregator.open_bar(5) == \
+        (START + 10 * MINUTE, 10.0, 30.0, 9.0, 29.0, 4.0)
+    assert aggregator.open_bar(15) == (START, 0.0, 30.0, -1.0, 29.0, 14.0)
+    assert not aggregator.add_bar(bar(3, 100.0))
+    assert aggregator.open_bar(15)[2] == 30.0
+
+
+def test_ticks_build_the_base_bars():
+    aggregator = CandleAggregator(periods=[5])
+    for second, price in ((0, 1.0), (20, 1.5), (40, 0.5), (70, 2.0)):
+        aggregator.add_tick(START + second * 1000, price, 1.0)
+    assert aggregator.bars(1) == [
+        (START, 1.0, 1.5, 0.5, 0.5, 3.0),
+        (START + MINUTE, 2.0, 2.0, 2.0, 2.0, 1.0),
+    ]
+    assert aggregator.open_bar(5) == (START, 1.0, 2.0, 0.5, 2.0, 4.0)
+
+
+def test_chart_response_prices_are_resolved():
+    chart = records.ChartResponse.from_dict({
+        'digits': 2, 'exemode': 1, 'rateInfos': [{
+            'close': 5.0, 'ctm': START, 'ctmString': '', 'high': 10.0,
+            'low': -5.0, 'open': 100.0, 'vol': 1.0
+        }]
+    })
+    aggregator = CandleAggregator(periods=[60])
+    assert aggregator.add_chart(chart) == 1
+    assert aggregator.bars(60)[0] == \
+        pytest.approx((START, 1.0, 1.1, 0.95, 1.05, 1.0))
+
+
+def test_sessions_align_bars_and_drop_closed_market():
+    cet = timezone(timedelta(hours=1))
+    hours = records.TradingHours.from_dict({
+        'symbol': 'US500', 'quotes': [],
+        'trading': [
+            {'day': day, 'fromT': 15 * HOUR + 30 * MINUTE,
+             'toT': 22 * HOUR} for day in range(1, 6)
+        ]
+    })
+    sessions = TradingSessions.from_trading_hours(hours, cet)
+    # 15:30 CET
+    open_time = START + 14 * HOUR + 30 * MINUTE
+    assert sessions.session_start(open_time + HOUR) == open_time
+    assert sessions.session_start(open_time - MINUTE) is None
+
+    aggregator = CandleAggregator(periods=[60, 1440], sessions=sessions)
+    assert not aggregator.add_bar((open_time - MINUTE, 1, 1, 1, 1, 1))
+    for minute in (0, 59, 60, 61):
+        assert aggregator.add_bar((open_time + minute * MINUTE,) +
+                                  (1.0, 1.0, 1.0, 1.0, 1.0))
+    assert [b[0] for b in aggregator.bars(60)] == \
+        [open_time, open_time + HOUR]
+    # D1 starts at midnight CET
+    assert aggregator.bars(1440)[0][0] == START - HOUR
+
+
+def test_central_european_time():
+    def local(iso: str) -> str:
+        utc = datetime.fromisoformat(iso).replace(tzinfo=timezone.utc)
+        return utc.astimezone(CET).strftime('%m-%d %H:%M %Z')
+
+    assert local('2022-01-03 12:00') == '01-03 13:00 CET'
+    assert local('2022-03-27 00:59') == '03-27 01:59 CET'
+    assert local('2022-03-27 01:00') == '03-27 03:00 CEST'
+    assert local('2022-10-30 00:30') == '10-30 02:30 CEST'
+    assert local('2022-10-30 01:30') == '10-30 02:30 CET'
+    for ms in (1_667_089_800_000, 1_667_093_400_000):
+        assert datetime.fromtimestamp(ms / 1000, CET).timestamp() * 1000 \
+            == ms
+
+
+def test_trading_hours_are_in_central_european_time():
+    sessions = TradingSessions([
+        {'day': 1, 'fromT': 9 * HOUR, 'toT': 17 * HOUR}
+    ])
+    # 09:00 CET on Monday
+    assert sessions.session_start(START + 8 * HOUR) == START + 8 * HOUR
+    assert sessions.session_start(START + 7 * HOUR) is None
+
+
+def test_invalid_periods():
+    with pytest.raises(ValueError):
+        CandleAggregator(base_period=5, periods=[7])
+    with pytest.raises(ValueError):
+        CandleAggregator(periods=[2000])
+    assert CandleAggregator(periods=[10080, 43200]).periods == \
+        [1, 10080, 43200]
+
+
+def test_columns():
+    np = pytest.importorskip('numpy')
+    aggregator = CandleAggregator(periods=[5])
+    aggregator.add_bars(bar(i, float(i)) for i in range(7))
+    columns = aggregator.columns(5)
+    assert columns.ctm.tolist() == [START, START + 5 * MINUTE]
+    assert np.allclose(columns.high, [5.0, 7.0])
@@ -0,0 +1,131 @@
+import asyncio
+import json
+
+import pytest
+from xtb import AsyncXtbApi, records
+from xtb.connector import AsyncConnector
+from xtb.exceptions import XtbApiError, XtbSocketError
+from xtb.ratelimit import NoRateLimiter
+
+
+class PlainAsyncConnector(AsyncConnector):
+    """
+    Talks plain TCP to the local test server
+    """
+
+    def __init__(self, rate_limiter=None, codec=None):
+        super().__init__(rate_limiter=NoRateLimiter(), codec=codec)
+
+    def _create_ssl_context(self):
+        return None
+
+
+RESPONSES = {
+    'login': {'status': True, 'streamSessionId': 'abc'},
+    'logout': {'status': True},
+    'getVersion': {'status': True, 'returnData': {'version': '2.5.0'}},
+    'getServerTime': {
+        'status': True,
+        'returnData': {'time': 1392211379731, 'timeString': 'Feb 12, 2014'}
+    },
+    'getCalendar': {
+        'status': False, 'errorCode': 'BE005', 'errorDescr': 'Nope'
+    },
+}
+
+
+async def handle_client(reader, writer):
+    while True:
+        try:
+            packet = await reader.readuntil(b'}')
+        except asyncio.IncompleteReadError:
+            break
+        while True:
+            try:
+                request = json.loads(packet)
+                break
+            except ValueError:
+                packet += await reader.readuntil(b'}')
+        if request['command'] == 'getServerTime':
+            await asyncio.sleep(0.2)
+        response = RESPONSES[request['command']]
+        writer.write(json.dumps(response).encode() + b'\n\n')
+        await writer.drain()
+    writer.close()
+
+
+def run_with_server(scenario):
+    async def main():
+        server = await asyncio.start_server(handle_client, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            api = AsyncXtbApi(
+                host='127.0.0.1', port=port, connector=PlainAsyncConnector
+            )
+            return await scenario(api)
+
+    return asyncio.run(main())
+
+
+def test_async_commands():
+    async def scenario(api: AsyncXtbApi):
+        async with api:
+            login = await api.login(user='1', password='x')
+            version = await api.get_version()
+            time = await api.get_server_time()
+        return login, version, time
+
+    login, version, time = run_with_server(scenario)
+    assert login['streamSessionId'] == 'abc'
+    assert isinstance(version, records.Version)
+    assert version.version == '2.5.0'
+    assert isinstance(time, records.ServerTime)
+
+
+def test_async_concurrent_commands_on_one_connection():
+    async def scenario(api: AsyncXtbApi):
+        async with api:
+            return await asyncio.gather(*(api.get_version() for _ in range(5)))
+
+    versions = run_with_server(scenario)
+    assert [v.version for v in versions] == ['2.5.0'] * 5
+
+
+def test_async_raises_api_error():
+    async def scenario(api: AsyncXtbApi):
+        async with api:
+            await api.get_calendar()
+
+    with pytest.raises(XtbApiError, match='BE005: Nope'):
+        run_with_server(scenario)
+
+
+def test_async_no_connect():
+    async def scenario(api: AsyncXtbApi):
+        await api.get_version()
+
+    expected_msg = r'Tried to use the API without calling connect\(\) first'
+    with pytest.raises(XtbSocketError, match=expected_msg):
+        run_with_server(scenario)
+
+
+def test_async_connect_raise():
+    async def scenario(api: AsyncXtbApi):
+        async with api:
+            await api.connect()
+
+    expected_msg = r'Tried to connect\(\) without calling close\(\)'
+    with pytest.raises(XtbSocketError, match=expected_msg):
+        run_with_server(scenario)
+
+
+def test_async_cancelled_command_closes_the_connection():
+    async def scenario(api: AsyncXtbApi):
+        async with api:
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(api.get_server_time(), 0.05)
+            assert not api.is_connected()
+            with pytest.raises(XtbSocketError, match='connection was closed'):
+                await api.get_version()
+
+    run_with_server(scenario)
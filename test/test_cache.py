@@ -0,0 +1,131 @@
+from xtb import XtbApi, records
+from xtb.cache import ResponseCache
+
+from test.test_records import SYMBOLS
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingConnector:
+    """
+    Answers getAllSymbols and getSymbol from SYMBOLS and counts the calls
+    """
+
+    def __init__(self, rate_limiter=None, codec=None) -> None:
+        self.commands = []
+
+    def handle_command(self, *, command, arguments=None):
+        self.commands.append(command)
+        if command == 'getAllSymbols':
+            return {'status': True, 'returnData': SYMBOLS}
+        if command == 'getSymbol':
+            return {'status': True, 'returnData': SYMBOLS[0]}
+        return {'status': True, 'returnData': {'version': '2.5.0'}}
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = ResponseCache(ttls={'getVersion': 10}, clock=clock)
+    cache.put('getVersion', None, {'status': True})
+    assert cache.get('getVersion') == {'status': True}
+    clock.now += 10
+    assert cache.get('getVersion') is None
+    assert cache.stats()[:2] == (1, 1)
+
+
+def test_uncached_commands_are_ignored():
+    cache = ResponseCache(ttls={'getVersion': 10})
+    cache.put('getTrades', None, {'status': True})
+    assert not cache.caches('getTrades')
+    assert cache.get('getTrades') is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(ttls={'getSymbol': 10}, max_entries=2)
+    for name in ('A', 'B'):
+        cache.put('getSymbol', {'symbol': name}, {'returnData': name})
+    cache.get('getSymbol', {'symbol': 'A'})
+    cache.put('getSymbol', {'symbol': 'C'}, {'returnData': 'C'})
+    assert cache.get('getSymbol', {'symbol': 'B'}) is None
+    assert cache.get('getSymbol', {'symbol': 'A'}) is not None
+    assert cache.stats().evictions == 1
+
+
+def test_invalidate():
+    cache = ResponseCache()
+    cache.put('getSymbol', {'symbol': 'A'}, {'returnData': 'A'})
+    cache.put('getSymbol', {'symbol': 'B'}, {'returnData': 'B'})
+    cache.put('getStepRules', None, {'returnData': []})
+    cache.invalidate('getSymbol', {'symbol': 'A'})
+    assert cache.stats().size == 2
+    cache.invalidate('getSymbol')
+    assert cache.stats().size == 1
+    cache.invalidate()
+    assert cache.stats().size == 0
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    clock = FakeClock()
+    cache = ResponseCache(path=path, clock=clock)
+    cache.put('getAllSymbols', None, {'returnData': SYMBOLS})
+    cache.put('getStepRules', None, {'returnData': []})
+    cache.save()
+
+    clock.now += 7200
+    warm = ResponseCache(path=path, clock=clock)
+    assert warm.get('getAllSymbols') is None
+    assert warm.get('getStepRules') == {'returnData': []}
+
+
+def test_api_serves_reference_data_from_cache():
+    cache = ResponseCache()
+    api = XtbApi(connector=CountingConnector, cache=cache)
+    first = api.get_all_symbols()
+    second = api.get_all_symbols()
+    api.get_version()
+    api.get_version()
+    assert [s.symbol for s in first] == [s.symbol for s in second]
+    assert api._connector.commands == [
+        'getAllSymbols', 'getVersion', 'getVersion'
+    ]
+
+
+def test_get_symbol_uses_cached_all_symbols():
+    cache = ResponseCache()
+    api = XtbApi(connector=CountingConnector, cache=cache)
+    api.get_all_symbols()
+    symbol = api.get_symbol('USDPLN')
+    assert isinstance(symbol, records.Symbol)
+    assert symbol.symbol == 'USDPLN'
+    assert api._connector.commands == ['getAllSymbols']
+    assert cache.stats().hits == 1
+
+
+def test_uncached_get_symbol_counts_one_miss():
+    cache = ResponseCache()
+    api = XtbApi(connector=CountingConnector, cache=cache)
+    api.get_symbol('USDPLN')
+    api.get_symbol('USDPLN')
+    assert api._connector.commands == ['getSymbol']
+    assert cache.stats()[:2] == (1, 1)
+
+
+def test_cached_responses_are_copies():
+    cache = ResponseCache()
+    api = XtbApi(
+        connector=CountingConnector, cache=cache,
+        decode_mode=records.DecodeMode.RAW
+    )
+    api.get_all_symbols()
+    api.get_all_symbols()[0]['symbol'] = 'changed'
+    api.get_symbol('USDPLN')['bid'] = -1.0
+    assert api.get_all_symbols()[0]['symbol'] == SYMBOLS[0]['symbol']
+    assert api.get_symbol('USDPLN')['bid'] == SYMBOLS[0]['bid']
+    assert api._connector.commands == ['getAllSymbols']
@@ -0,0 +1,138 @@
+import pytest
+from xtb import records
+from xtb.calculator import TradeCalculator
+from xtb.quotes import QuoteBook
+
+from test.test_records import SYMBOLS
+
+
+def make_symbol(name, **fields):
+    raw = dict(SYMBOLS[0], symbol=name, **fields)
+    return records.Symbol.from_dict(raw)
+
+
+def fx(name, bid, ask):
+    return make_symbol(
+        name, currency=name[:3], currencyProfit=name[3:], bid=bid, ask=ask,
+        leverage=3.33, tickSize=0.00001, tickValue=1.0
+    )
+
+
+SYMBOL_RECORDS = [
+    fx('EURUSD', 1.1, 1.1002),
+    fx('USDPLN', 4.0, 4.001),
+    fx('EURPLN', 4.4, 4.401),
+    make_symbol(
+        'US500', currency='USD', currencyProfit='USD', currencyPair=False,
+        contractSize=50, tickSize=0.1, tickValue=5.0, leverage=5.0,
+        marginMode=102, profitMode=6, bid=4000.0, ask=4001.0
+    ),
+]
+
+
+@pytest.fixture
+def calculator():
+    return TradeCalculator(
+        SYMBOL_RECORDS, 'PLN', commission_rates={'US500': 0.001}
+    )
+
+
+def test_profit(calculator):
+    buy = calculator.profit(
+        close_price=1.101, cmd=0, open_price=1.1, symbol='EURUSD', volume=1
+    )
+    sell = calculator.profit(
+        close_price=1.101, cmd=1, open_price=1.1, symbol='EURUSD', volume=1
+    )
+    cfd = calculator.profit(
+        close_price=4010, cmd=2, open_price=4000, symbol='US500', volume=0.5
+    )
+    assert buy == pytest.approx(400.0)
+    assert sell == pytest.approx(-400.0)
+    assert cfd == pytest.approx(10 * 0.5 * 50 * 4.0)
+
+
+def test_margin(calculator):
+    assert calculator.margin('EURUSD', 1) == pytest.approx(3330 * 4.4)
+    assert calculator.margin('US500', 0.5) == pytest.approx(
+        0.5 * 50 * 0.05 * 4000.5 * 4.0
+    )
+    assert calculator.margin('US500', 1, price=4100) == pytest.approx(
+        50 * 0.05 * 4100 * 4.0
+    )
+
+
+def test_commission(calculator):
+    assert calculator.commission('EURUSD', 1).commission == 0.0
+    commission = calculator.commission('US500', 1, price=4000)
+    assert commission.commission == pytest.approx(50 * 4000 * 0.001 * 4.0)
+    assert commission.rateOfExchange == 4.0
+
+
+def test_rates():
+    calculator = TradeCalculator(SYMBOL_RECORDS, 'USD')
+    assert calculator.rate('USD') == 1.0
+    assert calculator.rate('EUR') == 1.1
+    assert calculator.rate('PLN') == pytest.approx(1 / 4.001)
+    with pytest.raises(ValueError):
+        calculator.rate('JPY')
+    with pytest.raises(ValueError):
+        calculator.margin('GBPUSD', 1)
+
+
+def test_quotes_take_precedence():
+    book = QuoteBook()
+    book.update(records.Tick.from_dict({
+        'ask': 5.001, 'askVolume': 1, 'bid': 5.0, 'bidVolume': 1.0,
+        'high': 5.1, 'level': 0, 'low': 4.9, 'spreadRaw': 0.001,
+        'spreadTable': 1.0, 'symbol': 'USDPLN',
+        'timestamp': 1_640_995_200_000
+    }))
+    calculator = TradeCalculator(SYMBOL_RECORDS, 'PLN', quotes=book)
+    assert calculator.rate('USD') == 5.0
+    assert calculator.rate('EUR') == 4.4
+
+
+def test_batched_matches_scalar(calculator):
+    np = pytest.importorskip('numpy')
+    positions = dict(
+        symbol=np.array(['EURUSD', 'US500', 'EURUSD', 'US500']),
+        cmd=np.array([0, 1, 1, 0]),
+        open_price=np.array([1.1, 4000.0, 1.2, 3900.0]),
+        close_price=np.array([1.105, 3990.0, 1.19, 3950.0]),
+        volume=np.array([1.0, 2.0, 0.1, 0.3])
+    )
+    profits = calculator.profits(**positions)
+    margins = calculator.margins(positions['symbol'], positions['volume'])
+    for i in range(4):
+        position = {k: v[i].item() for k, v in positions.items()}
+        assert profits[i] == pytest.approx(calculator.profit(**position))
+        assert margins[i] == pytest.approx(
+            calculator.margin(position['symbol'], position['volume'])
+        )
+    assert calculator.profits(
+        symbol='EURUSD', cmd=0, open_price=1.1,
+        close_price=np.array([1.1, 1.101]), volume=1
+    ) == pytest.approx([0.0, 400.0])
+
+
+class FakeApi:
+    def get_profit_calculation(self, **kwargs):
+        return records.ProfitCalculation(profit=400.0)
+
+    def get_margin_trade(self, symbol, volume):
+        return records.MarginTrade(margin=15000.0)
+
+    def get_commission_def(self, symbol, volume):
+        return records.Commission(commission=0.0, rateOfExchange=4.0)
+
+
+def test_verify(calculator):
+    position = dict(
+        close_price=1.101, cmd=0, open_price=1.1, symbol='EURUSD', volume=1
+    )
+    checks = calculator.verify(FakeApi(), [position] * 5, sample=2)
+    assert len(checks) == 6
+    assert {(c.kind, c.ok) for c in checks} == {
+        ('profit', True), ('margin', False), ('commission', True)
+    }
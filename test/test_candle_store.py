@@ -0,0 +1,131 @@
+import time
+
+import pytest
+from xtb.candle_store import (
+    CandleStore, history_start, merge_ranges, period_start, subtract_ranges
+)
+from xtb.columnar import ChartColumns
+
+np = pytest.importorskip('numpy')
+
+MINUTE = 60_000
+START = 1_640_995_200_000
+
+
+def test_merge_ranges():
+    assert merge_ranges([(10, 20), (0, 5), (6, 8), (15, 30)]) == [
+        (0, 8), (10, 30)
+    ]
+
+
+def test_subtract_ranges():
+    covered = [(10, 20), (30, 40)]
+    assert subtract_ranges(0, 50, covered) == [(0, 9), (21, 29), (41, 50)]
+    assert subtract_ranges(12, 18, covered) == []
+    assert subtract_ranges(15, 35, covered) == [(21, 29)]
+
+
+class FakeApi:
+    def __init__(self, earliest: int = 0) -> None:
+        self.requests = []
+        # History before this time is cut like by the server limits
+        self.earliest = earliest
+
+    def get_chart_range_request(
+            self, *, end, period, start, symbol, ticks, columnar
+    ):
+        self.requests.append((start, end))
+        step = period * MINUTE
+        first = -(-max(start, self.earliest) // step) * step
+        ctm = np.arange(first, end + 1, step, dtype=np.int64)
+        prices = (ctm - START) / MINUTE
+        return ChartColumns(
+            digits=5, exemode=1, ctm=ctm, open=prices, high=prices + 1,
+            low=prices - 1, close=prices + 0.5, vol=np.ones(len(ctm))
+        )
+
+
+def test_fetch_downloads_only_missing_ranges(tmp_path):
+    store = CandleStore(str(tmp_path))
+    api = FakeApi()
+    first = store.fetch(api, 'EURUSD', 1, START, START + 9 * MINUTE)
+    assert len(first) == 10
+    assert api.requests == [(START, START + 9 * MINUTE)]
+
+    second = store.fetch(
+        api, 'EURUSD', 1, START + 5 * MINUTE, START + 14 * MINUTE
+    )
+    assert api.requests[1] == (START + 9 * MINUTE + 1, START + 14 * MINUTE)
+    assert second.ctm.tolist() == [
+        START + i * MINUTE for i in range(5, 15)
+    ]
+    assert second.open.tolist() == list(range(5, 15))
+
+    store.fetch(api, 'EURUSD', 1, START, START + 14 * MINUTE)
+    assert len(api.requests) == 2
+
+
+def test_series_survives_reopening(tmp_path):
+    api = FakeApi()
+    CandleStore(str(tmp_path)).fetch(
+        api, 'EURUSD', 5, START, START + 60 * MINUTE
+    )
+    series = CandleStore(str(tmp_path)).series('EURUSD', 5)
+    assert series.covered() == [(START, START + 60 * MINUTE)]
+    assert len(series) == 13
+    rows = series.rows(START, START + 10 * MINUTE)
+    assert [row[0] for row in rows] == [
+        START, START + 5 * MINUTE, START + 10 * MINUTE
+    ]
+    assert rows[1][1:] == (5.0, 6.0, 4.0, 5.5, 1.0)
+
+
+def test_empty_ranges_are_remembered(tmp_path):
+    series = CandleStore(str(tmp_path)).series('EURUSD', 1)
+    series.append(START, START + 10 * MINUTE, [])
+    assert series.missing(START, START + 10 * MINUTE) == []
+    assert len(series.read(START, START + 10 * MINUTE)) == 0
+
+
+def test_period_start():
+    # Wednesday 2022-01-05 10:30 UTC
+    timestamp = START + 4 * 24 * 60 * MINUTE + 630 * MINUTE
+    assert period_start(60, timestamp) == timestamp - 30 * MINUTE
+    assert period_start(10080, timestamp) == START + 2 * 24 * 60 * MINUTE
+    assert period_start(43200, timestamp) == START
+
+
+def test_fetch_splits_windows_and_keeps_truncated_history_missing(
+        tmp_path
+):
+    store = CandleStore(str(tmp_path))
+    store.WINDOW_CANDLES = 10
+    api = FakeApi(earliest=START + 25 * MINUTE)
+    columns = store.fetch(api, 'EURUSD', 1, START, START + 39 * MINUTE)
+    assert len(api.requests) == 4
+    assert columns.ctm[0] == START + 25 * MINUTE
+    series = store.series('EURUSD', 1)
+    assert series.covered() == [(START + 25 * MINUTE, START + 39 * MINUTE)]
+
+    api.earliest = 0
+    columns = store.fetch(api, 'EURUSD', 1, START, START + 39 * MINUTE)
+    assert len(columns) == 40
+
+
+def test_history_start():
+    assert history_start(1, START) == START - 28 * 24 * 60 * MINUTE
+    assert history_start(1440, START) is None
+
+
+def test_fetch_covers_the_hours_the_market_is_closed(tmp_path):
+    store = CandleStore(str(tmp_path))
+    day = period_start(1440, int(time.time() * 1000)) - 24 * 60 * MINUTE
+    # The market opens at 09:00 and there are no candles before
+    api = FakeApi(earliest=day + 9 * 60 * MINUTE)
+    columns = store.fetch(api, 'EURUSD', 60, day, day + 17 * 60 * MINUTE)
+    assert columns.ctm[0] == day + 9 * 60 * MINUTE
+    assert store.series('EURUSD', 60).missing(
+        day, day + 17 * 60 * MINUTE
+    ) == []
+    store.fetch(api, 'EURUSD', 60, day, day + 17 * 60 * MINUTE)
+    assert len(api.requests) == 1
@@ -0,0 +1,41 @@
+import pytest
+from xtb.columnar import ChartColumns
+
+np = pytest.importorskip('numpy')
+
+RETURN_DATA = {
+    'digits': 4,
+    'exemode': 1,
+    'rateInfos': [
+        {
+            'ctm': 1389362640000, 'ctmString': 'Jan 10, 2014 3:04:00 PM',
+            'open': 6000.0, 'close': 10.0, 'high': 20.0, 'low': -5.0,
+            'vol': 0.0
+        },
+        {
+            'ctm': 1389362700000, 'ctmString': 'Jan 10, 2014 3:05:00 PM',
+            'open': 6010.0, 'close': -3.0, 'high': 1.0, 'low': -4.0,
+            'vol': 12.5
+        },
+    ]
+}
+
+
+def test_columns_resolve_relative_prices():
+    columns = ChartColumns.from_dict(RETURN_DATA)
+    assert len(columns) == 2
+    assert columns.ctm.dtype == np.int64
+    assert columns.ctm.tolist() == [1389362640000, 1389362700000]
+    assert columns.open.tolist() == pytest.approx([0.6, 0.601])
+    assert columns.close.tolist() == pytest.approx([0.601, 0.6007])
+    assert columns.high.tolist() == pytest.approx([0.602, 0.6011])
+    assert columns.low.tolist() == pytest.approx([0.5995, 0.6006])
+    assert columns.vol.tolist() == [0.0, 12.5]
+
+
+def test_empty_chart():
+    columns = ChartColumns.from_dict(
+        {'digits': 5, 'exemode': 1, 'rateInfos': []}
+    )
+    assert len(columns) == 0
+    assert columns.close.dtype == np.float64
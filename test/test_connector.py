@@ -0,0 +1,203 @@
+import socket
+from typing import List
+
+import pytest
+from benchmarks.mock_server import MockXtbServer, client_context
+from xtb import XtbApi
+from xtb.codec import JsonCodec, available_codecs, get_codec
+from xtb.connector import ConnectCache, SyncConnector
+from xtb.exceptions import XtbSocketError
+from xtb.framing import FrameReader
+from xtb.ratelimit import NoRateLimiter
+
+
+class ChunkedSocket:
+    """
+    Returns the given chunks one recv_into() call at a time
+    """
+
+    def __init__(self, chunks: List[bytes]) -> None:
+        self._chunks = list(chunks)
+        self.sent = []
+
+    def sendall(self, data: bytes) -> None:
+        self.sent.append(data)
+
+    def recv_into(self, buffer) -> int:
+        if not self._chunks:
+            return 0
+        chunk = self._chunks.pop(0)
+        size = min(len(chunk), len(buffer))
+        buffer[:size] = chunk[:size]
+        if size < len(chunk):
+            self._chunks.insert(0, chunk[size:])
+        return size
+
+
+def connector_with(chunks: List[bytes]) -> SyncConnector:
+    connector = SyncConnector(rate_limiter=NoRateLimiter())
+    connector._socket = ChunkedSocket(chunks)
+    return connector
+
+
+def test_frame_reader_single_chunk():
+    reader = FrameReader(b'\n\n')
+    assert reader.read_frame(ChunkedSocket([b'{"a": 1}\n\n'])) == b'{"a": 1}'
+    assert reader.pending() == 0
+
+
+def test_frame_reader_terminator_split_between_chunks():
+    reader = FrameReader(b'\n\n')
+    sock = ChunkedSocket([b'{"a": 1}\n', b'\n'])
+    assert reader.read_frame(sock) == b'{"a": 1}'
+
+
+def test_frame_reader_keeps_leftover_bytes():
+    reader = FrameReader(b'\n\n')
+    sock = ChunkedSocket([b'{"a": 1}\n\n{"b"', b': 2}\n\n'])
+    assert reader.read_frame(sock) == b'{"a": 1}'
+    assert reader.pending() == 4
+    assert reader.read_frame(sock) == b'{"b": 2}'
+
+
+def test_frame_reader_grows_for_large_frames():
+    payload = b'x' * 100_000
+    chunks = [payload[i:i + 1000] for i in range(0, len(payload), 1000)]
+    reader = FrameReader(b'\n\n', chunk_size=64)
+    sock = ChunkedSocket(chunks + [b'\n\n'])
+    assert reader.read_frame(sock) == payload
+
+
+def test_frame_reader_raises_on_closed_connection():
+    reader = FrameReader(b'\n\n')
+    with pytest.raises(XtbSocketError):
+        reader.read_frame(ChunkedSocket([b'{"a"']))
+
+
+def test_response_with_multibyte_character_split():
+    encoded = '{"status": true, "returnData": "zażółć"}'.encode('utf-8')
+    split = encoded.index('ż'.encode('utf-8')) + 1
+    connector = connector_with([encoded[:split], encoded[split:] + b'\n\n'])
+    response = connector.handle_command(command='getVersion')
+    assert response['returnData'] == 'zażółć'
+
+
+def test_consecutive_responses_in_one_chunk():
+    connector = connector_with([
+        b'{"status": true, "returnData": 1}\n\n'
+        b'{"status": true, "returnData": 2}\n\n'
+    ])
+    assert connector.handle_command(command='ping')['returnData'] == 1
+    assert connector.handle_command(command='ping')['returnData'] == 2
+
+
+def test_packets_are_compact():
+    connector = connector_with([b'{"status": true}\n\n'])
+    connector.handle_command(command='getSymbol', arguments={'symbol': 'X'})
+    assert connector._socket.sent == [
+        b'{"command":"getSymbol","arguments":{"symbol":"X"}}'
+    ]
+
+
+@pytest.mark.parametrize('name', available_codecs())
+def test_codecs_round_trip(name: str):
+    codec = get_codec(name)
+    data = {'command': 'getNews', 'arguments': {'title': 'zażółć', 'n': 1.5}}
+    assert codec.decode(codec.encode(data)) == data
+
+
+@pytest.mark.parametrize('name', available_codecs())
+def test_codecs_raise_value_error(name: str):
+    with pytest.raises(ValueError):
+        get_codec(name).decode(b'{"status": ')
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError, match='Unknown codec'):
+        get_codec('yaml')
+
+
+def test_codec_requires_encode_and_decode():
+    class EncodeOnly(JsonCodec):
+        def encode(self, data):
+            return b''
+
+    with pytest.raises(TypeError):
+        EncodeOnly()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_connect_cache_resolves_once_per_ttl(monkeypatch):
+    calls = []
+    getaddrinfo = socket.getaddrinfo
+
+    def counting_getaddrinfo(*args, **kwargs):
+        calls.append(args)
+        return getaddrinfo(*args, **kwargs)
+
+    monkeypatch.setattr(socket, 'getaddrinfo', counting_getaddrinfo)
+    cache = ConnectCache(ttl=60)
+    first = cache.addresses('127.0.0.1', 5124)
+    assert cache.addresses('127.0.0.1', 5124) == first
+    assert len(calls) == 1
+    cache.invalidate('127.0.0.1', 5124)
+    cache.addresses('127.0.0.1', 5124)
+    assert len(calls) == 2
+    ConnectCache(ttl=0).addresses('127.0.0.1', 5124)
+    assert len(calls) == 3
+
+
+def test_connect_tries_the_next_address_and_resumes_tls():
+    cache = ConnectCache()
+    context = client_context()
+    with MockXtbServer() as server:
+        dead = (socket.AF_INET, socket.SOCK_STREAM, 0,
+                ('127.0.0.1', free_port()))
+        live = (socket.AF_INET, socket.SOCK_STREAM, 0,
+                ('127.0.0.1', server.port))
+        cache._addresses[('localhost', server.port)] = (
+            float('inf'), [dead, live]
+        )
+        reused = []
+        for _ in range(2):
+            connector = SyncConnector(
+                rate_limiter=NoRateLimiter(), ssl_context=context,
+                connect_cache=cache, connect_timeout=5
+            )
+            connector.connect('localhost', server.port)
+            assert connector.handle_command(command='ping')['status']
+            assert connector._socket.getsockopt(
+                socket.IPPROTO_TCP, socket.TCP_NODELAY
+            )
+            reused.append(connector.session_reused)
+            connector.close()
+    assert reused == [False, True]
+
+
+def test_connect_raises_the_last_error():
+    cache = ConnectCache()
+    port = free_port()
+    connector = SyncConnector(connect_cache=cache, connect_timeout=5)
+    with pytest.raises(OSError):
+        connector.connect('127.0.0.1', port)
+    assert not connector.is_connected()
+    assert ('127.0.0.1', port) not in cache._addresses
+
+
+def test_api_passes_only_the_given_options_to_the_connector():
+    created = []
+
+    class LegacyConnector(SyncConnector):
+        def __init__(self) -> None:
+            super().__init__()
+            created.append(self)
+
+    XtbApi(connector=LegacyConnector)
+    assert len(created) == 1
+    with pytest.raises(TypeError):
+        XtbApi(connector=LegacyConnector, rate_limiter=NoRateLimiter())
@@ -0,0 +1,170 @@
+import threading
+
+import pytest
+from xtb.exceptions import XtbSocketError
+from xtb.failover import IDEMPOTENT_METHODS, ResilientSession
+
+
+class FakeApi:
+    instances = []
+
+    def __init__(self) -> None:
+        FakeApi.instances.append(self)
+        self.connected = False
+        self.logged_in = False
+        self.broken = False
+        self.pings = 0
+        self.trades = 0
+
+    def connect(self) -> None:
+        self.connected = True
+
+    def login(self, user, password, app_name=None) -> dict:
+        self.logged_in = True
+        return {'status': True}
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    def close(self) -> None:
+        self.connected = False
+
+    def _check(self) -> None:
+        if self.broken:
+            raise XtbSocketError('The connection was closed by the server')
+
+    def ping(self) -> bool:
+        self._check()
+        self.pings += 1
+        return True
+
+    def get_server_time(self) -> int:
+        self._check()
+        return id(self)
+
+    def trade_transaction(self, *, trade_info) -> int:
+        self._check()
+        self.trades += 1
+        return 1
+
+
+@pytest.fixture(autouse=True)
+def reset_instances():
+    FakeApi.instances = []
+
+
+def make_session(**kwargs) -> ResilientSession:
+    return ResilientSession(
+        'user', 'password', api_factory=FakeApi, **kwargs
+    )
+
+
+def test_idempotent_methods():
+    assert 'get_symbol' in IDEMPOTENT_METHODS
+    assert 'trade_transaction_status' in IDEMPOTENT_METHODS
+    assert 'trade_transaction' not in IDEMPOTENT_METHODS
+
+
+def test_open_prepares_a_standby():
+    with make_session() as session:
+        active, standby = FakeApi.instances
+        assert session.api is active
+        assert standby.logged_in
+        assert session.get_server_time() == id(active)
+        assert session.stats().standby_ready
+    assert not active.connected and not standby.connected
+
+
+def test_read_is_replayed_on_the_standby():
+    failovers = []
+    with make_session(on_failover=failovers.append) as session:
+        active, standby = FakeApi.instances
+        active.broken = True
+        assert session.get_server_time() == id(standby)
+        assert session.api is standby
+        assert failovers == [standby]
+        assert not active.connected
+        stats = session.stats()
+    assert stats.failovers == 1
+    assert stats.replays == 1
+    assert stats.last_failover_time >= 0
+
+
+def test_trade_is_not_replayed():
+    with make_session() as session:
+        active, standby = FakeApi.instances
+        active.broken = True
+        with pytest.raises(XtbSocketError):
+            session.trade_transaction(trade_info=None)
+        assert session.api is standby
+        assert standby.trades == 0
+        assert session.trade_transaction(trade_info=None) == 1
+
+
+def test_new_standby_is_prepared_in_background():
+    with make_session(ping_interval=0.01) as session:
+        active, standby = FakeApi.instances
+        active.broken = True
+        session.get_server_time()
+        for _ in range(500):
+            if len(FakeApi.instances) == 3 and \
+                    FakeApi.instances[2].pings > 0:
+                break
+            threading.Event().wait(0.01)
+        assert session.stats().standby_ready
+        assert len(FakeApi.instances) == 3
+        assert session.api is standby
+        assert FakeApi.instances[2].pings > 0
+
+
+def test_concurrent_failures_swap_the_session_once():
+    barrier = threading.Barrier(2)
+
+    class SlowApi(FakeApi):
+        def connect(self) -> None:
+            threading.Event().wait(0.05)
+            super().connect()
+
+        def get_server_time(self) -> int:
+            if self.broken:
+                # Both threads fail on the same session at once
+                barrier.wait(timeout=5)
+            return super().get_server_time()
+
+    session = ResilientSession(
+        'user', 'password', api_factory=SlowApi, ping_interval=60
+    )
+    with session:
+        active, standby = FakeApi.instances
+        # No standby, so the failover creates the replacement itself
+        with session._lock:
+            session._standby = None
+        standby.close()
+        active.broken = True
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(session.get_server_time())
+            )
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results[0] == results[1] == id(session.api)
+        assert session.stats().failovers == 1
+    assert not any(api.connected for api in FakeApi.instances)
+
+
+def test_dead_standby_is_replaced():
+    with make_session(ping_interval=0.01) as session:
+        active, standby = FakeApi.instances
+        standby.broken = True
+        for _ in range(200):
+            if len(FakeApi.instances) == 3 and session.stats().standby_ready:
+                break
+            threading.Event().wait(0.01)
+        assert not standby.connected
+        assert len(FakeApi.instances) == 3
+        assert session.api is active
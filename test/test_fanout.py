@@ -0,0 +1,144 @@
+import threading
+
+import pytest
+from xtb.exceptions import XtbApiError, XtbSocketError
+from xtb.fanout import Account, FanOut
+
+ACCOUNTS = [Account(f'acc{i}', f'user{i}', 'password') for i in range(6)]
+
+
+class FakeApi:
+    instances = []
+    # user -> behaviour of get_margin_level
+    failures = {}
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def __init__(self) -> None:
+        FakeApi.instances.append(self)
+        self.connected = False
+        self.user = None
+
+    def connect(self) -> None:
+        self.connected = True
+
+    def login(self, user, password, app_name=None) -> dict:
+        if user == 'bad-login':
+            raise XtbApiError(code='BE005', description='Invalid login')
+        self.user = user
+        return {'status': True}
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    def close(self) -> None:
+        self.connected = False
+
+    def get_margin_level(self) -> str:
+        with FakeApi.lock:
+            FakeApi.active += 1
+            FakeApi.peak = max(FakeApi.peak, FakeApi.active)
+        try:
+            threading.Event().wait(0.01)
+            failure = FakeApi.failures.pop(self.user, None)
+            if failure is not None:
+                raise failure
+            return f'margin of {self.user}'
+        finally:
+            with FakeApi.lock:
+                FakeApi.active -= 1
+
+    def get_trades(self, *, opened_only: bool) -> list:
+        return [self.user, opened_only]
+
+
+@pytest.fixture(autouse=True)
+def reset_fake_api():
+    FakeApi.instances = []
+    FakeApi.failures = {}
+    FakeApi.peak = 0
+
+
+def test_run_on_all_accounts_concurrently():
+    with FanOut(ACCOUNTS, api_factory=FakeApi, max_workers=3) as fanout:
+        results = fanout.run('get_margin_level')
+    assert list(results) == fanout.accounts
+    assert all(result.ok for result in results.values())
+    assert results['acc2'].result == 'margin of user2'
+    assert results['acc2'].seconds > 0
+    assert 1 < FakeApi.peak <= 3
+    assert not any(api.connected for api in FakeApi.instances)
+
+
+def test_subset_arguments_and_callables():
+    with FanOut(ACCOUNTS, api_factory=FakeApi) as fanout:
+        trades = fanout.run(
+            'get_trades', opened_only=True, accounts=['acc1', 'acc4']
+        )
+        users = fanout.run(lambda api: api.user, accounts=['acc5'])
+        with pytest.raises(KeyError):
+            fanout.run('ping', accounts=['missing'])
+    assert {name: r.result for name, r in trades.items()} == {
+        'acc1': ['user1', True], 'acc4': ['user4', True]
+    }
+    assert users['acc5'].result == 'user5'
+
+
+def test_unknown_accounts_run_nothing():
+    fanout = FanOut(ACCOUNTS, api_factory=FakeApi)
+    with pytest.raises(KeyError, match='missing'):
+        fanout.run('get_margin_level', accounts=['acc1', 'missing'])
+    fanout.close()
+    assert FakeApi.instances == []
+
+
+def test_errors_are_per_account_and_broken_sessions_reconnect():
+    accounts = ACCOUNTS[:3] + [Account('acc-bad', 'bad-login', 'x')]
+    with FanOut(accounts, api_factory=FakeApi) as fanout:
+        assert len(FakeApi.instances) == 4
+        FakeApi.failures = {
+            'user0': XtbSocketError('Connection closed'),
+            'user1': XtbApiError(code='EX001', description='Error'),
+        }
+        results = fanout.run('get_margin_level')
+        assert isinstance(results['acc0'].error, XtbSocketError)
+        assert isinstance(results['acc1'].error, XtbApiError)
+        assert results['acc2'].ok
+        assert isinstance(results['acc-bad'].error, XtbApiError)
+
+        results = fanout.run('get_margin_level')
+        assert results['acc0'].result == 'margin of user0'
+        assert results['acc1'].ok
+    # acc0 logged in again once, the failed login was retried twice
+    assert len(FakeApi.instances) == 7
+
+
+def test_timeout():
+    with FanOut(ACCOUNTS[:1], api_factory=FakeApi) as fanout:
+        slow = threading.Event()
+        results = fanout.run(lambda api: slow.wait(1), timeout=0.01)
+        slow.set()
+    assert isinstance(results['acc0'].error, TimeoutError)
+
+
+def test_duplicate_account_names():
+    with pytest.raises(ValueError):
+        FanOut([ACCOUNTS[0], ACCOUNTS[0]])
+
+
+def test_queued_commands_keep_their_method_after_a_timeout():
+    calls = []
+
+    class SlowApi(FakeApi):
+        def slow(self) -> str:
+            threading.Event().wait(0.05)
+            calls.append(self.user)
+            return self.user
+
+    fanout = FanOut(ACCOUNTS[:3], api_factory=SlowApi, max_workers=1)
+    fanout.open()
+    results = fanout.run('slow', timeout=0.01)
+    fanout.close()
+    assert any(isinstance(r.error, TimeoutError) for r in results.values())
+    assert sorted(calls) == ['user0', 'user1', 'user2']
@@ -0,0 +1,118 @@
+import threading
+from contextlib import contextmanager
+
+import pytest
+from xtb import records
+from xtb.exceptions import XtbSocketError
+from xtb.history import HistoryDownloader, split_windows
+from xtb.pool import PoolStats
+
+MINUTE = 60_000
+START = 1_640_995_200_000
+
+
+class FakeApi:
+    def __init__(
+            self,
+            fail_first: int = 0,
+            mode: records.DecodeMode = records.DecodeMode.VALIDATE
+    ) -> None:
+        self.calls = []
+        self._failures = fail_first
+        self._mode = mode
+        self._lock = threading.Lock()
+
+    def get_chart_range_request(self, *, end, period, start, symbol, ticks):
+        with self._lock:
+            self.calls.append((start, end))
+            if self._failures:
+                self._failures -= 1
+                raise XtbSocketError('lost')
+        step = period * MINUTE
+        return records.ChartResponse.from_dict({
+            'digits': 5, 'exemode': 1, 'rateInfos': [
+                {
+                    'ctm': ctm, 'ctmString': '', 'open': 1.0, 'close': 0.0,
+                    'high': 0.0, 'low': 0.0, 'vol': 1.0
+                }
+                for ctm in range(start, end + 1, step)
+            ]
+        }, self._mode)
+
+
+class FakePool:
+    def __init__(self, api: FakeApi) -> None:
+        self.api = api
+
+    def stats(self) -> PoolStats:
+        return PoolStats(2, 2, 0, 0, 0, 0.0, 0.0, 0)
+
+    @contextmanager
+    def session(self, timeout=None):
+        yield self.api
+
+
+def ctms(result) -> list:
+    return [round(r.ctm.timestamp() * 1000) for r in result.chart.rateInfos]
+
+
+def test_split_windows():
+    assert split_windows(0, 25 * MINUTE, 1, 10) == [
+        (0, 10 * MINUTE),
+        (10 * MINUTE, 20 * MINUTE),
+        (20 * MINUTE, 25 * MINUTE)
+    ]
+    assert split_windows(10, 10, 1, 10) == []
+
+
+def test_download_merges_windows_in_order_without_duplicates():
+    api = FakeApi()
+    progress = []
+    downloader = HistoryDownloader(FakePool(api), window_candles=10)
+    result = downloader.download(
+        'EURUSD', 1, START, START + 35 * MINUTE,
+        progress=lambda *args: progress.append(args)
+    )
+    assert ctms(result) == [START + i * MINUTE for i in range(36)]
+    assert result.windows == 4
+    assert result.candles == 36
+    assert result.candles_per_second > 0
+    assert len(api.calls) == 4
+    assert progress[-1][:2] == (4, 4)
+
+
+def test_download_with_trusted_records():
+    api = FakeApi(mode=records.DecodeMode.TRUSTED)
+    downloader = HistoryDownloader(FakePool(api), window_candles=10)
+    result = downloader.download('EURUSD', 1, START, START + 15 * MINUTE)
+    assert [r.ctm for r in result.chart.rateInfos] == [
+        START + i * MINUTE for i in range(16)
+    ]
+
+
+def test_download_with_raw_dictionaries():
+    api = FakeApi(mode=records.DecodeMode.RAW)
+    downloader = HistoryDownloader(FakePool(api), window_candles=10)
+    result = downloader.download('EURUSD', 1, START, START + 15 * MINUTE)
+    assert result.chart['digits'] == 5
+    assert [r['ctm'] for r in result.chart['rateInfos']] == [
+        START + i * MINUTE for i in range(16)
+    ]
+    assert result.candles == 16
+
+
+def test_failed_windows_are_retried():
+    downloader = HistoryDownloader(
+        FakePool(FakeApi(fail_first=2)), window_candles=10, retry_delay=0
+    )
+    result = downloader.download('EURUSD', 1, START, START + 20 * MINUTE)
+    assert result.retries == 2
+    assert result.candles == 21
+
+
+def test_download_raises_after_retries():
+    downloader = HistoryDownloader(
+        FakePool(FakeApi(fail_first=100)), retries=1, retry_delay=0
+    )
+    with pytest.raises(XtbSocketError):
+        downloader.download('EURUSD', 1, START, START + 20 * MINUTE)
@@ -0,0 +1,121 @@
+import urllib.request
+
+import pytest
+from xtb import XtbApi
+from xtb.cache import ResponseCache
+from xtb.connector import SyncConnector
+from xtb.exceptions import XtbApiError
+from xtb.metrics import BUCKETS, PHASES, Metrics, start_http_exporter
+from xtb.ratelimit import NoRateLimiter
+
+from test.test_connector import ChunkedSocket
+
+PING = b'{"status": true}\n\n'
+
+
+def measured_connector(chunks, metrics):
+    connector = SyncConnector(rate_limiter=NoRateLimiter(), metrics=metrics)
+    connector._socket = ChunkedSocket(chunks)
+    return connector
+
+
+def test_phases_and_bytes_are_recorded():
+    metrics = Metrics()
+    connector = measured_connector([PING, PING[:5], PING[5:]], metrics)
+    connector.handle_command(command='ping')
+    connector.handle_command(command='ping')
+    stats = metrics.snapshot()['ping']
+    assert stats.calls == 2
+    assert stats.bytes_sent == 2 * len(b'{"command":"ping"}')
+    assert stats.bytes_received == 2 * len(PING)
+    assert set(stats.phases) == set(PHASES)
+    assert all(h.count == 2 for h in stats.phases.values())
+    assert stats.errors == {}
+
+
+def test_errors_are_counted_and_hooks_called():
+    spans = []
+
+    def broken_hook(span):
+        raise RuntimeError('ignored')
+
+    metrics = Metrics(hooks=[spans.append, broken_hook])
+    connector = measured_connector(
+        [b'{"status": false, "errorCode": "BE005"}\n\n'], metrics
+    )
+    with pytest.raises(XtbApiError):
+        connector.handle_command(command='getCalendar')
+    assert metrics.snapshot()['getCalendar'].errors == {'XtbApiError': 1}
+    assert [s.command for s in spans] == ['getCalendar']
+    assert spans[0].error == 'XtbApiError'
+    assert spans[0].duration >= 0
+    assert metrics.hook_errors == 1
+
+
+def test_api_records_total_and_cache_hits():
+    metrics = Metrics()
+    api = XtbApi(
+        rate_limiter=NoRateLimiter(), metrics=metrics,
+        cache=ResponseCache()
+    )
+    api._connector._socket = ChunkedSocket([
+        b'{"status": true, "returnData": []}\n\n'
+    ])
+    api.get_step_rules()
+    api.get_step_rules()
+    stats = metrics.snapshot()['getStepRules']
+    assert stats.calls == 1
+    assert stats.cache_hits == 1
+    assert stats.phases['total'].count == 2
+    assert stats.phases['validate'].count == 2
+    assert stats.phases['validate'].mean <= stats.phases['total'].mean
+
+
+def test_ping_is_not_validated():
+    metrics = Metrics()
+    api = XtbApi(rate_limiter=NoRateLimiter(), metrics=metrics)
+    api._connector._socket = ChunkedSocket([b'{"status": true}\n\n'])
+    assert api.ping()
+    assert 'validate' not in metrics.snapshot()['ping'].phases
+
+
+def test_histogram_quantile():
+    metrics = Metrics()
+    for value in (0.0002, 0.0002, 0.0002, 0.3):
+        metrics.observe('ping', 'total', value)
+    histogram = metrics.snapshot()['ping'].phases['total']
+    assert histogram.quantile(0.5) == 0.00025
+    assert histogram.quantile(1.0) == 0.5
+    assert histogram.mean == pytest.approx(0.30060 / 4)
+
+
+def test_prometheus_text():
+    metrics = Metrics()
+    measured_connector([PING], metrics).handle_command(command='ping')
+    metrics.cache_hit('getSymbol')
+    text = metrics.prometheus_text()
+    assert '# TYPE xtb_command_phase_seconds histogram' in text
+    assert 'xtb_command_calls_total{command="ping"} 1' in text
+    assert 'xtb_command_cache_hits_total{command="getSymbol"} 1' in text
+    assert 'xtb_command_phase_seconds_count{command="ping",phase="send"} 1' \
+        in text
+    buckets = [
+        line for line in text.splitlines()
+        if line.startswith('xtb_command_phase_seconds_bucket{command="ping",'
+                           'phase="decode"')
+    ]
+    assert len(buckets) == len(BUCKETS) + 1
+    assert buckets[-1].endswith('le="+Inf"} 1')
+
+
+def test_http_exporter_listens_on_localhost():
+    metrics = Metrics()
+    server = start_http_exporter(metrics, port=0)
+    try:
+        assert server.server_address[0] == '127.0.0.1'
+        url = f'http://127.0.0.1:{server.server_address[1]}/metrics'
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.read().decode() == metrics.prometheus_text()
+    finally:
+        server.shutdown()
+        server.server_close()
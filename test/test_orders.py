@@ -0,0 +1,204 @@
+import threading
+
+import pytest
+from benchmarks.mock_server import (
+    MockXtbServer, build_responses, client_context
+)
+from xtb import XtbApi, records
+from xtb.connector import SyncConnector
+from xtb.exceptions import XtbApiError
+from xtb.ratelimit import NoRateLimiter
+from xtb.orders import OrderExecutor
+
+TRADE_INFO = records.TradeInfo.from_dict({
+    'cmd': 0, 'customComment': None, 'expiration': 1_640_995_200_000,
+    'offset': 0, 'order': 0, 'price': 1.1, 'sl': 0.0, 'symbol': 'EURUSD',
+    'tp': 0.0, 'type': 0, 'volume': 0.1
+})
+
+
+def trade_status(order: int, request_status: int) -> records.TradeStatus:
+    return records.TradeStatus.from_dict({
+        'ask': 1.1, 'bid': 1.0, 'customComment': None, 'message': None,
+        'order': order, 'requestStatus': request_status
+    })
+
+
+def streaming_status(
+        order: int,
+        request_status: int
+) -> records.StreamingTradeStatus:
+    return records.StreamingTradeStatus.from_dict({
+        'customComment': None, 'message': None, 'order': order,
+        'price': 1.1, 'requestStatus': request_status
+    })
+
+
+class FakeApi:
+
+    def __init__(self, statuses=None) -> None:
+        # order -> request statuses returned by the consecutive polls
+        self.statuses = statuses or {}
+        self.polls = []
+        self.on_transaction = None
+        self._next_order = 100
+        self._lock = threading.Lock()
+
+    def trade_transaction(self, *, trade_info) -> records.TradeOrder:
+        if trade_info.symbol == 'FAIL':
+            raise XtbApiError(code='BE001', description='Invalid symbol')
+        with self._lock:
+            self._next_order += 1
+            order = self._next_order
+        if self.on_transaction is not None:
+            self.on_transaction(order)
+        return records.TradeOrder(order=order)
+
+    def trade_transaction_status(self, *, order: int) -> records.TradeStatus:
+        self.polls.append(order)
+        pending = self.statuses.get(order, [records.RequestStatus.PENDING])
+        status = pending.pop(0) if len(pending) > 1 else pending[0]
+        return trade_status(order, status)
+
+
+class FakeSubscription:
+
+    def __init__(self) -> None:
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeStreaming:
+
+    def __init__(self) -> None:
+        self.callback = None
+        self.subscription = FakeSubscription()
+
+    def subscribe_trade_status(self, *, callback=None) -> FakeSubscription:
+        self.callback = callback
+        return self.subscription
+
+
+def test_polls_with_backoff_without_streaming():
+    api = FakeApi({101: [
+        records.RequestStatus.PENDING, records.RequestStatus.PENDING,
+        records.RequestStatus.ACCEPTED
+    ]})
+    with OrderExecutor(api, poll_initial=0.001) as executor:
+        result = executor.submit(TRADE_INFO).result(timeout=5)
+    assert result.order == 101
+    assert result.accepted
+    assert not result.via_stream
+    assert result.polls == 3
+    assert result.accept_time >= result.submit_time
+    assert executor.stats().accepted == 1
+
+
+def test_resolved_from_the_stream():
+    api = FakeApi()
+    streaming = FakeStreaming()
+    executor = OrderExecutor(api, streaming, stream_timeout=5)
+    future = executor.submit(TRADE_INFO)
+    while 101 not in executor._waiting:
+        pass
+    streaming.callback(streaming_status(101, records.RequestStatus.PENDING))
+    streaming.callback(streaming_status(101, records.RequestStatus.ACCEPTED))
+    result = future.result(timeout=5)
+    executor.close()
+    assert result.via_stream
+    assert result.polls == 0
+    assert result.price == 1.1
+    assert api.polls == []
+    assert streaming.subscription.closed
+
+
+def test_status_streamed_before_the_transaction_returns():
+    api = FakeApi()
+    streaming = FakeStreaming()
+    api.on_transaction = lambda order: streaming.callback(
+        streaming_status(order, records.RequestStatus.REJECTED)
+    )
+    with OrderExecutor(api, streaming, stream_timeout=5) as executor:
+        result = executor.submit(TRADE_INFO).result(timeout=5)
+    assert result.via_stream
+    assert not result.accepted
+    assert result.request_status == records.RequestStatus.REJECTED
+    assert executor.stats().rejected == 1
+
+
+def test_falls_back_to_polling_when_the_stream_is_silent():
+    api = FakeApi({101: [records.RequestStatus.ACCEPTED]})
+    streaming = FakeStreaming()
+    with OrderExecutor(api, streaming, stream_timeout=0.01) as executor:
+        result = executor.submit(TRADE_INFO).result(timeout=5)
+    assert result.accepted
+    assert not result.via_stream
+    assert api.polls == [101]
+
+
+def test_timeout_and_errors():
+    api = FakeApi()
+    failing = TRADE_INFO.copy(update={'symbol': 'FAIL'})
+    with OrderExecutor(api, timeout=0.05, poll_initial=0.01) as executor:
+        pending = executor.submit(TRADE_INFO)
+        failed = executor.submit(failing)
+        with pytest.raises(TimeoutError):
+            pending.result(timeout=5)
+        with pytest.raises(XtbApiError):
+            failed.result(timeout=5)
+    assert executor.stats().failed == 2
+
+
+def test_submit_many_bounds_the_concurrency():
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    class SlowApi(FakeApi):
+        def trade_transaction_status(self, *, order):
+            with lock:
+                active.append(order)
+                peak.append(len(active))
+            threading.Event().wait(0.01)
+            with lock:
+                active.remove(order)
+            return trade_status(order, records.RequestStatus.ACCEPTED)
+
+    with OrderExecutor(SlowApi(), max_workers=2) as executor:
+        futures = executor.submit_many([TRADE_INFO] * 6)
+        results = [future.result(timeout=5) for future in futures]
+    assert sorted(result.order for result in results) == \
+        list(range(101, 107))
+    assert max(peak) <= 2
+    assert len(executor.accept_times()) == 6
+    assert executor.stats().submitted == 6
+
+
+def test_orders_are_sent_to_the_server():
+    class MockConnector(SyncConnector):
+        def __init__(self) -> None:
+            super().__init__(
+                rate_limiter=NoRateLimiter(), ssl_context=client_context()
+            )
+
+    responses = build_responses(symbols=1, candles=1, trades=1)
+    with MockXtbServer(responses=responses, record=True) as server:
+        with XtbApi('localhost', server.port, MockConnector) as api:
+            with OrderExecutor(api) as executor:
+                result = executor.submit(TRADE_INFO).result(timeout=5)
+    assert result.accepted
+    assert result.price == 1.1
+    assert server.requests[0] == {
+        'command': 'tradeTransaction',
+        'arguments': {
+            'tradeTransInfo': {
+                'cmd': 0, 'customComment': None,
+                'expiration': 1_640_995_200_000, 'offset': 0, 'order': 0,
+                'price': 1.1, 'sl': 0.0, 'symbol': 'EURUSD', 'tp': 0.0,
+                'type': 0, 'volume': 0.1
+            }
+        }
+    }
+    assert server.requests[1]['arguments'] == {'order': 101}
@@ -0,0 +1,144 @@
+import json
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from benchmarks.mock_server import (
+    MockXtbServer, build_responses, client_context
+)
+from xtb import XtbApi, records
+from xtb.exceptions import XtbApiError, XtbSocketError
+from xtb.pipeline import PipelinedConnector
+from xtb.ratelimit import NoRateLimiter
+
+
+class PlainPipelinedConnector(PipelinedConnector):
+    def __init__(self, rate_limiter=None, codec=None):
+        super().__init__(rate_limiter=NoRateLimiter(), codec=codec)
+
+    def _wrap_socket(self, s):
+        return s
+
+
+class BatchServer:
+    """
+    Waits for `batch` requests and answers them in reverse order
+    """
+
+    def __init__(self, batch: int) -> None:
+        self.batch = batch
+        self._server = socket.create_server(('127.0.0.1', 0))
+        self.port = self._server.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self) -> None:
+        conn, _ = self._server.accept()
+        decoder = json.JSONDecoder()
+        buffer = ''
+        requests = []
+        with conn:
+            while True:
+                data = conn.recv(4096)
+                if not data:
+                    break
+                buffer += data.decode()
+                while buffer:
+                    try:
+                        request, end = decoder.raw_decode(buffer)
+                    except ValueError:
+                        break
+                    buffer = buffer[end:]
+                    requests.append(request)
+                if len(requests) < self.batch:
+                    continue
+                for request in reversed(requests):
+                    conn.sendall(self._respond(request) + b'\n\n')
+                requests = []
+        self._server.close()
+
+    @staticmethod
+    def _respond(request: dict) -> bytes:
+        if request['command'] == 'getCalendar':
+            response = {'status': False, 'errorCode': 'E1', 'errorDescr': 'x'}
+        else:
+            symbol = request['arguments']['symbol']
+            response = {'status': True, 'returnData': {'margin': len(symbol)}}
+        response['customTag'] = request['customTag']
+        return json.dumps(response).encode()
+
+
+def test_responses_are_matched_by_tag():
+    server = BatchServer(batch=3)
+    connector = PlainPipelinedConnector()
+    connector.connect('127.0.0.1', server.port)
+    futures = [
+        connector.submit(command='getMarginTrade', arguments={'symbol': s})
+        for s in ('A', 'BB', 'CCC')
+    ]
+    margins = [f.result(timeout=5)['returnData']['margin'] for f in futures]
+    assert margins == [1, 2, 3]
+    assert connector.pending() == 0
+    connector.close()
+
+
+def test_concurrent_api_calls_share_one_connection():
+    server = BatchServer(batch=4)
+    api = XtbApi('127.0.0.1', server.port, connector=PlainPipelinedConnector)
+    api.connect()
+    symbols = ['A', 'BB', 'CCC', 'DDDD']
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(
+            lambda s: api.get_margin_trade(s, 1.0), symbols
+        ))
+    api.close()
+    assert all(isinstance(r, records.MarginTrade) for r in results)
+    assert [r.margin for r in results] == [1, 2, 3, 4]
+
+
+def test_error_response_fails_only_its_future():
+    server = BatchServer(batch=2)
+    connector = PlainPipelinedConnector()
+    connector.connect('127.0.0.1', server.port)
+    failing = connector.submit(command='getCalendar')
+    ok = connector.submit(command='getSymbol', arguments={'symbol': 'AB'})
+    with pytest.raises(XtbApiError, match='E1'):
+        failing.result(timeout=5)
+    assert ok.result(timeout=5)['returnData'] == {'margin': 2}
+    connector.close()
+
+
+def test_close_fails_pending_requests():
+    server = BatchServer(batch=10)
+    connector = PlainPipelinedConnector()
+    connector.connect('127.0.0.1', server.port)
+    future = connector.submit(command='getSymbol', arguments={'symbol': 'A'})
+    connector.close()
+    with pytest.raises(XtbSocketError):
+        future.result(timeout=5)
+
+
+def test_lost_connection_is_reported():
+    server = socket.create_server(('127.0.0.1', 0))
+    connector = PlainPipelinedConnector()
+    connector.connect('127.0.0.1', server.getsockname()[1])
+    server.accept()[0].close()
+    connector._reader.join(5)
+    assert not connector.is_connected()
+    with pytest.raises(XtbSocketError, match='lost'):
+        connector.submit(command='ping')
+    assert connector.pending() == 0
+    connector.close()
+    server.close()
+
+
+def test_connects_with_tls():
+    responses = build_responses(symbols=1, candles=1, trades=1)
+    with MockXtbServer(responses=responses) as server:
+        connector = PipelinedConnector(
+            rate_limiter=NoRateLimiter(), ssl_context=client_context(),
+            connect_timeout=5
+        )
+        connector.connect('localhost', server.port)
+        assert connector.handle_command(command='ping')['status']
+        connector.close()
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+from xtb.exceptions import XtbApiError, XtbSocketError
+from xtb.pool import XtbApiPool
+
+
+class FakeApi:
+    created = 0
+
+    def __init__(self) -> None:
+        FakeApi.created += 1
+        self.connected = False
+        self.logged_in = False
+        self.healthy = True
+
+    def connect(self) -> None:
+        self.connected = True
+
+    def login(self, user, password, app_name=None) -> dict:
+        self.logged_in = True
+        return {'status': True}
+
+    def ping(self) -> bool:
+        if not self.healthy:
+            raise XtbSocketError('broken')
+        return True
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    def close(self) -> None:
+        self.connected = False
+
+
+def make_pool(size: int = 2, **kwargs) -> XtbApiPool:
+    return XtbApiPool('user', 'password', size, api_factory=FakeApi, **kwargs)
+
+
+def test_sessions_are_logged_in_and_reused():
+    with make_pool() as pool:
+        with pool.session() as first:
+            assert first.logged_in
+        with pool.session() as second:
+            assert second is first
+        stats = pool.stats()
+    assert stats.acquisitions == 2
+    assert stats.idle == 2
+    assert stats.in_use == 0
+    assert not first.connected
+
+
+def test_broken_session_is_replaced():
+    with make_pool(size=1) as pool:
+        with pytest.raises(XtbSocketError):
+            with pool.session() as api:
+                raise XtbSocketError('connection lost')
+        assert not api.connected
+        with pool.session() as replacement:
+            assert replacement is not api
+            assert replacement.logged_in
+        assert pool.stats().replaced == 1
+
+
+def test_interrupted_session_is_replaced():
+    with make_pool(size=1) as pool:
+        with pytest.raises(KeyboardInterrupt):
+            with pool.session() as api:
+                raise KeyboardInterrupt
+        assert not api.connected
+        with pytest.raises(ValueError):
+            with pool.session() as second:
+                raise ValueError('bad response')
+        assert not second.connected
+        assert pool.stats().in_use == 0
+
+
+def test_session_is_kept_after_an_api_error():
+    with make_pool(size=1) as pool:
+        with pytest.raises(XtbApiError):
+            with pool.session() as api:
+                raise XtbApiError(code='BE001', description='Invalid')
+        with pool.session() as again:
+            assert again is api
+
+
+def test_unhealthy_session_is_replaced_on_acquire():
+    with make_pool(size=1, health_check_interval=0) as pool:
+        with pool.session() as api:
+            api.healthy = False
+        with pool.session() as replacement:
+            assert replacement is not api
+
+
+def test_acquire_times_out_when_saturated():
+    with make_pool(size=1) as pool:
+        with pool.session():
+            with pytest.raises(TimeoutError):
+                pool.acquire(timeout=0.01)
+
+
+def test_waiting_is_counted():
+    with make_pool(size=1) as pool:
+        api = pool.acquire()
+        timer = threading.Timer(0.05, pool.release, args=(api,))
+        timer.start()
+        started = time.monotonic()
+        with pool.session() as same:
+            assert same is api
+            assert time.monotonic() - started >= 0.04
+        stats = pool.stats()
+    assert stats.waits == 1
+    assert stats.max_wait_time > 0
+
+
+def test_use_after_close_raises():
+    pool = make_pool()
+    pool.open()
+    pool.close()
+    with pytest.raises(XtbSocketError):
+        pool.acquire()
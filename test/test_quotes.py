@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+from xtb import records
+from xtb.quotes import QuoteBook
+
+START = 1_640_995_200_000
+
+
+def make_tick(i, symbol='EURUSD', level=0):
+    return records.Tick.from_dict({
+        'ask': 1.1 + i, 'askVolume': 1000 + i, 'bid': 1.0 + i,
+        'bidVolume': 500.0 + i, 'high': 1.2, 'level': level, 'low': 1.0,
+        'spreadRaw': 0.1, 'spreadTable': 1.0, 'symbol': symbol,
+        'timestamp': START + i * 1000
+    })
+
+
+def test_latest_quote():
+    book = QuoteBook()
+    assert book.latest('EURUSD') is None
+    book.update_many([make_tick(0), make_tick(1), make_tick(2, 'US500')])
+    book.update(make_tick(9, level=1))
+    assert book.latest('EURUSD') == make_tick(1)
+    assert book.bid_ask('US500') == (3.0, pytest.approx(3.1))
+    assert sorted(book.symbols()) == ['EURUSD', 'US500']
+    assert 'US500' in book and len(book) == 2
+
+
+def test_history_wraps_around():
+    book = QuoteBook(history_size=4)
+    assert len(book.history('EURUSD').timestamps) == 0
+    for i in range(3):
+        book.update(make_tick(i))
+    assert list(book.history('EURUSD').bids) == [1.0, 2.0, 3.0]
+    for i in range(3, 10):
+        book.update(make_tick(i))
+    history = book.history('EURUSD')
+    assert list(history.bids) == [7.0, 8.0, 9.0, 10.0]
+    assert list(history.ask_volumes) == [1006, 1007, 1008, 1009]
+    assert list(book.history('EURUSD', last=2).bids) == [9.0, 10.0]
+    since = book.history('EURUSD', since=START + 8000)
+    assert list(since.timestamps) == [START + 8000, START + 9000]
+
+
+def test_concurrent_readers_see_consistent_history():
+    book = QuoteBook(history_size=8)
+    done = threading.Event()
+    errors = []
+
+    def read():
+        while not done.is_set():
+            history = book.history('EURUSD')
+            for timestamp, bid, ask in zip(
+                    history.timestamps, history.bids, history.asks):
+                i = (timestamp - START) // 1000
+                if bid != 1.0 + i or ask != 1.1 + i:
+                    errors.append(i)
+            if list(history.timestamps) != sorted(history.timestamps):
+                errors.append('order')
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    for i in range(20000):
+        book.update(make_tick(i))
+    done.set()
+    for reader in readers:
+        reader.join()
+    assert errors == []
@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+from xtb.ratelimit import (
+    IntervalRateLimiter, NoRateLimiter, RateLimiter, TokenBucketRateLimiter,
+    shared_rate_limiter
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 100.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_no_rate_limiter():
+    limiter = NoRateLimiter()
+    assert limiter.reserve() == 0.0
+    assert limiter.acquire() == 0.0
+
+
+def test_rate_limiter_requires_reserve():
+    class Incomplete(RateLimiter):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_interval_first_request_does_not_wait():
+    clock = FakeClock()
+    limiter = IntervalRateLimiter(0.2, clock=clock)
+    assert limiter.reserve() == 0.0
+
+
+def test_interval_waits_only_when_too_early():
+    clock = FakeClock()
+    limiter = IntervalRateLimiter(0.2, clock=clock)
+    limiter.reserve()
+    clock.now += 0.05
+    assert limiter.reserve() == pytest.approx(0.15)
+    clock.now += 1.0
+    assert limiter.reserve() == 0.0
+
+
+def test_interval_burst_is_spread():
+    clock = FakeClock()
+    limiter = IntervalRateLimiter(0.2, clock=clock)
+    delays = [limiter.reserve() for _ in range(4)]
+    assert delays == pytest.approx([0.0, 0.2, 0.4, 0.6])
+
+
+def test_token_bucket_allows_burst():
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(rate=5, burst=3, clock=clock)
+    delays = [limiter.reserve() for _ in range(5)]
+    assert delays == pytest.approx([0.0, 0.0, 0.0, 0.2, 0.4])
+
+
+def test_token_bucket_refills():
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(rate=5, burst=2, clock=clock)
+    limiter.reserve()
+    limiter.reserve()
+    clock.now += 0.2
+    assert limiter.reserve() == 0.0
+    assert limiter.reserve() == pytest.approx(0.2)
+
+
+def test_token_bucket_invalid_arguments():
+    with pytest.raises(ValueError):
+        TokenBucketRateLimiter(rate=0)
+
+
+def test_shared_rate_limiter_is_shared_per_key():
+    first = shared_rate_limiter('test-account-1')
+    assert shared_rate_limiter('test-account-1') is first
+    assert shared_rate_limiter('test-account-2') is not first
+
+
+def test_interval_reservations_are_thread_safe():
+    clock = FakeClock()
+    limiter = IntervalRateLimiter(0.2, clock=clock)
+    delays = []
+
+    def reserve():
+        for _ in range(100):
+            delays.append(limiter.reserve())
+
+    threads = [threading.Thread(target=reserve) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(round(d, 6) for d in delays) == \
+        [round(i * 0.2, 6) for i in range(400)]
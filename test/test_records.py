@@ -0,0 +1,145 @@
+import pytest
+from xtb import records
+
+SYMBOLS = [
+    {
+        'ask': 4.0, 'bid': 3.9, 'categoryName': 'FX', 'contractSize': 100000,
+        'currency': 'EUR', 'currencyPair': True, 'currencyProfit': 'PLN',
+        'description': 'Euro to Polish Zloty', 'expiration': None,
+        'groupName': 'Minor', 'high': 4.1, 'initialMargin': 0,
+        'instantMaxVolume': 0, 'leverage': 1.5, 'longOnly': False,
+        'lotMax': 10.0, 'lotMin': 0.1, 'lotStep': 0.1, 'low': 3.8,
+        'marginHedged': 0, 'marginHedgedStrong': False,
+        'marginMaintenance': 0, 'marginMode': 101, 'percentage': 100.0,
+        'pipsPrecision': 4, 'precision': 5, 'profitMode': 5, 'quoteId': 1,
+        'shortSelling': True, 'spreadRaw': 0.0002, 'spreadTable': 2.0,
+        'starting': None, 'stepRuleId': 1, 'stopsLevel': 0,
+        'swap_rollover3days': 0, 'swapEnable': True, 'swapLong': -2.5,
+        'swapShort': 0.5, 'swapType': 0, 'symbol': name,
+        'tickSize': 1.0, 'tickValue': 14.0, 'time': 1272446136891,
+        'timeString': 'Thu May 23 12:23:44 EDT 2013',
+        'trailingEnabled': True, 'type': 21
+    }
+    for name in ('EURPLN', 'EURUSD', 'USDPLN')
+]
+
+
+def test_lazy_collection_creates_records_on_access():
+    raw = [dict(item) for item in SYMBOLS]
+    raw[2]['contractSize'] = 'not a number'
+    symbols = records.Symbol.create_collection_from(raw, lazy=True)
+    assert len(symbols) == 3
+    assert symbols[0].symbol == 'EURPLN'
+    assert symbols[-2].symbol == 'EURUSD'
+    with pytest.raises(ValueError):
+        symbols[2]
+
+
+def test_lazy_collection_caches_records():
+    symbols = records.Symbol.create_collection_from(SYMBOLS, lazy=True)
+    assert symbols[1] is symbols[1]
+    assert [s.symbol for s in symbols] == ['EURPLN', 'EURUSD', 'USDPLN']
+    assert [s.symbol for s in symbols[1:]] == ['EURUSD', 'USDPLN']
+    with pytest.raises(IndexError):
+        symbols[3]
+
+
+def test_lazy_collection_lookup_by_key():
+    symbols = records.Symbol.create_collection_from(
+        SYMBOLS, lazy=True, key='symbol'
+    )
+    assert symbols.get('USDPLN').symbol == 'USDPLN'
+    assert symbols.get('GBPUSD') is None
+
+
+def test_lazy_collection_lookup_requires_key():
+    symbols = records.Symbol.create_collection_from(SYMBOLS, lazy=True)
+    with pytest.raises(ValueError):
+        symbols.get('EURPLN')
+
+
+def test_eager_collection():
+    symbols = records.Symbol.create_collection_from(SYMBOLS)
+    assert isinstance(symbols, list)
+    assert all(isinstance(s, records.Symbol) for s in symbols)
+
+
+STEP_RULE = {
+    'id': 1, 'name': 'Forex',
+    'steps': [
+        {'fromValue': 0.1, 'step': 0.0025},
+        {'fromValue': 1, 'step': 0.01}
+    ]
+}
+
+TRADING_HOURS = {
+    'symbol': 'EURPLN',
+    'quotes': [{'day': 2, 'fromT': 63000000, 'toT': 63300000}],
+    'trading': [{'day': 2, 'fromT': 63000000, 'toT': 63300000}]
+}
+
+TRADE = {
+    'close_price': 1.3256, 'close_time': None, 'closed': False, 'cmd': 0,
+    'comment': 'Web Trader', 'commission': 0.0, 'customComment': 'Some text',
+    'digits': 4, 'expiration': None, 'expirationString': None,
+    'margin_rate': 0.0, 'offset': 0, 'open_price': 1.4,
+    'open_time': 1272380927000, 'open_timeString': 'Fri Jan 11 10:03:36 CET',
+    'order': 7497776, 'order2': 1234567, 'position': 1234567,
+    'profit': -2196.44, 'sl': 0.0, 'storage': -4.46, 'symbol': 'EURUSD',
+    'timestamp': 1272540251000, 'tp': 0.0, 'volume': 0.1
+}
+
+
+def test_trusted_mode_applies_aliases_without_coercion():
+    trade = records.Trade.from_dict(TRADE, records.DecodeMode.TRUSTED)
+    assert isinstance(trade, records.Trade)
+    assert trade.custom_comment == 'Some text'
+    assert trade.open_time_string == 'Fri Jan 11 10:03:36 CET'
+    assert trade.open_time == 1272380927000
+    assert trade.order == 7497776
+
+
+def test_trusted_mode_fills_field_defaults():
+    raw = {
+        key: value for key, value in TRADE.items()
+        if key not in ('sl', 'customComment', 'expirationString')
+    }
+    validated = records.Trade.from_dict(raw)
+    trusted = records.Trade.from_dict(raw, records.DecodeMode.TRUSTED)
+    assert trusted.sl == validated.sl == 0
+    assert trusted.custom_comment is validated.custom_comment is None
+    assert trusted.expiration_string is None
+    assert 'sl' not in trusted.__fields_set__
+
+
+def test_trusted_mode_builds_nested_records():
+    rule = records.StepRule.from_dict(STEP_RULE, records.DecodeMode.TRUSTED)
+    assert all(isinstance(step, records.Step) for step in rule.steps)
+    assert [step.from_value for step in rule.steps] == [0.1, 1]
+
+    hours = records.TradingHours.from_dict(
+        TRADING_HOURS, records.DecodeMode.TRUSTED
+    )
+    assert isinstance(hours.quotes[0], records.Quotes)
+    assert hours.quotes[0].from_t == 63000000
+
+
+def test_trusted_record_matches_validated_fields():
+    validated = records.StepRule.from_dict(STEP_RULE)
+    trusted = records.StepRule.from_dict(
+        STEP_RULE, records.DecodeMode.TRUSTED
+    )
+    assert trusted.dict() == validated.dict()
+
+
+def test_raw_mode_returns_dictionaries():
+    mode = records.DecodeMode.RAW
+    assert records.Trade.from_dict(TRADE, mode) is TRADE
+    assert records.Trade.create_collection_from([TRADE], mode=mode) == [TRADE]
+
+
+def test_lazy_collection_uses_decode_mode():
+    trades = records.Trade.create_collection_from(
+        [TRADE], lazy=True, key='order', mode=records.DecodeMode.TRUSTED
+    )
+    assert trades.get(7497776).open_time == 1272380927000
@@ -0,0 +1,149 @@
+import functools
+import json
+import socket
+import threading
+
+import pytest
+from benchmarks.mock_server import (
+    MockXtbServer, build_responses, client_context
+)
+from xtb import XtbApi
+from xtb.exceptions import XtbApiError, XtbReplayError
+from xtb.ratelimit import NoRateLimiter
+from xtb.replay import RecordingConnector, ReplayConnector
+
+SERVER_TIMES = iter(range(1_640_995_200_000, 1_640_995_300_000, 1000))
+
+
+class PlainRecordingConnector(RecordingConnector):
+    def _wrap_socket(self, s):
+        return s
+
+
+def respond(request: dict) -> dict:
+    command = request['command']
+    if command == 'login':
+        return {'status': True, 'streamSessionId': 'abc'}
+    if command == 'logout':
+        return {'status': True}
+    if command == 'getServerTime':
+        return {
+            'status': True,
+            'returnData': {'time': next(SERVER_TIMES), 'timeString': ''}
+        }
+    if command == 'getMarginTrade':
+        volume = request['arguments']['volume']
+        return {'status': True, 'returnData': {'margin': volume * 100}}
+    if command == 'getNews':
+        return {'status': True, 'returnData': [{
+            'body': 'x' * 10_000, 'bodylen': 10_000, 'key': 'k',
+            'time': 1_640_995_200_000, 'timeString': '', 'title': 'Big'
+        }]}
+    return {'status': False, 'errorCode': 'BE005', 'errorDescr': 'Nope'}
+
+
+def serve(server: socket.socket) -> None:
+    conn, _ = server.accept()
+    decoder = json.JSONDecoder()
+    buffer = ''
+    with conn:
+        while True:
+            data = conn.recv(65536)
+            if not data:
+                break
+            buffer += data.decode()
+            while buffer:
+                try:
+                    request, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    break
+                buffer = buffer[end:]
+                response = json.dumps(respond(request)).encode()
+                conn.sendall(response + b'\n\n')
+    server.close()
+
+
+def record_session(path) -> list:
+    server = socket.create_server(('127.0.0.1', 0))
+    threading.Thread(target=serve, args=(server,), daemon=True).start()
+    api = XtbApi(
+        '127.0.0.1', server.getsockname()[1],
+        connector=functools.partial(PlainRecordingConnector, path=path),
+        rate_limiter=NoRateLimiter()
+    )
+    with api:
+        api.login('user', 'secret')
+        results = [
+            api.get_server_time(), api.get_server_time(),
+            api.get_margin_trade('EURUSD', 1.0),
+            api.get_margin_trade('EURUSD', 2.0),
+            api.get_news(0, 1),
+        ]
+        with pytest.raises(XtbApiError):
+            api.get_calendar()
+    return results
+
+
+def replay_api(path, **kwargs) -> XtbApi:
+    return XtbApi(
+        connector=functools.partial(ReplayConnector, path=path, **kwargs)
+    )
+
+
+def test_replays_recorded_session(tmp_path):
+    path = str(tmp_path / 'session.xrec')
+    recorded = record_session(path)
+    assert b'secret' not in (tmp_path / 'session.xrec').read_bytes()
+
+    for _ in range(2):
+        with replay_api(path) as api:
+            assert api.login('other', 'password')['streamSessionId'] == 'abc'
+            replayed = [
+                api.get_server_time(), api.get_server_time(),
+                api.get_margin_trade('EURUSD', 1.0),
+                api.get_margin_trade('EURUSD', 2.0),
+                api.get_news(0, 1),
+            ]
+            with pytest.raises(XtbApiError):
+                api.get_calendar()
+        assert replayed == recorded
+    assert recorded[0] != recorded[1]
+
+
+def test_unrecorded_and_exhausted_requests(tmp_path):
+    path = str(tmp_path / 'session.xrec')
+    recorded = record_session(path)
+
+    with replay_api(path) as api:
+        with pytest.raises(XtbReplayError):
+            api.get_margin_trade('EURUSD', 3.0)
+        for _ in range(3):
+            last = api.get_server_time()
+        assert last == recorded[1]
+
+    with replay_api(path, strict=True) as api:
+        api.get_server_time()
+        api.get_server_time()
+        with pytest.raises(XtbReplayError):
+            api.get_server_time()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'not a recording')
+    with pytest.raises(ValueError):
+        ReplayConnector(path=str(path))
+
+
+def test_records_over_tls(tmp_path):
+    path = str(tmp_path / 'session.xrec')
+    responses = build_responses(symbols=1, candles=1, trades=1)
+    with MockXtbServer(responses=responses) as server:
+        api = XtbApi('localhost', server.port, connector=functools.partial(
+            RecordingConnector, path=path, rate_limiter=NoRateLimiter(),
+            ssl_context=client_context()
+        ))
+        with api:
+            recorded = api.get_version()
+    with replay_api(path) as api:
+        assert api.get_version() == recorded
@@ -0,0 +1,163 @@
+import json
+import socket
+import threading
+from typing import List
+
+import pytest
+from benchmarks.mock_server import (
+    MockXtbServer, build_responses, client_context
+)
+from xtb import records
+from xtb.connector import ConnectCache
+from xtb.exceptions import XtbApiError
+from xtb.ratelimit import NoRateLimiter
+from xtb.streaming import StreamingClient
+
+
+def tick(symbol: str, bid: float) -> dict:
+    return {
+        'command': 'tickPrices',
+        'data': {
+            'ask': bid + 0.1, 'askVolume': 1000, 'bid': bid,
+            'bidVolume': 1000, 'high': 5.0, 'level': 0, 'low': 1.0,
+            'quoteId': 1, 'spreadRaw': 0.1, 'spreadTable': 1.0,
+            'symbol': symbol, 'timestamp': 1272529161605
+        }
+    }
+
+
+class PlainStreamingClient(StreamingClient):
+    def _wrap_socket(self, s):
+        return s
+
+
+class StreamServer:
+    """
+    Accepts a single client, records its commands and answers every
+    subscription with the given messages
+    """
+
+    def __init__(self, messages: List[dict]) -> None:
+        self.messages = messages
+        self.commands: List[dict] = []
+        self._server = socket.create_server(('127.0.0.1', 0))
+        self.port = self._server.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self) -> None:
+        conn, _ = self._server.accept()
+        decoder = json.JSONDecoder()
+        buffer = ''
+        with conn:
+            while True:
+                data = conn.recv(4096)
+                if not data:
+                    break
+                buffer += data.decode()
+                while buffer:
+                    try:
+                        command, end = decoder.raw_decode(buffer)
+                    except ValueError:
+                        break
+                    buffer = buffer[end:]
+                    self.commands.append(command)
+                    if not command['command'].startswith('get'):
+                        continue
+                    for message in self.messages:
+                        conn.sendall(json.dumps(message).encode() + b'\n\n')
+        self._server.close()
+
+
+def client_for(server: StreamServer) -> StreamingClient:
+    return PlainStreamingClient(
+        'session', host='127.0.0.1', port=server.port,
+        rate_limiter=NoRateLimiter()
+    )
+
+
+def test_subscription_yields_records():
+    server = StreamServer([tick('EURUSD', 1.1), tick('EURUSD', 1.2)])
+    with client_for(server) as client:
+        subscription = client.subscribe_tick_prices('EURUSD', max_level=0)
+        first = subscription.get(timeout=5)
+        second = subscription.get(timeout=5)
+        subscription.close()
+        assert list(subscription) == []
+    assert isinstance(first, records.Tick)
+    assert [first.bid, second.bid] == [1.1, 1.2]
+    assert server.commands[0] == {
+        'command': 'getTickPrices', 'streamSessionId': 'session',
+        'symbol': 'EURUSD', 'maxLevel': 0
+    }
+
+
+def test_subscription_filters_by_symbol_and_calls_back():
+    server = StreamServer([tick('EURPLN', 4.5), tick('EURUSD', 1.1)])
+    received = []
+    done = threading.Event()
+
+    def on_tick(record):
+        received.append(record)
+        done.set()
+
+    with client_for(server) as client:
+        client.subscribe_tick_prices('EURUSD', callback=on_tick)
+        assert done.wait(5)
+    assert [r.symbol for r in received] == ['EURUSD']
+
+
+def test_error_message_ends_subscriptions():
+    server = StreamServer([
+        {'status': False, 'errorCode': 'BE005', 'errorDescr': 'Bad session'}
+    ])
+    with client_for(server) as client:
+        subscription = client.subscribe_balance()
+        with pytest.raises(XtbApiError, match='BE005'):
+            subscription.get(timeout=5)
+
+
+def test_closing_the_client_ends_iteration():
+    server = StreamServer([])
+    client = client_for(server)
+    client.connect()
+    subscription = client.subscribe_keep_alive()
+    client.close()
+    assert list(subscription) == []
+
+
+def test_failing_callbacks_and_bad_updates_keep_the_reader_running():
+    bad = tick('EURUSD', 1.0)
+    del bad['data']['bid']
+    server = StreamServer([tick('EURUSD', 1.1), bad, tick('EURUSD', 1.2)])
+    received = []
+    done = threading.Event()
+
+    def on_tick(record):
+        if record.bid == 1.1:
+            raise RuntimeError('callback failed')
+        received.append(record)
+        done.set()
+
+    with client_for(server) as client:
+        client.subscribe_tick_prices('EURUSD', callback=on_tick)
+        assert done.wait(5)
+    assert [r.bid for r in received] == [1.2]
+    assert client.dispatch_errors == 2
+
+
+def test_connects_through_the_shared_connect_path():
+    cache = ConnectCache()
+    responses = build_responses(symbols=1, candles=1, trades=1)
+    with MockXtbServer(responses=responses) as server:
+        client = StreamingClient(
+            'session', host='localhost', port=server.port,
+            rate_limiter=NoRateLimiter(), ssl_context=client_context(),
+            connect_cache=cache, connect_timeout=5
+        )
+        with client:
+            client.ping()
+            sock = client._socket
+            assert sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+            assert sock.version() is not None
+    assert ('localhost', server.port) in cache._addresses
@@ -0,0 +1,117 @@
+import pytest
+from xtb import records
+from xtb.tick_store import TickReader, TickRecorder
+
+START = 1_640_995_200_000
+
+
+def make_tick(i, symbol='EURUSD'):
+    return {
+        'ask': 1.1 + i / 1e5, 'askVolume': 1000 + i, 'bid': 1.0999,
+        'bidVolume': 500.0, 'high': 1.2, 'level': 0, 'low': 1.0,
+        'spreadRaw': 0.0001, 'spreadTable': 1.0, 'symbol': symbol,
+        'timestamp': START + i * 1000
+    }
+
+
+@pytest.fixture(params=[None, 'zlib'])
+def tick_file(request, tmp_path):
+    path = str(tmp_path / 'ticks.bin')
+    with TickRecorder(path, chunk_ticks=10, compression=request.param) \
+            as recorder:
+        for i in range(35):
+            symbol = 'EURUSD' if i % 2 else 'US500'
+            recorder.record(records.Tick.from_dict(make_tick(i, symbol)))
+    assert recorder.written == 35
+    assert recorder.chunks == 4
+    return path
+
+
+def test_read_back_all_ticks(tick_file):
+    with TickReader(tick_file) as reader:
+        assert len(reader) == 35
+        ticks = list(reader.ticks())
+    assert ticks[0] == records.Tick.from_dict(make_tick(0, 'US500'))
+    assert ticks[7] == records.Tick.from_dict(make_tick(7, 'EURUSD'))
+
+
+def test_seek_by_timestamp(tick_file):
+    with TickReader(tick_file) as reader:
+        raw = list(reader.ticks(
+            start=START + 12_000, end=START + 21_000,
+            mode=records.DecodeMode.RAW
+        ))
+        eurusd = list(reader.ticks(
+            start=START + 30_000, symbols=['EURUSD'],
+            mode=records.DecodeMode.RAW
+        ))
+    assert [t['timestamp'] for t in raw] == [
+        START + i * 1000 for i in range(12, 22)
+    ]
+    assert [t['timestamp'] for t in eurusd] == [
+        START + 31_000, START + 33_000
+    ]
+
+
+def test_blocks(tick_file):
+    pytest.importorskip('numpy')
+    with TickReader(tick_file) as reader:
+        blocks = list(reader.blocks(start=START + 25_000))
+    assert [len(b['timestamp']) for b in blocks] == [5, 5]
+    assert blocks[0]['symbol'].tolist() == [
+        'EURUSD', 'US500', 'EURUSD', 'US500', 'EURUSD'
+    ]
+    assert blocks[1]['ask_volume'].tolist() == list(range(1030, 1035))
+
+
+def test_appends_and_ignores_a_truncated_chunk(tmp_path):
+    path = str(tmp_path / 'ticks.bin')
+    for part in range(2):
+        with TickRecorder(path) as recorder:
+            recorder.record_many(
+                make_tick(part * 5 + i) for i in range(5)
+            )
+    with open(path, 'ab') as f:
+        f.write(b'\x00' * 10)
+    with TickReader(path) as reader:
+        assert len(reader.chunks) == 2
+        assert len(list(reader.ticks())) == 10
+
+
+def test_appending_cuts_off_a_truncated_chunk(tmp_path):
+    path = tmp_path / 'ticks.bin'
+    with TickRecorder(str(path), chunk_ticks=10) as recorder:
+        recorder.record_many(make_tick(i) for i in range(20))
+    path.write_bytes(path.read_bytes()[:-25])
+    with TickRecorder(str(path)) as recorder:
+        recorder.record_many(make_tick(i) for i in range(100, 110))
+    with TickReader(str(path)) as reader:
+        ticks = list(reader.ticks(mode=records.DecodeMode.RAW))
+    assert ticks == [make_tick(i) for i in range(10)] + [
+        make_tick(i) for i in range(100, 110)
+    ]
+
+
+def test_recorder_rejects_unknown_files(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'something else')
+    with pytest.raises(ValueError):
+        TickRecorder(str(path))
+    assert path.read_bytes() == b'something else'
+
+
+def test_flush_writes_pending_ticks(tmp_path):
+    path = str(tmp_path / 'ticks.bin')
+    recorder = TickRecorder(path, flush_interval=60)
+    recorder.record(make_tick(0))
+    recorder.flush(timeout=5)
+    with TickReader(path) as reader:
+        assert len(reader) == 1
+    recorder.close()
+
+
+def test_rejects_unknown_files(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'something else')
+    with pytest.raises(ValueError):
+        TickReader(str(path))
@@ -0,0 +1,79 @@
+import pytest
+from xtb import records
+from xtb.trade_store import TradeStore
+
+HOUR = 3_600_000
+START = 1_640_995_200_000
+
+
+def trade(order: int, close_time: int, profit: float = 1.0) -> dict:
+    return {
+        'close_price': 1.1, 'close_time': close_time,
+        'close_timeString': None, 'closed': True, 'cmd': 0,
+        'comment': '', 'commission': 0.0, 'customComment': None,
+        'digits': 5, 'expiration': None, 'expirationString': None,
+        'margin_rate': 0.0, 'offset': 0, 'open_price': 1.0,
+        'open_time': close_time - HOUR, 'open_timeString': '',
+        'order': order, 'order2': order + 1, 'position': order,
+        'profit': profit, 'sl': 0.0, 'storage': 0.0,
+        'symbol': 'EURUSD' if order % 2 else 'US500',
+        'timestamp': close_time, 'tp': 0.0, 'volume': 0.1
+    }
+
+
+class FakeApi:
+    def __init__(self, trades) -> None:
+        self.trades = trades
+        self.requests = []
+
+    def get_trades_history(self, *, start, end, lazy=False):
+        self.requests.append((start, end))
+        return records.Trade.create_collection_from(
+            [t for t in self.trades if start <= t['close_time'] <= end],
+            lazy=lazy, key='order'
+        )
+
+
+def test_sync_fetches_only_since_the_watermark(tmp_path):
+    path = str(tmp_path / 'trades.db')
+    api = FakeApi([trade(i, START + i * HOUR) for i in range(1, 6)])
+    with TradeStore(path, overlap=HOUR) as store:
+        with pytest.raises(ValueError):
+            store.sync(api)
+        first = store.sync(api, since=START, end=START + 5 * HOUR)
+        assert (first.fetched, first.inserted, first.updated) == (5, 5, 0)
+        assert store.watermark == START + 5 * HOUR
+
+    api.trades[4] = trade(5, START + 5 * HOUR, profit=2.0)
+    api.trades.append(trade(6, START + 6 * HOUR))
+    with TradeStore(path, overlap=HOUR) as store:
+        second = store.sync(api, end=START + 6 * HOUR)
+        assert api.requests[-1] == (START + 4 * HOUR, START + 6 * HOUR)
+        assert (second.fetched, second.inserted, second.updated) == \
+            (3, 1, 1)
+        assert len(store) == 6
+        assert store.get(5).profit == 2.0
+        assert store.get(42) is None
+
+
+def test_history_queries():
+    api = FakeApi([trade(i, START + i * HOUR) for i in range(1, 11)])
+    store = TradeStore(':memory:')
+    store.sync(api, since=START, end=START + 10 * HOUR)
+
+    history = store.history(start=START + 3 * HOUR, end=START + 6 * HOUR)
+    assert [t.order for t in history] == [3, 4, 5, 6]
+    assert [t.order for t in store.history(symbol='US500')] == \
+        [2, 4, 6, 8, 10]
+    assert [t.order for t in store.history(position=7)] == [7]
+    lazy = store.history(lazy=True)
+    assert isinstance(lazy, records.LazyRecordList)
+    assert lazy.get(9).close_price == 1.1
+    store.close()
+
+
+def test_raw_decode_mode():
+    store = TradeStore(':memory:', decode_mode=records.DecodeMode.RAW)
+    assert store.upsert([trade(1, START), trade(2, START)]) == (2, 0)
+    assert store.upsert([trade(1, START), trade(2, START, 5.0)]) == (0, 1)
+    assert store.history()[1]['profit'] == 5.0
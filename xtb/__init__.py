@@ -1,23 +1,44 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Type
+import time
+from typing import Any, Optional, Type
 
 from xtb import records
+from xtb.async_api import AsyncXtbApi
+from xtb.base_api import BaseXtbApi, Request
+from xtb.cache import ResponseCache
+from xtb.codec import JsonCodec
 from xtb.connector import SyncConnector
 from xtb.exceptions import XtbApiError, XtbSocketError
+from xtb.metrics import Metrics
+from xtb.ratelimit import RateLimiter
+from xtb.streaming import StreamingClient
 
 
-class XtbApi:
+class XtbApi(BaseXtbApi):
+    """
+    Client for the xAPI request port, the commands are defined in
+    xtb.base_api.BaseXtbApi
+    """
+
     def __init__(
             self,
             host: str = 'xapi.xtb.com',
             port: int = 5124,
-            connector: Type[SyncConnector] = SyncConnector
+            connector: Type[SyncConnector] = SyncConnector,
+            rate_limiter: Optional[RateLimiter] = None,
+            codec: Optional[JsonCodec] = None,
+            decode_mode: records.DecodeMode = records.DecodeMode.VALIDATE,
+            cache: Optional[ResponseCache] = None,
+            metrics: Optional[Metrics] = None
     ) -> None:
-        self._host = host
-        self._port = port
-        self._is_logged_in = False
-        self._connector = connector()
+        """
+        See BaseXtbApi for the options
+        """
+        super().__init__(
+            host, port, connector, rate_limiter=rate_limiter, codec=codec,
+            decode_mode=decode_mode, cache=cache, metrics=metrics
+        )
 
     def __enter__(self) -> XtbApi:
         self.connect()
@@ -41,306 +62,40 @@ class XtbApi:
         Raises:
             XtbSocketError if close() was called before connect()
         """
-        if self.is_connected() and self._is_logged_in:
-            self.logout()
-        self._connector.close()
-
-    def is_connected(self) -> bool:
-        return self._connector.is_connected()
-
-    def login(
-            self,
-            user: str,
-            password: str,
-            app_name: Optional[str] = None
-    ) -> Dict[str, Any]:
-        """
-        Logins the user.
-        See http://developers.xstore.pro/documentation/#login
-        """
-        args = {'userId': user, 'password': password}
-        if app_name is not None:
-            args['appName'] = app_name
-        response = self._handle_command('login', arguments=args)
-        self._is_logged_in = True
-        return response
-
-    def logout(self) -> Dict[str, bool]:
-        """
-        Logouts the user.
-        See http://developers.xstore.pro/documentation/#logout
-        """
-        response = self._handle_command('logout')
-        self._is_logged_in = False
-        return response
-
-    def get_all_symbols(self) -> List[records.Symbol]:
-        """
-        Returns array of symbols available for the user.
-        See http://developers.xstore.pro/documentation/#getAllSymbols
-        """
-        response = self._handle_command('getAllSymbols')
-        return records.Symbol.create_collection_from(response['returnData'])
-
-    def get_calendar(self) -> List[records.Calendar]:
-        """
-        Returns calendar with market events
-        See http://developers.xstore.pro/documentation/#getCalendar
-        """
-        response = self._handle_command('getCalendar')
-        return records.Calendar.create_collection_from(response['returnData'])
-
-    def get_chart_last_request(
-            self,
-            period: int,
-            start: int,
-            symbol: str
-    ) -> records.ChartResponse:
-        """
-        Returns chart info from start date to current time.
-        Note that the streaming equivalent of this function is preferred.
-        See http://developers.xstore.pro/documentation/#getChartLastRequest
-        """
-        # TODO: Possible values for period field via enum
-        args = {
-            'info': {'period': period, 'start': start, 'symbol': symbol}
-        }
-        response = self._handle_command('getChartLastRequest', arguments=args)
-        return records.ChartResponse.from_dict(response['returnData'])
-
-    def get_chart_range_request(
-            self,
-            end: int,
-            period: int,
-            start: int,
-            symbol: str,
-            ticks: int
-    ) -> records.ChartResponse:
-        """
-        Returns chart info with data between given start and end dates
-        Note that the streaming equivalent of this function is preferred.
-        See http://developers.xstore.pro/documentation/#getChartRangeRequest
-        """
-        args = {
-            'info': {
-                'end': end, 'period': period, 'start': start,
-                'symbol': symbol, 'ticks': ticks
-            }
-        }
-        response = self._handle_command('getChartRangeRequest', arguments=args)
-        return records.ChartResponse.from_dict(response['returnData'])
-
-    def get_commission_def(
-            self,
-            symbol: str,
-            volume: float
-    ) -> records.Commission:
-        """
-        Returns calculation of commission and rate of exchange.
-        See http://developers.xstore.pro/documentation/#getCommissionDef
-        """
-        args = {'symbol': symbol, 'volume': volume}
-        response = self._handle_command('getCommissionDef', arguments=args)
-        return records.Commission.from_dict(response['returnData'])
-
-    def get_current_user_data(self) -> records.User:
-        """
-        Returns information about account currency, and account leverage.
-        See http://developers.xstore.pro/documentation/#getCurrentUserData
-        """
-        response = self._handle_command('getCurrentUserData')
-        return records.User.from_dict(response['returnData'])
-
-    def get_margin_level(self):
-        """
-        Returns various account indicators.
-        Note that the streaming equivalent of this function is preferred.
-        See http://developers.xstore.pro/documentation/#getMarginLevel
-        """
-        response = self._handle_command('getMarginLevel')
-        return records.MarginLevel.from_dict(response['returnData'])
-
-    def get_margin_trade(
-            self,
-            symbol: str,
-            volume: float
-    ) -> records.MarginTrade:
-        """
-        Returns expected margin for given instrument and volume.
-        See http://developers.xstore.pro/documentation/#getMarginTrade
-        """
-        args = {'symbol': symbol, 'volume': volume}
-        resp = self._handle_command('getMarginTrade', arguments=args)
-        return records.MarginTrade.from_dict(resp['returnData'])
-
-    def get_news(self, start: int, end: int) -> List[records.News]:
-        """
-        Returns news from trading server which were sent within specified
-        period of time.
-        Note that the streaming equivalent of this function is preferred.
-        See http://developers.xstore.pro/documentation/#getNews
-        """
-        args = {'end': end, 'start': start}
-        resp = self._handle_command('getNews', arguments=args)
-        return records.News.create_collection_from(resp['returnData'])
-
-    def get_profit_calculation(
-            self,
-            *,
-            close_price: float,
-            cmd: int,
-            open_price: float,
-            symbol: str,
-            volume: float
-    ) -> records.ProfitCalculation:
-        """
-        Calculates estimated profit for given deal data
-        See http://developers.xstore.pro/documentation/#getProfitCalculation
-        """
-        args = {
-            'closePrice': close_price, 'cmd': cmd, 'openPrice': open_price,
-            'symbol': symbol, 'volume': volume
-        }
-        response = self._handle_command('getProfitCalculation', arguments=args)
-        return records.ProfitCalculation.from_dict(response['returnData'])
-
-    def get_server_time(self) -> records.ServerTime:
-        """
-        Returns current time on trading server.
-        See http://developers.xstore.pro/documentation/#getServerTime
-        """
-        response = self._handle_command('getServerTime')
-        return records.ServerTime.from_dict(response['returnData'])
-
-    def get_step_rules(self) -> List[records.StepRule]:
-        """
-        Returns a list of step rules for DMAs
-        See http://developers.xstore.pro/documentation/#getStepRules
-        """
-        response = self._handle_command('getStepRules')
-        return records.StepRule.create_collection_from(response['returnData'])
-
-    def get_symbol(self, symbol: str) -> records.Symbol:
-        """
-        Returns information about symbol available for the user.
-        See http://developers.xstore.pro/documentation/#getSymbol
-        """
-        args = {'symbol': symbol}
-        response = self._handle_command('getSymbol', arguments=args)
-        return records.Symbol.from_dict(response['returnData'])
-
-    def get_tick_prices(
-            self,
-            *,
-            level: int,
-            symbols: List[str],
-            timestamp: int
-    ) -> records.TickPrices:
-        """
-        Returns array of current quotations for given symbols
-        Note that the streaming equivalent of this function is preferred.
-        See http://developers.xstore.pro/documentation/#getTickPrices
-        """
-        args = {
-            'level': level, 'symbols': symbols, 'timestamp': timestamp
-        }
-        response = self._handle_command('getTickPrices', arguments=args)
-        return records.TickPrices.from_dict(response['returnData'])
-
-    def get_trade_records(self, *, orders: List[int]) -> List[records.Trade]:
-        """
-        Returns trades listed in orders argument
-        See http://developers.xstore.pro/documentation/#getTradeRecords
-        """
-        args = {'orders': orders}
-        response = self._handle_command('getTradeRecords', arguments=args)
-        return records.Trade.create_collection_from(response['returnData'])
-
-    def get_trades(self, *, opened_only: bool = False) -> List[records.Trade]:
-        """
-        Returns all users trades.
-        Note that the streaming equivalent of this function is preferred.
-        See http://developers.xstore.pro/documentation/#getTrades
-        """
-        args = {'openedOnly': opened_only}
-        response = self._handle_command('getTrades', arguments=args)
-        return records.Trade.create_collection_from(response['returnData'])
+        try:
+            if self.is_connected() and self._is_logged_in:
+                self.logout()
+        finally:
+            self._connector.close()
 
-    def get_trades_history(
+    def create_streaming_client(
             self,
-            *,
-            start: int,
-            end: int
-    ) -> List[records.Trade]:
+            port: Optional[int] = None
+    ) -> StreamingClient:
         """
-        Returns users trades which were closed within specified period of time.
-        Note that the streaming equivalent of this function is preferred.
-        See http://developers.xstore.pro/documentation/#getTradesHistory
-        """
-        args = {'start': start, 'end': end}
-        response = self._handle_command('getTradesHistory', arguments=args)
-        return records.Trade.create_collection_from(response['returnData'])
-
-    def get_trading_hours(
-            self,
-            *,
-            symbols: List[str]
-    ) -> List[records.TradingHours]:
-        """
-        Returns quotes and trading times.
-        See http://developers.xstore.pro/documentation/#getTradingHours
-        """
-        args = {'symbols': symbols}
-        response = self._handle_command('getTradingHours', arguments=args)
-        return records.TradingHours.create_collection_from(response['returnData'])
-
-    def get_version(self) -> records.Version:
-        """
-        Returns the current API version
-        See http://developers.xstore.pro/documentation/#getVersion
-        """
-        response = self._handle_command('getVersion')
-        return records.Version.from_dict(response['returnData'])
-
-    def ping(self) -> bool:
-        """
-        Refreshes the internal state of the system
-        See http://developers.xstore.pro/documentation/#ping
-        """
-        return self._handle_command('ping').get('status', False)
-
-    def trade_transaction(
-            self,
-            *,
-            trade_info: records.TradeInfo
-    ) -> records.TradeOrder:
-        """
-        Starts the transaction.
-        See http://developers.xstore.pro/documentation/#tradeTransaction
-        """
-        args = trade_info.dict()
-        response = self._handle_command('tradeTransaction', arguments=args)
-        return records.TradeOrder.from_dict(response['returnData'])
-
-    def trade_transaction_status(
-            self,
-            *,
-            order: int
-    ) -> records.TradeStatus:
-        """
-        Returns current transaction status
-        Note that the streaming equivalent of this function is preferred.
-        See http://developers.xstore.pro/documentation/#tradeTransactionStatus
-        """
-        args = {'order': order}
-        resp = self._handle_command('tradeTransactionStatus', arguments=args)
-        return records.TradeStatus.from_dict(resp)
-
-    def _handle_command(
-            self, 
-            command: str, 
-            arguments: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, Any]:
-        return self._connector.handle_command(
-            command=command, arguments=arguments
-        )
+        Returns a not yet connected StreamingClient for the logged in user.
+        The streaming port defaults to the port following the request port
+        (5125 for the demo and 5113 for the real server).
+        Raises:
+            XtbSocketError if login() was not called
+        """
+        if self._stream_session_id is None:
+            raise XtbSocketError(
+                'Tried to create a streaming client without calling login()'
+            )
+        if port is None:
+            port = self._port + 1
+        return StreamingClient(self._stream_session_id, self._host, port)
+
+    def _execute(self, request: Request) -> Any:
+        started = time.perf_counter()
+        try:
+            response = self._cached_response(request)
+            if response is None:
+                response = self._connector.handle_command(
+                    command=request.command, arguments=request.arguments
+                )
+                self._store_response(request, response)
+            return self._result(request, response)
+        finally:
+            self._observe_total(request, started)
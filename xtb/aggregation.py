@@ -0,0 +1,409 @@
+from __future__ import annotations
+
+from collections import deque
+from datetime import datetime, timedelta, tzinfo
+from typing import (
+    Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple,
+    Union
+)
+
+from xtb import records
+from xtb.candle_store import Candle
+from xtb.columnar import ChartColumns, np, require_numpy
+
+MINUTE = 60_000
+_HOUR = timedelta(hours=1)
+
+# period in minutes, the closed bar
+BarCallback = Callable[[int, Candle], None]
+
+
+def _ms_of_day(value: Any) -> int:
+    # fromT/toT are milliseconds since midnight. The validating decode
+    # mode parses such small numbers as seconds since the epoch.
+    if isinstance(value, datetime):
+        return round(value.timestamp())
+    return int(value)
+
+
+def _last_sunday(year: int, month: int) -> datetime:
+    # March and October, the months of the clock changes, have 31 days
+    day = datetime(year, month, 31)
+    return day - timedelta(days=(day.weekday() + 1) % 7)
+
+
+class CentralEuropeanTime(tzinfo):
+    """
+    CET/CEST, the time zone of the xAPI trading hours, with the EU
+    daylight saving rules: summer time from 01:00 UTC on the last Sunday
+    of March until 01:00 UTC on the last Sunday of October
+    """
+
+    def utcoffset(self, dt: Optional[datetime]) -> timedelta:
+        return _HOUR + self.dst(dt)
+
+    def dst(self, dt: Optional[datetime]) -> timedelta:
+        if dt is None:
+            return timedelta(0)
+        start, end = self._summer_time(dt.year)
+        local = dt.replace(tzinfo=None)
+        # 02:00-03:00 CET is skipped, 02:00-03:00 CEST repeated
+        if start + _HOUR <= local < end + _HOUR:
+            return _HOUR
+        if end + _HOUR <= local < end + 2 * _HOUR and not dt.fold:
+            return _HOUR
+        return timedelta(0)
+
+    def tzname(self, dt: Optional[datetime]) -> str:
+        return 'CEST' if self.dst(dt) else 'CET'
+
+    def fromutc(self, dt: datetime) -> datetime:
+        utc = dt.replace(tzinfo=None)
+        start, end = self._summer_time(utc.year)
+        if start <= utc < end:
+            return (utc + 2 * _HOUR).replace(tzinfo=self)
+        local = utc + _HOUR
+        # The second 02:00-03:00 after the change back to CET
+        fold = int(end <= utc < end + _HOUR)
+        return local.replace(tzinfo=self, fold=fold)
+
+    @staticmethod
+    def _summer_time(year: int) -> Tuple[datetime, datetime]:
+        """
+        Returns the start and end of the summer time in UTC
+        """
+        return (
+            _last_sunday(year, 3) + _HOUR, _last_sunday(year, 10) + _HOUR
+        )
+
+    def __repr__(self) -> str:
+        return 'CentralEuropeanTime()'
+
+
+CET = CentralEuropeanTime()
+
+
+def _merge(first: Candle, last: Candle) -> Candle:
+    return (
+        first[0], first[1], max(first[2], last[2]), min(first[3], last[3]),
+        last[4], first[5] + last[5]
+    )
+
+
+class TradingSessions:
+    """
+    Trading sessions of a symbol by weekday, from the trading list of
+    records.TradingHours. Times of day are in the tz time zone, the
+    xAPI sends them in CET/CEST.
+    """
+
+    def __init__(
+            self,
+            trading: Iterable[Union[records.Trading, Dict[str, Any]]],
+            tz: tzinfo = CET
+    ) -> None:
+        self.tz = tz
+        # ISO weekday (1 is Monday) -> [from, to) ms of the day
+        self._windows: Dict[int, List[Tuple[int, int]]] = {}
+        for window in trading:
+            if isinstance(window, dict):
+                day, from_t, to_t = \
+                    window['day'], window['fromT'], window['toT']
+            else:
+                day, from_t, to_t = window.day, window.from_t, window.to_t
+            self._windows.setdefault(int(day), []).append(
+                (_ms_of_day(from_t), _ms_of_day(to_t))
+            )
+        for windows in self._windows.values():
+            windows.sort()
+
+    @classmethod
+    def from_trading_hours(
+            cls,
+            hours: Union[records.TradingHours, Dict[str, Any]],
+            tz: tzinfo = CET
+    ) -> TradingSessions:
+        trading = hours['trading'] if isinstance(hours, dict) \
+            else hours.trading
+        return cls(trading, tz)
+
+    def local_midnight(self, timestamp: int) -> int:
+        """
+        Returns the start of the day of the timestamp in the time zone
+        """
+        local = datetime.fromtimestamp(timestamp / 1000, self.tz)
+        midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+        return round(midnight.timestamp() * 1000)
+
+    def session_start(self, timestamp: int) -> Optional[int]:
+        """
+        Returns the start of the session containing the timestamp (epoch
+        milliseconds), None outside the trading hours
+        """
+        midnight = self.local_midnight(timestamp)
+        weekday = datetime.fromtimestamp(timestamp / 1000, self.tz) \
+            .isoweekday()
+        time_of_day = timestamp - midnight
+        for from_t, to_t in self._windows.get(weekday, ()):
+            if from_t <= time_of_day < to_t:
+                return midnight + from_t
+        return None
+
+
+class _Timeframe:
+    """
+    Closed bars of one period and the open bar, kept as the merged
+    base bars before the last one plus the last base bar, which is the
+    only part that changes while the base bar is still open
+    """
+    __slots__ = ('period', 'closed', 'bucket', 'prefix', 'last')
+
+    def __init__(self, period: int, max_bars: Optional[int]) -> None:
+        self.period = period
+        self.closed: Deque[Candle] = deque(maxlen=max_bars)
+        self.bucket: Optional[int] = None
+        self.prefix: Optional[Candle] = None
+        self.last: Optional[Candle] = None
+
+    def open_bar(self) -> Optional[Candle]:
+        if self.last is None:
+            return None
+        if self.prefix is None:
+            bar = self.last
+        else:
+            bar = _merge(self.prefix, self.last)
+        return (self.bucket,) + bar[1:]
+
+    def update(
+            self,
+            bucket: int,
+            candle: Candle,
+            replace: bool
+    ) -> Optional[Candle]:
+        """
+        Returns the bar closed by the update
+        """
+        closed = None
+        if bucket != self.bucket:
+            closed = self.open_bar()
+            if closed is not None:
+                self.closed.append(closed)
+            self.bucket, self.prefix = bucket, None
+        elif not replace and self.last is not None:
+            self.prefix = self.last if self.prefix is None \
+                else _merge(self.prefix, self.last)
+        self.last = candle
+        return closed
+
+
+class CandleAggregator:
+    """
+    Builds candles of higher periods from one base feed of candles or
+    ticks, e.g. M5, M15, H1 and D1 from M1 candles:
+        aggregator = CandleAggregator(periods=[5, 15, 60, 1440])
+        aggregator.add_chart(api.get_chart_last_request(...))
+        client.subscribe_candles('EURUSD',
+                                 callback=aggregator.add_streaming_candle)
+    A base bar with the time of the last one replaces it, so only the
+    open bar of every period is recomputed. Older bars are ignored.
+    Periods are in minutes. Intraday bars start at the session open
+    when sessions are given, and at multiples of the period since the
+    epoch otherwise. D1, W1 and MN1 bars follow the days of the sessions
+    time zone (CET/CEST without sessions, like the xAPI charts). Base
+    bars and ticks outside the trading sessions are ignored.
+    """
+
+    def __init__(
+            self,
+            base_period: int = records.Period.M1,
+            periods: Sequence[int] = (
+                records.Period.M5, records.Period.M15, records.Period.H1,
+                records.Period.D1
+            ),
+            *,
+            sessions: Optional[TradingSessions] = None,
+            max_bars: Optional[int] = None,
+            digits: int = 5,
+            on_bar: Optional[BarCallback] = None
+    ) -> None:
+        """
+        max_bars limits the closed bars kept per period.
+        on_bar is called with the period and every closed bar.
+        Raises:
+            ValueError for intraday periods that are not multiples of
+            base_period and for unsupported periods above D1
+        """
+        calendar = (records.Period.D1, records.Period.W1, records.Period.MN1)
+        for period in periods:
+            if period in calendar:
+                continue
+            if period > records.Period.D1 or period % base_period:
+                raise ValueError(
+                    f'Period {period} cannot be built from {base_period}'
+                )
+        self.base_period = base_period
+        self.digits = digits
+        self._sessions = sessions
+        self._tz = sessions.tz if sessions is not None else CET
+        self._on_bar = on_bar
+        self._timeframes = [
+            _Timeframe(period, max_bars)
+            for period in sorted(set(periods) | {base_period})
+        ]
+        self._by_period = {tf.period: tf for tf in self._timeframes}
+        self._last_ctm: Optional[int] = None
+
+    @property
+    def periods(self) -> List[int]:
+        return list(self._by_period)
+
+    def add_bar(self, candle: Candle) -> bool:
+        """
+        Adds a base bar (ctm in epoch milliseconds, absolute prices).
+        Returns False if the bar was ignored.
+        """
+        ctm = candle[0]
+        if self._last_ctm is not None and ctm < self._last_ctm:
+            return False
+        session_start = None
+        if self._sessions is not None:
+            session_start = self._sessions.session_start(ctm)
+            if session_start is None:
+                return False
+        replace = ctm == self._last_ctm
+        self._last_ctm = ctm
+        for timeframe in self._timeframes:
+            bucket = self._bucket(timeframe.period, ctm, session_start)
+            closed = timeframe.update(bucket, candle, replace)
+            if closed is not None and self._on_bar is not None:
+                self._on_bar(timeframe.period, closed)
+        return True
+
+    def add_bars(self, candles: Iterable[Candle]) -> int:
+        """
+        Adds base bars in time order, returns the number of added ones
+        """
+        return sum(map(self.add_bar, candles))
+
+    def add_chart(
+            self,
+            chart: Union[records.ChartResponse, ChartColumns]
+    ) -> int:
+        """
+        Adds the candles of a chart response of the base period
+        """
+        self.digits = chart.digits
+        if isinstance(chart, ChartColumns):
+            return self.add_bars(zip(
+                chart.ctm.tolist(), chart.open.tolist(),
+                chart.high.tolist(), chart.low.tolist(),
+                chart.close.tolist(), chart.vol.tolist()
+            ))
+        # The chart commands send open * 10 ** digits and the other
+        # prices as offsets from open
+        scale = 10.0 ** -chart.digits
+        return self.add_bars(
+            (
+                records.timestamp_ms(info.ctm), info.open * scale,
+                (info.open + info.high) * scale,
+                (info.open + info.low) * scale,
+                (info.open + info.close) * scale, info.vol
+            )
+            for info in chart.rateInfos
+        )
+
+    def add_streaming_candle(self, candle: records.StreamingCandle) -> bool:
+        """
+        Adds a candle of the streaming API, which sends absolute prices
+        """
+        return self.add_bar((
+            records.timestamp_ms(candle.ctm), candle.open, candle.high,
+            candle.low, candle.close, candle.vol
+        ))
+
+    def add_tick(
+            self,
+            timestamp: Any,
+            price: float,
+            volume: float = 0.0
+    ) -> bool:
+        """
+        Adds a tick to the open base bar or starts a new one.
+        The xAPI charts are built from the bid prices.
+        """
+        timestamp = records.timestamp_ms(timestamp)
+        if self._last_ctm is not None and timestamp < self._last_ctm:
+            return False
+        session_start = None
+        if self._sessions is not None:
+            session_start = self._sessions.session_start(timestamp)
+            if session_start is None:
+                return False
+        ctm = self._bucket(self.base_period, timestamp, session_start)
+        bar = self._by_period[self.base_period].open_bar()
+        if bar is not None and bar[0] == ctm:
+            bar = (
+                ctm, bar[1], max(bar[2], price), min(bar[3], price),
+                price, bar[5] + volume
+            )
+        else:
+            bar = (ctm, price, price, price, price, volume)
+        return self.add_bar(bar)
+
+    def add_tick_record(self, tick: records.Tick) -> bool:
+        """
+        Adds the bid of a Tick record, e.g. as a tick prices callback
+        """
+        return self.add_tick(tick.timestamp, tick.bid)
+
+    def bars(
+            self,
+            period: int,
+            include_open: bool = True
+    ) -> List[Candle]:
+        """
+        Returns the bars of the period ordered by time
+        Raises:
+            KeyError for periods that are not aggregated
+        """
+        timeframe = self._by_period[period]
+        bars = list(timeframe.closed)
+        open_bar = timeframe.open_bar()
+        if include_open and open_bar is not None:
+            bars.append(open_bar)
+        return bars
+
+    def open_bar(self, period: int) -> Optional[Candle]:
+        return self._by_period[period].open_bar()
+
+    def columns(self, period: int, include_open: bool = True) -> ChartColumns:
+        """
+        Returns the bars of the period as ChartColumns
+        """
+        require_numpy()
+        bars = self.bars(period, include_open)
+        table = np.array(bars, dtype=np.float64).reshape(len(bars), 6)
+        return ChartColumns(
+            digits=self.digits, exemode=1,
+            ctm=np.array([bar[0] for bar in bars], dtype=np.int64),
+            open=table[:, 1], high=table[:, 2], low=table[:, 3],
+            close=table[:, 4], vol=table[:, 5]
+        )
+
+    def _bucket(
+            self,
+            period: int,
+            timestamp: int,
+            session_start: Optional[int]
+    ) -> int:
+        if period < records.Period.D1:
+            step = period * MINUTE
+            anchor = session_start if session_start is not None else 0
+            return anchor + (timestamp - anchor) // step * step
+        local = datetime.fromtimestamp(timestamp / 1000, self._tz)
+        day = local.replace(hour=0, minute=0, second=0, microsecond=0)
+        if period == records.Period.W1:
+            day -= timedelta(days=day.weekday())
+        elif period == records.Period.MN1:
+            day = day.replace(day=1)
+        return round(day.timestamp() * 1000)
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Optional, Type
+
+from xtb import records
+from xtb.base_api import BaseXtbApi, Request
+from xtb.cache import ResponseCache
+from xtb.codec import JsonCodec
+from xtb.connector import AsyncConnector
+from xtb.metrics import Metrics
+from xtb.ratelimit import RateLimiter
+
+
+class AsyncXtbApi(BaseXtbApi):
+    """
+    asyncio counterpart of XtbApi. Every command returns an awaitable of
+    the same records and raises the same exceptions as in XtbApi.
+    """
+
+    def __init__(
+            self,
+            host: str = 'xapi.xtb.com',
+            port: int = 5124,
+            connector: Type[AsyncConnector] = AsyncConnector,
+            rate_limiter: Optional[RateLimiter] = None,
+            codec: Optional[JsonCodec] = None,
+            decode_mode: records.DecodeMode = records.DecodeMode.VALIDATE,
+            cache: Optional[ResponseCache] = None,
+            metrics: Optional[Metrics] = None
+    ) -> None:
+        """
+        See BaseXtbApi for the options
+        """
+        super().__init__(
+            host, port, connector, rate_limiter=rate_limiter, codec=codec,
+            decode_mode=decode_mode, cache=cache, metrics=metrics
+        )
+
+    async def __aenter__(self) -> AsyncXtbApi:
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def connect(self) -> None:
+        """
+        Creates the connection
+        Raises:
+            XtbSocketError if connect() was called more than once before close()
+        """
+        await self._connector.connect(self._host, self._port)
+
+    async def close(self) -> None:
+        """
+        Closes an existing connection.
+        Logouts the user if login() was called.
+        Raises:
+            XtbSocketError if close() was called before connect()
+        """
+        try:
+            if self.is_connected() and self._is_logged_in:
+                await self.logout()
+        finally:
+            await self._connector.close()
+
+    async def _execute(self, request: Request) -> Any:
+        started = time.perf_counter()
+        try:
+            response = self._cached_response(request)
+            if response is None:
+                response = await self._connector.handle_command(
+                    command=request.command, arguments=request.arguments
+                )
+                self._store_response(request, response)
+            return self._result(request, response)
+        finally:
+            self._observe_total(request, started)
@@ -0,0 +1,589 @@
+from __future__ import annotations
+
+import time
+from typing import (
+    Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+)
+
+from xtb import records
+from xtb.cache import ResponseCache
+from xtb.codec import JsonCodec
+from xtb.columnar import ChartColumns
+from xtb.metrics import Metrics
+from xtb.ratelimit import RateLimiter
+
+Response = Dict[str, Any]
+
+
+class Request(NamedTuple):
+    """
+    A command and how its response is turned into the result.
+    decode builds the records and is timed as the 'validate' phase,
+    result post-processes the response without being timed.
+    lookup is the (command, key, value) of a cached list response
+    whose item answers the request, see ResponseCache.lookup().
+    """
+    command: str
+    arguments: Optional[Dict[str, Any]] = None
+    decode: Optional[Callable[[Response], Any]] = None
+    result: Optional[Callable[[Response], Any]] = None
+    lookup: Optional[Tuple[str, str, Any]] = None
+
+
+class BaseXtbApi:
+    """
+    Commands of the xAPI shared by XtbApi and AsyncXtbApi.
+    Every command method builds a Request and passes it to _execute(),
+    which the front ends implement with their connector: XtbApi returns
+    the result, AsyncXtbApi a coroutine resolving to it.
+    """
+
+    def __init__(
+            self,
+            host: str,
+            port: int,
+            connector: Callable[..., Any],
+            rate_limiter: Optional[RateLimiter] = None,
+            codec: Optional[JsonCodec] = None,
+            decode_mode: records.DecodeMode = records.DecodeMode.VALIDATE,
+            cache: Optional[ResponseCache] = None,
+            metrics: Optional[Metrics] = None
+    ) -> None:
+        """
+        rate_limiter controls how often the requests are sent. Defaults to
+        a connection-local limiter that keeps the xAPI minimum interval.
+        Use xtb.ratelimit.shared_rate_limiter() to share a single budget
+        between several connections of the same account.
+        codec is the JSON codec used on the wire, see xtb.codec.
+        Defaults to the standard library json module.
+        decode_mode selects how the responses are turned into records,
+        see records.DecodeMode.
+        cache serves the reference data commands (symbols, trading hours,
+        step rules, user data) from memory while fresh, see xtb.cache.
+        metrics records per command latencies of the request phases and
+        byte counters, see xtb.metrics.
+        """
+        self._host = host
+        self._port = port
+        self._is_logged_in = False
+        self._stream_session_id: Optional[str] = None
+        self._decode_mode = decode_mode
+        self._cache = cache
+        self._metrics = metrics
+        # Only the given options are passed, so connectors written
+        # before they existed keep working
+        options = {
+            'rate_limiter': rate_limiter, 'codec': codec, 'metrics': metrics
+        }
+        self._connector = connector(**{
+            name: value for name, value in options.items()
+            if value is not None
+        })
+
+    def is_connected(self) -> bool:
+        return self._connector.is_connected()
+
+    @property
+    def stream_session_id(self) -> Optional[str]:
+        """
+        The streaming session id of the logged in user
+        """
+        return self._stream_session_id
+
+    def login(
+            self,
+            user: str,
+            password: str,
+            app_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Logins the user.
+        See http://developers.xstore.pro/documentation/#login
+        """
+        args = {'userId': user, 'password': password}
+        if app_name is not None:
+            args['appName'] = app_name
+        return self._execute(Request(
+            'login', arguments=args, result=self._logged_in
+        ))
+
+    def logout(self) -> Dict[str, bool]:
+        """
+        Logouts the user.
+        See http://developers.xstore.pro/documentation/#logout
+        """
+        return self._execute(Request('logout', result=self._logged_out))
+
+    def get_all_symbols(
+            self,
+            lazy: bool = False
+    ) -> Sequence[records.Symbol]:
+        """
+        Returns array of symbols available for the user.
+        With lazy=True the records are created on first access,
+        see records.LazyRecordList.
+        See http://developers.xstore.pro/documentation/#getAllSymbols
+        """
+        return self._execute(Request(
+            'getAllSymbols',
+            decode=lambda response: records.Symbol.create_collection_from(
+                response['returnData'], lazy=lazy, key='symbol',
+                mode=self._decode_mode
+            )
+        ))
+
+    def get_calendar(
+            self,
+            lazy: bool = False
+    ) -> Sequence[records.Calendar]:
+        """
+        Returns calendar with market events
+        With lazy=True the records are created on first access,
+        see records.LazyRecordList.
+        See http://developers.xstore.pro/documentation/#getCalendar
+        """
+        return self._execute(Request(
+            'getCalendar',
+            decode=lambda response: records.Calendar.create_collection_from(
+                response['returnData'], lazy=lazy,
+                mode=self._decode_mode
+            )
+        ))
+
+    def get_chart_last_request(
+            self,
+            period: int,
+            start: int,
+            symbol: str,
+            columnar: bool = False
+    ) -> Union[records.ChartResponse, ChartColumns]:
+        """
+        Returns chart info from start date to current time.
+        period is the candle length in minutes, see records.Period.
+        With columnar=True returns the candles as NumPy arrays instead,
+        see xtb.columnar.ChartColumns.
+        Note that the streaming equivalent of this function is preferred.
+        See http://developers.xstore.pro/documentation/#getChartLastRequest
+        """
+        args = {
+            'info': {'period': period, 'start': start, 'symbol': symbol}
+        }
+        return self._execute(Request(
+            'getChartLastRequest', arguments=args,
+            decode=lambda response: self._chart_response(response, columnar)
+        ))
+
+    def get_chart_range_request(
+            self,
+            end: int,
+            period: int,
+            start: int,
+            symbol: str,
+            ticks: int,
+            columnar: bool = False
+    ) -> Union[records.ChartResponse, ChartColumns]:
+        """
+        Returns chart info with data between given start and end dates
+        With columnar=True returns the candles as NumPy arrays instead,
+        see xtb.columnar.ChartColumns.
+        Note that the streaming equivalent of this function is preferred.
+        See http://developers.xstore.pro/documentation/#getChartRangeRequest
+        """
+        args = {
+            'info': {
+                'end': end, 'period': period, 'start': start,
+                'symbol': symbol, 'ticks': ticks
+            }
+        }
+        return self._execute(Request(
+            'getChartRangeRequest', arguments=args,
+            decode=lambda response: self._chart_response(response, columnar)
+        ))
+
+    def get_commission_def(
+            self,
+            symbol: str,
+            volume: float
+    ) -> records.Commission:
+        """
+        Returns calculation of commission and rate of exchange.
+        See http://developers.xstore.pro/documentation/#getCommissionDef
+        """
+        args = {'symbol': symbol, 'volume': volume}
+        return self._execute(Request(
+            'getCommissionDef', arguments=args,
+            decode=lambda response: records.Commission.from_dict(
+                response['returnData'], self._decode_mode
+            )
+        ))
+
+    def get_current_user_data(self) -> records.User:
+        """
+        Returns information about account currency, and account leverage.
+        See http://developers.xstore.pro/documentation/#getCurrentUserData
+        """
+        return self._execute(Request(
+            'getCurrentUserData',
+            decode=lambda response: records.User.from_dict(
+                response['returnData'], self._decode_mode
+            )
+        ))
+
+    def get_margin_level(self):
+        """
+        Returns various account indicators.
+        Note that the streaming equivalent of this function is preferred.
+        See http://developers.xstore.pro/documentation/#getMarginLevel
+        """
+        return self._execute(Request(
+            'getMarginLevel',
+            decode=lambda response: records.MarginLevel.from_dict(
+                response['returnData'], self._decode_mode
+            )
+        ))
+
+    def get_margin_trade(
+            self,
+            symbol: str,
+            volume: float
+    ) -> records.MarginTrade:
+        """
+        Returns expected margin for given instrument and volume.
+        See http://developers.xstore.pro/documentation/#getMarginTrade
+        """
+        args = {'symbol': symbol, 'volume': volume}
+        return self._execute(Request(
+            'getMarginTrade', arguments=args,
+            decode=lambda response: records.MarginTrade.from_dict(
+                response['returnData'], self._decode_mode
+            )
+        ))
+
+    def get_news(
+            self,
+            start: int,
+            end: int,
+            lazy: bool = False
+    ) -> Sequence[records.News]:
+        """
+        Returns news from trading server which were sent within specified
+        period of time.
+        With lazy=True the records are created on first access,
+        see records.LazyRecordList.
+        Note that the streaming equivalent of this function is preferred.
+        See http://developers.xstore.pro/documentation/#getNews
+        """
+        args = {'end': end, 'start': start}
+        return self._execute(Request(
+            'getNews', arguments=args,
+            decode=lambda response: records.News.create_collection_from(
+                response['returnData'], lazy=lazy, key='key',
+                mode=self._decode_mode
+            )
+        ))
+
+    def get_profit_calculation(
+            self,
+            *,
+            close_price: float,
+            cmd: int,
+            open_price: float,
+            symbol: str,
+            volume: float
+    ) -> records.ProfitCalculation:
+        """
+        Calculates estimated profit for given deal data
+        See http://developers.xstore.pro/documentation/#getProfitCalculation
+        """
+        args = {
+            'closePrice': close_price, 'cmd': cmd, 'openPrice': open_price,
+            'symbol': symbol, 'volume': volume
+        }
+        return self._execute(Request(
+            'getProfitCalculation', arguments=args,
+            decode=lambda response: records.ProfitCalculation.from_dict(
+                response['returnData'], self._decode_mode
+            )
+        ))
+
+    def get_server_time(self) -> records.ServerTime:
+        """
+        Returns current time on trading server.
+        See http://developers.xstore.pro/documentation/#getServerTime
+        """
+        return self._execute(Request(
+            'getServerTime',
+            decode=lambda response: records.ServerTime.from_dict(
+                response['returnData'], self._decode_mode
+            )
+        ))
+
+    def get_step_rules(
+            self,
+            lazy: bool = False
+    ) -> Sequence[records.StepRule]:
+        """
+        Returns a list of step rules for DMAs
+        With lazy=True the records are created on first access,
+        see records.LazyRecordList.
+        See http://developers.xstore.pro/documentation/#getStepRules
+        """
+        return self._execute(Request(
+            'getStepRules',
+            decode=lambda response: records.StepRule.create_collection_from(
+                response['returnData'], lazy=lazy, key='id',
+                mode=self._decode_mode
+            )
+        ))
+
+    def get_symbol(self, symbol: str) -> records.Symbol:
+        """
+        Returns information about symbol available for the user.
+        Served from a fresh cached get_all_symbols() result if possible.
+        See http://developers.xstore.pro/documentation/#getSymbol
+        """
+        args = {'symbol': symbol}
+        return self._execute(Request(
+            'getSymbol', arguments=args,
+            decode=lambda response: records.Symbol.from_dict(
+                response['returnData'], self._decode_mode
+            ),
+            lookup=('getAllSymbols', 'symbol', symbol)
+        ))
+
+    def get_tick_prices(
+            self,
+            *,
+            level: int,
+            symbols: List[str],
+            timestamp: int
+    ) -> records.TickPrices:
+        """
+        Returns array of current quotations for given symbols
+        Note that the streaming equivalent of this function is preferred.
+        See http://developers.xstore.pro/documentation/#getTickPrices
+        """
+        args = {
+            'level': level, 'symbols': symbols, 'timestamp': timestamp
+        }
+        return self._execute(Request(
+            'getTickPrices', arguments=args,
+            decode=lambda response: records.TickPrices.from_dict(
+                response['returnData'], self._decode_mode
+            )
+        ))
+
+    def get_trade_records(
+            self,
+            *,
+            orders: List[int],
+            lazy: bool = False
+    ) -> Sequence[records.Trade]:
+        """
+        Returns trades listed in orders argument
+        With lazy=True the records are created on first access,
+        see records.LazyRecordList.
+        See http://developers.xstore.pro/documentation/#getTradeRecords
+        """
+        args = {'orders': orders}
+        return self._execute(Request(
+            'getTradeRecords', arguments=args,
+            decode=lambda response: records.Trade.create_collection_from(
+                response['returnData'], lazy=lazy, key='order',
+                mode=self._decode_mode
+            )
+        ))
+
+    def get_trades(
+            self,
+            *,
+            opened_only: bool = False,
+            lazy: bool = False
+    ) -> Sequence[records.Trade]:
+        """
+        Returns all users trades.
+        With lazy=True the records are created on first access,
+        see records.LazyRecordList.
+        Note that the streaming equivalent of this function is preferred.
+        See http://developers.xstore.pro/documentation/#getTrades
+        """
+        args = {'openedOnly': opened_only}
+        return self._execute(Request(
+            'getTrades', arguments=args,
+            decode=lambda response: records.Trade.create_collection_from(
+                response['returnData'], lazy=lazy, key='order',
+                mode=self._decode_mode
+            )
+        ))
+
+    def get_trades_history(
+            self,
+            *,
+            start: int,
+            end: int,
+            lazy: bool = False
+    ) -> Sequence[records.Trade]:
+        """
+        Returns users trades which were closed within specified period of time.
+        With lazy=True the records are created on first access,
+        see records.LazyRecordList.
+        Note that the streaming equivalent of this function is preferred.
+        See http://developers.xstore.pro/documentation/#getTradesHistory
+        """
+        args = {'start': start, 'end': end}
+        return self._execute(Request(
+            'getTradesHistory', arguments=args,
+            decode=lambda response: records.Trade.create_collection_from(
+                response['returnData'], lazy=lazy, key='order',
+                mode=self._decode_mode
+            )
+        ))
+
+    def get_trading_hours(
+            self,
+            *,
+            symbols: List[str],
+            lazy: bool = False
+    ) -> Sequence[records.TradingHours]:
+        """
+        Returns quotes and trading times.
+        With lazy=True the records are created on first access,
+        see records.LazyRecordList.
+        See http://developers.xstore.pro/documentation/#getTradingHours
+        """
+        args = {'symbols': symbols}
+        return self._execute(Request(
+            'getTradingHours', arguments=args,
+            decode=lambda response:
+                records.TradingHours.create_collection_from(
+                    response['returnData'], lazy=lazy, key='symbol',
+                    mode=self._decode_mode
+                )
+        ))
+
+    def get_version(self) -> records.Version:
+        """
+        Returns the current API version
+        See http://developers.xstore.pro/documentation/#getVersion
+        """
+        return self._execute(Request(
+            'getVersion',
+            decode=lambda response: records.Version.from_dict(
+                response['returnData'], self._decode_mode
+            )
+        ))
+
+    def ping(self) -> bool:
+        """
+        Refreshes the internal state of the system
+        See http://developers.xstore.pro/documentation/#ping
+        """
+        return self._execute(Request(
+            'ping', result=lambda response: response.get('status', False)
+        ))
+
+    def trade_transaction(
+            self,
+            *,
+            trade_info: records.TradeInfo
+    ) -> records.TradeOrder:
+        """
+        Starts the transaction.
+        See http://developers.xstore.pro/documentation/#tradeTransaction
+        """
+        args = trade_info.to_arguments()
+        return self._execute(Request(
+            'tradeTransaction', arguments=args,
+            decode=lambda response: records.TradeOrder.from_dict(
+                response['returnData'], self._decode_mode
+            )
+        ))
+
+    def trade_transaction_status(
+            self,
+            *,
+            order: int
+    ) -> records.TradeStatus:
+        """
+        Returns current transaction status
+        Note that the streaming equivalent of this function is preferred.
+        See http://developers.xstore.pro/documentation/#tradeTransactionStatus
+        """
+        args = {'order': order}
+        return self._execute(Request(
+            'tradeTransactionStatus', arguments=args,
+            decode=lambda response: records.TradeStatus.from_dict(
+                response['returnData'], self._decode_mode
+            )
+        ))
+
+    def _execute(self, request: Request) -> Any:
+        raise NotImplementedError
+
+    def _logged_in(self, response: Response) -> Response:
+        self._is_logged_in = True
+        self._stream_session_id = response.get('streamSessionId')
+        return response
+
+    def _logged_out(self, response: Response) -> Response:
+        self._is_logged_in = False
+        self._stream_session_id = None
+        return response
+
+    def _chart_response(
+            self,
+            response: Response,
+            columnar: bool
+    ) -> Union[records.ChartResponse, ChartColumns]:
+        return_data = response['returnData']
+        if columnar:
+            return ChartColumns.from_dict(return_data)
+        return records.ChartResponse.from_dict(return_data, self._decode_mode)
+
+    def _cached_response(self, request: Request) -> Optional[Response]:
+        """
+        Returns the response of the request served by the cache
+        """
+        cache = self._cache
+        if cache is None:
+            return None
+        response = None
+        if request.lookup is not None:
+            item = cache.lookup(*request.lookup)
+            if item is not None:
+                response = {'status': True, 'returnData': item}
+        if response is None and cache.caches(request.command):
+            response = cache.get(request.command, request.arguments)
+        if response is not None and self._metrics is not None:
+            self._metrics.cache_hit(request.command)
+        return response
+
+    def _store_response(self, request: Request, response: Response) -> None:
+        if self._cache is not None:
+            self._cache.put(request.command, request.arguments, response)
+
+    def _result(self, request: Request, response: Response) -> Any:
+        """
+        Returns the result of the response.
+        With metrics, decode is timed as the 'validate' phase.
+        """
+        if request.decode is not None:
+            if self._metrics is None:
+                return request.decode(response)
+            validating = time.perf_counter()
+            try:
+                return request.decode(response)
+            finally:
+                self._metrics.observe(
+                    request.command, 'validate',
+                    time.perf_counter() - validating
+                )
+        if request.result is not None:
+            return request.result(response)
+        return response
+
+    def _observe_total(self, request: Request, started: float) -> None:
+        if self._metrics is not None:
+            self._metrics.observe(
+                request.command, 'total', time.perf_counter() - started
+            )
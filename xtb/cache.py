@@ -0,0 +1,229 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+Clock = Callable[[], float]
+_Key = Tuple[str, str]
+
+
+def _copy(value: Any) -> Any:
+    # Responses are decoded JSON, only dictionaries and lists are mutable
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+class CacheStats(NamedTuple):
+    """
+    Snapshot of the cache counters
+    """
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+
+
+class _Entry:
+    __slots__ = ('expires_at', 'response', 'indexes')
+
+    def __init__(self, expires_at: float, response: Dict[str, Any]) -> None:
+        self.expires_at = expires_at
+        self.response = response
+        self.indexes: Dict[str, Dict[Any, Any]] = {}
+
+
+class ResponseCache:
+    """
+    LRU cache of raw responses for the reference data commands.
+    Every cached command has its own time to live in seconds. The cache
+    holds data of a single account, use one instance (and snapshot file)
+    per account.
+    Responses are copied when they are stored and when they are handed
+    out, so callers may modify them.
+    """
+    DEFAULT_TTLS = {
+        'getAllSymbols': 3600.0,
+        'getSymbol': 3600.0,
+        'getTradingHours': 3600.0,
+        'getStepRules': 86400.0,
+        'getCurrentUserData': 3600.0,
+    }
+
+    def __init__(
+            self,
+            ttls: Optional[Dict[str, float]] = None,
+            max_entries: int = 256,
+            path: Optional[str] = None,
+            clock: Clock = time.time
+    ) -> None:
+        """
+        ttls overrides DEFAULT_TTLS, only the listed commands are cached.
+        path is the snapshot file used by save() and load(); if it exists
+        it is loaded right away.
+        """
+        self._ttls = dict(self.DEFAULT_TTLS if ttls is None else ttls)
+        self._max_entries = max_entries
+        self._path = path
+        self._clock = clock
+        self._entries: 'OrderedDict[_Key, _Entry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def caches(self, command: str) -> bool:
+        return command in self._ttls
+
+    def get(
+            self,
+            command: str,
+            arguments: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Returns a copy of the cached response or None if it is missing or
+        expired
+        """
+        with self._lock:
+            entry = self._fresh_entry(self._key(command, arguments))
+            if entry is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            response = entry.response
+        return _copy(response)
+
+    def lookup(
+            self,
+            command: str,
+            key: str,
+            value: Any,
+            arguments: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Returns a copy of the item of a cached list response whose `key`
+        field equals value, e.g. a single symbol out of getAllSymbols.
+        Returns None if the response is not cached or has no such item.
+        Only found items are counted, a miss is counted by the get() of
+        the command that answers it instead.
+        """
+        with self._lock:
+            entry = self._fresh_entry(self._key(command, arguments))
+            if entry is None:
+                return None
+            index = entry.indexes.get(key)
+            if index is None:
+                index = entry.indexes[key] = {
+                    item[key]: item for item in entry.response['returnData']
+                }
+            item = index.get(value)
+            if item is None:
+                return None
+            self._hits += 1
+        return _copy(item)
+
+    def put(
+            self,
+            command: str,
+            arguments: Optional[Dict[str, Any]],
+            response: Dict[str, Any]
+    ) -> None:
+        ttl = self._ttls.get(command)
+        if ttl is None:
+            return
+        entry = _Entry(self._clock() + ttl, _copy(response))
+        with self._lock:
+            self._store(self._key(command, arguments), entry)
+
+    def invalidate(
+            self,
+            command: Optional[str] = None,
+            arguments: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Drops the cached responses.
+        Without arguments drops every response of the command, without
+        a command drops everything.
+        """
+        with self._lock:
+            if command is None:
+                self._entries.clear()
+            elif arguments is not None:
+                self._entries.pop(self._key(command, arguments), None)
+            else:
+                for key in [k for k in self._entries if k[0] == command]:
+                    del self._entries[key]
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=len(self._entries)
+            )
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Writes the fresh entries to the snapshot file
+        """
+        path = self._snapshot_path(path)
+        now = self._clock()
+        with self._lock:
+            entries = [
+                [command, arguments, entry.expires_at, entry.response]
+                for (command, arguments), entry in self._entries.items()
+                if entry.expires_at > now
+            ]
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def load(self, path: Optional[str] = None) -> None:
+        """
+        Adds the fresh entries of the snapshot file to the cache
+        """
+        path = self._snapshot_path(path)
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f)
+        now = self._clock()
+        with self._lock:
+            for command, arguments, expires_at, response in entries:
+                if expires_at > now and command in self._ttls:
+                    self._store(
+                        (command, arguments), _Entry(expires_at, response)
+                    )
+
+    @staticmethod
+    def _key(command: str, arguments: Optional[Dict[str, Any]]) -> _Key:
+        return command, json.dumps(arguments, sort_keys=True)
+
+    def _fresh_entry(self, key: _Key) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: _Key, entry: _Entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _snapshot_path(self, path: Optional[str]) -> str:
+        path = path or self._path
+        if path is None:
+            raise ValueError('No snapshot path given')
+        return path
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import math
+import random
+from typing import (
+    Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+)
+
+from xtb import records
+from xtb.columnar import np, require_numpy
+from xtb.quotes import QuoteBook
+
+
+class SymbolTerms(NamedTuple):
+    """
+    Per lot constants of a symbol used by the calculations.
+    point_value is the profit (in currency_profit) of a 1.0 price move,
+    the margin is margin_factor (in currency), times the price for CFDs.
+    """
+    symbol: str
+    contract_size: float
+    point_value: float
+    margin_factor: float
+    margin_uses_price: bool
+    currency: str
+    currency_profit: str
+
+    @classmethod
+    def from_symbol(cls, symbol: records.Symbol) -> SymbolTerms:
+        if symbol.profitMode == records.ProfitMode.FOREX:
+            point_value = float(symbol.contractSize)
+        else:
+            point_value = symbol.tickValue / symbol.tickSize
+        return cls(
+            symbol=symbol.symbol,
+            contract_size=float(symbol.contractSize),
+            point_value=point_value,
+            # leverage is the margin requirement in percent
+            margin_factor=symbol.contractSize * symbol.leverage / 100,
+            margin_uses_price=(
+                symbol.marginMode != records.MarginMode.FOREX
+            ),
+            currency=symbol.currency,
+            currency_profit=symbol.currencyProfit
+        )
+
+
+class CalculationCheck(NamedTuple):
+    """
+    Local result compared with the server one, see
+    TradeCalculator.verify()
+    """
+    kind: str
+    position: Dict[str, Any]
+    local: float
+    server: float
+    ok: bool
+
+
+def _direction(cmd: Any) -> Any:
+    # Buy commands are even, sell commands odd (BUY, SELL, BUY_LIMIT, ...)
+    return 1 - 2 * (cmd % 2)
+
+
+class TradeCalculator:
+    """
+    Computes profit, margin and commission locally instead of calling
+    getProfitCalculation, getMarginTrade and getCommissionDef for each
+    candidate order.
+    The constants come from the Symbol records (e.g. a cached
+    get_all_symbols()), the prices and currency conversion rates from a
+    QuoteBook when given, else from the bid/ask of the Symbol records.
+    Commission is not part of the symbol data, it is estimated from
+    commission_rates: the fraction of the notional value charged per
+    symbol (0 when missing). Check the results with verify().
+    """
+
+    def __init__(
+            self,
+            symbols: Iterable[records.Symbol],
+            account_currency: str,
+            *,
+            quotes: Optional[QuoteBook] = None,
+            commission_rates: Optional[Mapping[str, float]] = None
+    ) -> None:
+        self.account_currency = account_currency
+        self._quotes = quotes
+        self._commission_rates = dict(commission_rates or {})
+        self._symbols: Dict[str, records.Symbol] = {}
+        self._terms: Dict[str, SymbolTerms] = {}
+        self._pairs: Dict[Tuple[str, str], str] = {}
+        self.update_symbols(symbols)
+
+    def update_symbols(self, symbols: Iterable[records.Symbol]) -> None:
+        for symbol in symbols:
+            self._symbols[symbol.symbol] = symbol
+            self._terms[symbol.symbol] = SymbolTerms.from_symbol(symbol)
+            if symbol.currencyPair:
+                pair = (symbol.currency, symbol.currencyProfit)
+                self._pairs.setdefault(pair, symbol.symbol)
+
+    def terms(self, symbol: str) -> SymbolTerms:
+        try:
+            return self._terms[symbol]
+        except KeyError:
+            raise ValueError(f'Unknown symbol: {symbol}') from None
+
+    def bid_ask(self, symbol: str) -> Tuple[float, float]:
+        """
+        Returns the current bid and ask of the symbol
+        """
+        if self._quotes is not None:
+            quote = self._quotes.bid_ask(symbol)
+            if quote is not None:
+                return quote
+        record = self._symbols.get(symbol)
+        if record is None:
+            raise ValueError(f'Unknown symbol: {symbol}')
+        return record.bid, record.ask
+
+    def rate(self, currency: str) -> float:
+        """
+        Returns the rate converting amounts in currency to the account
+        currency
+        """
+        if currency == self.account_currency:
+            return 1.0
+        direct = self._pairs.get((currency, self.account_currency))
+        if direct is not None:
+            return self.bid_ask(direct)[0]
+        inverse = self._pairs.get((self.account_currency, currency))
+        if inverse is not None:
+            return 1.0 / self.bid_ask(inverse)[1]
+        raise ValueError(
+            f'No rate from {currency} to {self.account_currency}'
+        )
+
+    def profit(
+            self,
+            *,
+            close_price: float,
+            cmd: int,
+            open_price: float,
+            symbol: str,
+            volume: float
+    ) -> float:
+        """
+        Local counterpart of XtbApi.get_profit_calculation,
+        in the account currency
+        """
+        terms = self.terms(symbol)
+        return (
+            _direction(cmd) * (close_price - open_price) * volume
+            * terms.point_value * self.rate(terms.currency_profit)
+        )
+
+    def margin(
+            self,
+            symbol: str,
+            volume: float,
+            price: Optional[float] = None
+    ) -> float:
+        """
+        Local counterpart of XtbApi.get_margin_trade, in the account
+        currency. price defaults to the current mid price.
+        """
+        terms = self.terms(symbol)
+        margin = volume * terms.margin_factor * self.rate(terms.currency)
+        if terms.margin_uses_price:
+            margin *= self._price(symbol, price)
+        return margin
+
+    def commission(
+            self,
+            symbol: str,
+            volume: float,
+            price: Optional[float] = None
+    ) -> records.Commission:
+        """
+        Local estimate of XtbApi.get_commission_def
+        """
+        terms = self.terms(symbol)
+        rate = self.rate(terms.currency_profit)
+        notional = volume * terms.contract_size * self._price(symbol, price)
+        return records.Commission(
+            commission=notional * self._commission_rates.get(symbol, 0.0)
+            * rate,
+            rateOfExchange=rate
+        )
+
+    def profits(
+            self,
+            *,
+            close_price: Any,
+            cmd: Any,
+            open_price: Any,
+            symbol: Any,
+            volume: Any
+    ) -> Any:
+        """
+        Batched profit(): every argument is a scalar or an array, they
+        are broadcast against each other. Returns a NumPy array.
+        """
+        require_numpy()
+        point_value, rate = self._columns(
+            symbol, lambda terms: (
+                terms.point_value, self.rate(terms.currency_profit)
+            )
+        )
+        return (
+            _direction(np.asarray(cmd))
+            * (np.asarray(close_price) - np.asarray(open_price))
+            * np.asarray(volume) * point_value * rate
+        )
+
+    def margins(
+            self,
+            symbol: Any,
+            volume: Any,
+            price: Any = None
+    ) -> Any:
+        """
+        Batched margin(), see profits()
+        """
+        require_numpy()
+        factor, uses_price, mid = self._columns(
+            symbol, lambda terms: (
+                terms.margin_factor * self.rate(terms.currency),
+                terms.margin_uses_price,
+                sum(self.bid_ask(terms.symbol)) / 2
+            )
+        )
+        prices = mid if price is None else np.asarray(price)
+        return np.asarray(volume) * factor * np.where(uses_price, prices, 1.0)
+
+    def verify(
+            self,
+            api: Any,
+            positions: Iterable[Dict[str, Any]],
+            sample: Optional[int] = None,
+            rel_tolerance: float = 1e-3,
+            abs_tolerance: float = 0.01
+    ) -> List[CalculationCheck]:
+        """
+        Compares the local profit, margin and commission of the
+        positions with the results of api (an XtbApi).
+        A position has the keyword arguments of profit(). With sample
+        only that many randomly chosen positions are checked.
+        """
+        positions = list(positions)
+        if sample is not None and sample < len(positions):
+            positions = random.sample(positions, sample)
+        checks = []
+
+        def check(kind: str, position, local: float, server: float):
+            ok = math.isclose(
+                local, server, rel_tol=rel_tolerance, abs_tol=abs_tolerance
+            )
+            checks.append(CalculationCheck(kind, position, local, server, ok))
+
+        for position in positions:
+            symbol, volume = position['symbol'], position['volume']
+            check(
+                'profit', position, self.profit(**position),
+                api.get_profit_calculation(**position).profit
+            )
+            check(
+                'margin', position, self.margin(symbol, volume),
+                api.get_margin_trade(symbol, volume).margin
+            )
+            check(
+                'commission', position,
+                self.commission(symbol, volume).commission,
+                api.get_commission_def(symbol, volume).commission
+            )
+        return checks
+
+    def _price(self, symbol: str, price: Optional[float]) -> float:
+        if price is not None:
+            return price
+        bid, ask = self.bid_ask(symbol)
+        return (bid + ask) / 2
+
+    def _columns(self, symbol: Any, values) -> List[Any]:
+        """
+        Returns arrays of the per symbol values aligned with symbol,
+        computing them once per distinct symbol
+        """
+        symbols = np.asarray(symbol)
+        if symbols.ndim == 0:
+            return [np.asarray(v) for v in values(self.terms(str(symbol)))]
+        unique, inverse = np.unique(symbols, return_inverse=True)
+        rows = [values(self.terms(str(name))) for name in unique]
+        return [
+            np.asarray(column)[inverse.reshape(symbols.shape)]
+            for column in zip(*rows)
+        ]
@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import calendar
+import json
+import os
+import struct
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from xtb.columnar import ChartColumns, np, require_numpy
+from xtb.history import HistoryDownloader, split_windows
+from xtb.records import Period
+
+# ctm (epoch ms), open, high, low, close, vol
+CANDLE_FORMAT = '<qddddd'
+CANDLE_SIZE = struct.calcsize(CANDLE_FORMAT)
+
+Candle = Tuple[int, float, float, float, float, float]
+Range = Tuple[int, int]
+
+# The shortest month, so a limit is never placed before the real one
+MONTH = 28 * 24 * 60 * 60_000
+
+# Months of history the server keeps for the periods below D1, older
+# candles are only available in longer periods
+# See http://developers.xstore.pro/documentation/#getChartLastRequest
+HISTORY_MONTHS = {
+    Period.M1: 1, Period.M5: 1, Period.M15: 1,
+    Period.M30: 7, Period.H1: 7,
+    Period.H4: 13,
+}
+
+
+def merge_ranges(ranges: Iterable[Range]) -> List[Range]:
+    """
+    Merges overlapping and touching [start, end] ranges
+    """
+    merged: List[List[int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def subtract_ranges(
+        start: int,
+        end: int,
+        covered: Sequence[Range]
+) -> List[Range]:
+    """
+    Returns the parts of [start, end] not covered by the merged ranges
+    """
+    missing = []
+    cursor = start
+    for covered_start, covered_end in covered:
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            missing.append((cursor, covered_start - 1))
+        cursor = max(cursor, covered_end + 1)
+    if cursor <= end:
+        missing.append((cursor, end))
+    return missing
+
+
+def period_start(period: int, timestamp: int) -> int:
+    """
+    Returns the start of the candle of the period (minutes) containing
+    the timestamp (epoch ms). W1 candles start on Mondays and MN1 candles
+    on the first day of the month, in UTC.
+    """
+    if period == Period.W1:
+        day = datetime.fromtimestamp(timestamp // 1000, timezone.utc).date()
+        day -= timedelta(days=day.weekday())
+    elif period == Period.MN1:
+        day = datetime.fromtimestamp(timestamp // 1000, timezone.utc).date()
+        day = day.replace(day=1)
+    else:
+        period_ms = period * 60_000
+        return timestamp // period_ms * period_ms
+    return calendar.timegm(day.timetuple()) * 1000
+
+
+def history_start(period: int, now: int) -> Optional[int]:
+    """
+    Returns the earliest time (epoch ms) from which the server surely
+    has candles of the period, None if its history is not limited
+    """
+    months = HISTORY_MONTHS.get(period)
+    if months is None:
+        return None
+    return now - months * MONTH
+
+
+class CandleSeries:
+    """
+    Candles of one symbol and period stored in an append-only file of
+    fixed-width records. Each append adds a segment remembering the
+    time range it covers, so the series knows which ranges it holds even
+    when they contain no candles (weekends, holidays).
+    """
+    DATA_FILE = 'candles.bin'
+    INDEX_FILE = 'segments.json'
+
+    def __init__(self, directory: str, symbol: str, period: int) -> None:
+        self.symbol = symbol
+        self.period = period
+        self._directory = directory
+        self._data_path = os.path.join(directory, self.DATA_FILE)
+        self._index_path = os.path.join(directory, self.INDEX_FILE)
+        self._lock = threading.Lock()
+        self._digits = 5
+        self._segments: List[Dict[str, int]] = []
+        if os.path.exists(self._index_path):
+            with open(self._index_path, encoding='utf-8') as f:
+                index = json.load(f)
+            self._digits = index['digits']
+            self._segments = index['segments']
+
+    def __len__(self) -> int:
+        return sum(segment['count'] for segment in self._segments)
+
+    def covered(self) -> List[Range]:
+        """
+        Returns the merged time ranges held by the series
+        """
+        return merge_ranges(
+            (s['start'], s['end']) for s in self._segments
+        )
+
+    def missing(self, start: int, end: int) -> List[Range]:
+        """
+        Returns the parts of [start, end] that are not stored yet
+        """
+        return subtract_ranges(start, end, self.covered())
+
+    def append(
+            self,
+            start: int,
+            end: int,
+            candles: Iterable[Candle],
+            digits: Optional[int] = None
+    ) -> int:
+        """
+        Stores the candles fetched for the [start, end] range.
+        Candles outside the range are dropped.
+        Returns the number of stored candles
+        """
+        rows = sorted(c for c in candles if start <= c[0] <= end)
+        packed = b''.join(struct.pack(CANDLE_FORMAT, *row) for row in rows)
+        with self._lock:
+            os.makedirs(self._directory, exist_ok=True)
+            with open(self._data_path, 'ab') as f:
+                offset = f.tell() // CANDLE_SIZE
+                f.write(packed)
+            if digits is not None:
+                self._digits = digits
+            self._segments.append({
+                'start': start, 'end': end,
+                'offset': offset, 'count': len(rows)
+            })
+            self._write_index()
+        return len(rows)
+
+    def append_columns(
+            self,
+            start: int,
+            end: int,
+            columns: ChartColumns
+    ) -> int:
+        """
+        Stores the candles of a columnar chart response
+        """
+        candles = zip(
+            columns.ctm.tolist(), columns.open.tolist(),
+            columns.high.tolist(), columns.low.tolist(),
+            columns.close.tolist(), columns.vol.tolist()
+        )
+        return self.append(start, end, candles, digits=columns.digits)
+
+    def rows(self, start: int, end: int) -> List[Candle]:
+        """
+        Returns the stored candles between start and end as tuples,
+        ordered by time. Does not require NumPy.
+        """
+        by_ctm: Dict[int, Candle] = {}
+        with self._lock:
+            segments = self._overlapping(start, end)
+            if not segments:
+                return []
+            with open(self._data_path, 'rb') as f:
+                for segment in segments:
+                    f.seek(segment['offset'] * CANDLE_SIZE)
+                    data = f.read(segment['count'] * CANDLE_SIZE)
+                    for row in struct.iter_unpack(CANDLE_FORMAT, data):
+                        if start <= row[0] <= end:
+                            by_ctm[row[0]] = row
+        return [by_ctm[ctm] for ctm in sorted(by_ctm)]
+
+    def read(self, start: int, end: int) -> ChartColumns:
+        """
+        Returns the stored candles between start and end as columns
+        read through a memory map
+        """
+        require_numpy()
+        with self._lock:
+            segments = self._overlapping(start, end)
+            if not segments:
+                return _empty_columns(self._digits)
+            records = np.memmap(self._data_path, dtype=_dtype(), mode='r')
+            parts = []
+            for segment in segments:
+                part = records[
+                    segment['offset']:segment['offset'] + segment['count']
+                ]
+                ctm = part['ctm']
+                lo, hi = np.searchsorted(ctm, [start, end + 1])
+                parts.append(part[lo:hi])
+        if len(parts) == 1:
+            selected = parts[0]
+        else:
+            selected = np.concatenate(parts)
+            order = np.argsort(selected['ctm'], kind='stable')
+            selected = selected[order]
+            # Keep the most recently stored copy of duplicated candles
+            ctm = selected['ctm']
+            last = np.append(ctm[1:] != ctm[:-1], True)
+            selected = selected[last]
+        return ChartColumns(
+            digits=self._digits, exemode=1, ctm=selected['ctm'],
+            open=selected['open'], high=selected['high'],
+            low=selected['low'], close=selected['close'],
+            vol=selected['vol']
+        )
+
+    def _overlapping(self, start: int, end: int) -> List[Dict[str, int]]:
+        return [
+            s for s in self._segments
+            if s['count'] and s['start'] <= end and s['end'] >= start
+        ]
+
+    def _write_index(self) -> None:
+        tmp_path = f'{self._index_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(
+                {'digits': self._digits, 'segments': self._segments}, f
+            )
+        os.replace(tmp_path, self._index_path)
+
+
+class CandleStore:
+    """
+    Local store of candle series, one directory per symbol and period.
+    fetch() only asks the server for the ranges the store does not hold.
+    """
+
+    WINDOW_CANDLES = HistoryDownloader.WINDOW_CANDLES
+
+    def __init__(self, root: str) -> None:
+        self._root = root
+        self._series: Dict[Tuple[str, int], CandleSeries] = {}
+        self._lock = threading.Lock()
+
+    def series(self, symbol: str, period: int) -> CandleSeries:
+        with self._lock:
+            key = (symbol, period)
+            series = self._series.get(key)
+            if series is None:
+                directory = os.path.join(self._root, symbol, str(period))
+                series = self._series[key] = CandleSeries(
+                    directory, symbol, period
+                )
+            return series
+
+    def fetch(
+            self,
+            api: Any,
+            symbol: str,
+            period: int,
+            start: int,
+            end: int
+    ) -> ChartColumns:
+        """
+        Returns the closed candles between start and end (epoch ms),
+        downloading only the missing ranges with api (an XtbApi) and
+        storing them first. The candle that is still forming is neither
+        stored nor returned.
+        Downloaded windows are stored as covered even without candles
+        (market closed). Only windows reaching past the history limit
+        of the period are covered from their first candle on.
+        """
+        series = self.series(symbol, period)
+        now = int(time.time() * 1000)
+        end = min(end, period_start(period, now) - 1)
+        limit = history_start(period, now)
+        for missing_start, missing_end in series.missing(start, end):
+            windows = split_windows(
+                missing_start, missing_end, period, self.WINDOW_CANDLES
+            )
+            for window_start, window_end in windows:
+                columns = api.get_chart_range_request(
+                    end=window_end, period=period, start=window_start,
+                    symbol=symbol, ticks=0, columnar=True
+                )
+                covered_start = window_start
+                if limit is not None and window_start < limit:
+                    # The server cuts the history at its per period
+                    # limit, the part before the first candle stays
+                    # missing
+                    if not len(columns):
+                        continue
+                    first = int(columns.ctm[0])
+                    if first - window_start >= period * 60_000:
+                        covered_start = first
+                series.append_columns(covered_start, window_end, columns)
+        return series.read(start, end)
+
+
+def _dtype():
+    return np.dtype([
+        ('ctm', '<i8'), ('open', '<f8'), ('high', '<f8'),
+        ('low', '<f8'), ('close', '<f8'), ('vol', '<f8')
+    ])
+
+
+def _empty_columns(digits: int) -> ChartColumns:
+    empty = np.empty(0, dtype=np.float64)
+    return ChartColumns(
+        digits=digits, exemode=1, ctm=np.empty(0, dtype=np.int64),
+        open=empty, high=empty, low=empty, close=empty, vol=empty
+    )
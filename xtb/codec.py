@@ -0,0 +1,142 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Type
+
+
+class JsonCodec(ABC):
+    """
+    Base class for the JSON codecs used on the wire.
+    encode() returns compact bytes ready to be sent, decode() accepts the
+    raw bytes of a single frame. Both raise ValueError on invalid input.
+    """
+    name = ''
+
+    @abstractmethod
+    def encode(self, data: Any) -> bytes:
+        pass
+
+    @abstractmethod
+    def decode(self, data: bytes) -> Any:
+        pass
+
+
+class StdlibCodec(JsonCodec):
+    """
+    Codec based on the standard library json module
+    """
+    name = 'json'
+
+    def __init__(self) -> None:
+        self._encoder = json.JSONEncoder(
+            separators=(',', ':'), ensure_ascii=False
+        )
+
+    def encode(self, data: Any) -> bytes:
+        return self._encoder.encode(data).encode('utf-8')
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    Codec based on orjson. Requires the orjson package.
+    """
+    name = 'orjson'
+
+    def __init__(self) -> None:
+        import orjson
+        self._dumps = orjson.dumps
+        self._loads = orjson.loads
+
+    def encode(self, data: Any) -> bytes:
+        return self._dumps(data)
+
+    def decode(self, data: bytes) -> Any:
+        return self._loads(data)
+
+
+class UjsonCodec(JsonCodec):
+    """
+    Codec based on ujson. Requires the ujson package.
+    """
+    name = 'ujson'
+
+    def __init__(self) -> None:
+        import ujson
+        self._dumps = ujson.dumps
+        self._loads = ujson.loads
+
+    def encode(self, data: Any) -> bytes:
+        return self._dumps(data, ensure_ascii=False).encode('utf-8')
+
+    def decode(self, data: bytes) -> Any:
+        return self._loads(data)
+
+
+class MsgspecCodec(JsonCodec):
+    """
+    Codec based on msgspec. Requires the msgspec package.
+    """
+    name = 'msgspec'
+
+    def __init__(self) -> None:
+        import msgspec
+        self._error = msgspec.DecodeError
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def encode(self, data: Any) -> bytes:
+        return self._encoder.encode(data)
+
+    def decode(self, data: bytes) -> Any:
+        try:
+            return self._decoder.decode(data)
+        except self._error as ex:
+            raise ValueError(str(ex)) from ex
+
+
+CODECS: Dict[str, Type[JsonCodec]] = {
+    codec.name: codec
+    for codec in (StdlibCodec, OrjsonCodec, UjsonCodec, MsgspecCodec)
+}
+
+# Fastest first
+_PREFERENCE = ('orjson', 'msgspec', 'ujson', 'json')
+
+
+def get_codec(name: str) -> JsonCodec:
+    """
+    Returns a new codec instance by its name
+    Raises:
+        ValueError if the name is unknown
+        ImportError if the package backing the codec is not installed
+    """
+    try:
+        codec = CODECS[name]
+    except KeyError:
+        raise ValueError(
+            f'Unknown codec {name!r}, expected one of {sorted(CODECS)}'
+        ) from None
+    return codec()
+
+
+def available_codecs() -> List[str]:
+    """
+    Returns the names of the codecs that can be used in this environment
+    """
+    names = []
+    for name in _PREFERENCE:
+        try:
+            get_codec(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def fastest_codec() -> JsonCodec:
+    """
+    Returns the fastest codec available in this environment
+    """
+    return get_codec(available_codecs()[0])
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from operator import itemgetter
+from typing import Any, Dict
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise ImportError('numpy is required for the columnar chart data')
+
+
+class ChartColumns:
+    """
+    Columnar alternative of records.ChartResponse.
+    ctm holds epoch milliseconds (int64), the prices are float64 arrays
+    with the xAPI relative encoding already resolved: open is divided
+    by 10 ** digits and close/high/low are absolute prices instead of
+    offsets from open.
+    """
+    __slots__ = (
+        'digits', 'exemode', 'ctm', 'open', 'high', 'low', 'close', 'vol'
+    )
+
+    def __init__(
+            self,
+            *,
+            digits: int,
+            exemode: int,
+            ctm: Any,
+            open: Any,
+            high: Any,
+            low: Any,
+            close: Any,
+            vol: Any
+    ) -> None:
+        self.digits = digits
+        self.exemode = exemode
+        self.ctm = ctm
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.vol = vol
+
+    def __len__(self) -> int:
+        return len(self.ctm)
+
+    @classmethod
+    def from_dict(cls, dictionary: Dict[str, Any]) -> ChartColumns:
+        """
+        Builds the columns straight from the decoded returnData without
+        creating a record per candle
+        """
+        require_numpy()
+        digits = dictionary['digits']
+        rate_infos = dictionary['rateInfos']
+        count = len(rate_infos)
+
+        def column(key: str, dtype) -> Any:
+            return np.fromiter(
+                map(itemgetter(key), rate_infos), dtype=dtype, count=count
+            )
+
+        scale = 10.0 ** -digits
+        open_ = column('open', np.float64)
+        return cls(
+            digits=digits,
+            exemode=dictionary['exemode'],
+            ctm=column('ctm', np.int64),
+            open=open_ * scale,
+            high=(open_ + column('high', np.float64)) * scale,
+            low=(open_ + column('low', np.float64)) * scale,
+            close=(open_ + column('close', np.float64)) * scale,
+            vol=column('vol', np.float64)
+        )
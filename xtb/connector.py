@@ -1,40 +1,273 @@
-import itertools
-import json
+import asyncio
 import socket
 import ssl
+import threading
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from xtb.codec import JsonCodec, StdlibCodec
 from xtb.exceptions import XtbApiError, XtbSocketError
+from xtb.framing import FrameReader
+from xtb.metrics import Metrics, Span
+from xtb.ratelimit import IntervalRateLimiter, RateLimiter
 
 
-class SyncConnector:
+class BaseConnector:
+    """
+    State and helpers shared by the sync and async connectors
+    """
     END_TOKEN = b'\n\n'
-    SLEEP_INTERVAL = 0.2
+    REQUEST_INTERVAL = 0.2
+
+    def __init__(
+            self,
+            rate_limiter: Optional[RateLimiter] = None,
+            codec: Optional[JsonCodec] = None,
+            metrics: Optional[Metrics] = None
+    ) -> None:
+        if rate_limiter is None:
+            rate_limiter = IntervalRateLimiter(self.REQUEST_INTERVAL)
+        self._rate_limiter = rate_limiter
+        self._codec = codec if codec is not None else StdlibCodec()
+        self._metrics = metrics
+
+    @staticmethod
+    def _build_packet(
+            command: str,
+            arguments: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        data = {'command': command}
+        if arguments:
+            data['arguments'] = arguments
+        return data
+
+    def _response_to_dict(self, content: bytes) -> Dict[str, Any]:
+        # TODO: Raise
+        return self._codec.decode(content)
+
+    @staticmethod
+    def _raise_if_wrong_status(response: Dict[str, Any]) -> None:
+        if response.get('status', True):
+            return
+        error_code = response.get('errorCode', 'Unknown Error')
+        description = response.get('errorDescr', 'Unknown Description')
+        raise XtbApiError(code=error_code, description=description)
+
+
+# family, type, proto, socket address
+Address = Tuple[int, int, int, Tuple[Any, ...]]
+# context, host, port
+SessionKey = Tuple[ssl.SSLContext, str, int]
+
+
+class ConnectCache:
+    """
+    Resolved addresses and TLS sessions shared between connectors, so
+    reconnecting skips the DNS lookup and resumes the TLS session
+    instead of a full handshake.
+    Addresses are kept for ttl seconds.
+    """
+
+    def __init__(self, ttl: float = 300.0) -> None:
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # (host, port) -> expiry, addresses
+        self._addresses: Dict[Tuple[str, int], Tuple[float, List[Address]]]
+        self._addresses = {}
+        self._sessions: Dict[SessionKey, ssl.SSLSession] = {}
+
+    def addresses(self, host: str, port: int) -> List[Address]:
+        """
+        Returns the resolved TCP addresses of the host
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._addresses.get((host, port))
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        addresses = [
+            (family, type_, proto, address)
+            for family, type_, proto, _, address in socket.getaddrinfo(
+                host, port, type=socket.SOCK_STREAM
+            )
+        ]
+        with self._lock:
+            self._addresses[(host, port)] = (now + self._ttl, addresses)
+        return addresses
+
+    def invalidate(self, host: str, port: int) -> None:
+        """
+        Forgets the addresses and TLS sessions of the host
+        """
+        with self._lock:
+            self._addresses.pop((host, port), None)
+            for key in [k for k in self._sessions if k[1:] == (host, port)]:
+                del self._sessions[key]
+
+    def session(
+            self,
+            context: ssl.SSLContext,
+            host: str,
+            port: int
+    ) -> Optional[ssl.SSLSession]:
+        with self._lock:
+            return self._sessions.get((context, host, port))
+
+    def store_session(
+            self,
+            context: ssl.SSLContext,
+            host: str,
+            port: int,
+            session: Optional[ssl.SSLSession]
+    ) -> None:
+        # Sessions can only be resumed with the context that created them
+        if session is None:
+            return
+        with self._lock:
+            self._sessions[(context, host, port)] = session
+
+
+DEFAULT_CONNECT_CACHE = ConnectCache()
+_default_ssl_context: Optional[ssl.SSLContext] = None
+
+
+def default_ssl_context() -> ssl.SSLContext:
+    """
+    Returns the client SSLContext shared by the connectors
+    """
+    global _default_ssl_context
+    if _default_ssl_context is None:
+        _default_ssl_context = ssl.create_default_context()
+    return _default_ssl_context
+
+
+def create_connection(
+        host: str,
+        port: int,
+        wrap: Callable[[socket.socket], socket.socket],
+        connect_cache: ConnectCache,
+        connect_timeout: float
+) -> socket.socket:
+    """
+    Tries the resolved addresses of the host in order until one connects
+    and returns its socket wrapped with wrap, e.g. in TLS. Sockets have
+    TCP_NODELAY set, connect_timeout limits the TCP connect and wrap of
+    every address in seconds.
+    Raises:
+        OSError of the last address if none of them connects
+    """
+    error: Optional[OSError] = None
+    for family, type_, proto, address in connect_cache.addresses(host, port):
+        s = socket.socket(family, type_, proto)
+        try:
+            s.settimeout(connect_timeout)
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            s.connect(address)
+            wrapped = wrap(s)
+            wrapped.settimeout(None)
+        except OSError as ex:
+            s.close()
+            error = ex
+            continue
+        return wrapped
+    # The host may have moved, resolve it again next time
+    connect_cache.invalidate(host, port)
+    if error is None:
+        error = OSError(f'No address found for {host}:{port}')
+    raise error
+
+
+def wrap_tls(
+        s: socket.socket,
+        context: ssl.SSLContext,
+        connect_cache: ConnectCache,
+        host: str,
+        port: int
+) -> ssl.SSLSocket:
+    """
+    Wraps the socket in TLS, resuming the cached session of the host
+    """
+    return context.wrap_socket(
+        s, server_hostname=host,
+        session=connect_cache.session(context, host, port)
+    )
+
+
+def store_tls_session(
+        s: Optional[socket.socket],
+        context: ssl.SSLContext,
+        connect_cache: ConnectCache,
+        host: str,
+        port: int
+) -> None:
+    if isinstance(s, ssl.SSLSocket):
+        connect_cache.store_session(context, host, port, s.session)
+
+
+class SyncConnector(BaseConnector):
     CHUNK_SIZE = 8192
-    JSON_INDENT = 4
-    ENCODING = 'utf-8'
+    CONNECT_TIMEOUT = 10.0
 
-    def __init__(self):
+    def __init__(
+            self,
+            rate_limiter: Optional[RateLimiter] = None,
+            codec: Optional[JsonCodec] = None,
+            metrics: Optional[Metrics] = None,
+            *,
+            ssl_context: Optional[ssl.SSLContext] = None,
+            connect_cache: Optional[ConnectCache] = None,
+            connect_timeout: float = CONNECT_TIMEOUT
+    ) -> None:
+        """
+        ssl_context defaults to the shared default_ssl_context().
+        connect_cache defaults to DEFAULT_CONNECT_CACHE.
+        connect_timeout limits the TCP connect and the TLS handshake of
+        every address in seconds.
+        """
+        super().__init__(
+            rate_limiter=rate_limiter, codec=codec, metrics=metrics
+        )
+        self._ssl_context = ssl_context
+        self._connect_cache = connect_cache if connect_cache is not None \
+            else DEFAULT_CONNECT_CACHE
+        self._connect_timeout = connect_timeout
+        self._host: Optional[str] = None
+        self._port: Optional[int] = None
         self._socket: Optional[socket.socket] = None
+        self._frame_reader = FrameReader(self.END_TOKEN, self.CHUNK_SIZE)
+        self._lock = threading.Lock()
 
-    def connect(self, host: str, port: int) -> None:
-
-        def get_host_address() -> str:
-            return socket.getaddrinfo(host, port)[0][4][0]
+    @property
+    def session_reused(self) -> bool:
+        """
+        Whether the current connection resumed a cached TLS session
+        """
+        return bool(getattr(self._socket, 'session_reused', False))
 
+    def connect(self, host: str, port: int) -> None:
+        """
+        Tries the resolved addresses of the host in order until one
+        connects.
+        Raises:
+            OSError of the last address if none of them connects
+        """
         if self.is_connected():
             raise XtbSocketError('Tried to connect() without calling close()')
 
-        host_address = get_host_address()
-        s = socket.socket()
-        s.connect((host_address, port))
-        self._socket = ssl.wrap_socket(s)
+        self._host, self._port = host, port
+        self._socket = create_connection(
+            host, port, self._wrap_socket, self._connect_cache,
+            self._connect_timeout
+        )
+        self._frame_reader.reset()
+        self._store_session()
 
     def close(self) -> None:
         if not self.is_connected():
             raise XtbSocketError('Tried to close() without calling connect()')
 
+        # TLS 1.3 sends the resumable session after the handshake
+        self._store_session()
         self._socket.close()
         self._socket = None
 
@@ -53,42 +286,250 @@ class SyncConnector:
                 'Tried to use the API without calling connect() first'
             )
 
-        data = {'command': command}
-        if arguments:
-            data['arguments'] = arguments
+        if self._metrics is not None:
+            return self._handle_command_measured(command, arguments)
 
-        self._send_packet(data)
-        response = self._get_response()
+        with self._lock:
+            self._send_packet(self._build_packet(command, arguments))
+            response = self._get_response()
         self._raise_if_wrong_status(response)
         return response
 
+    def _handle_command_measured(
+            self,
+            command: str,
+            arguments: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        span = Span(command)
+        try:
+            with self._lock:
+                self._send_packet_measured(
+                    self._build_packet(command, arguments), span
+                )
+                response = self._get_response_measured(span)
+            self._raise_if_wrong_status(response)
+        except Exception as ex:
+            span.error = type(ex).__name__
+            raise
+        finally:
+            self._metrics.record(span)
+        return response
+
+    def _wrap_socket(self, s: socket.socket) -> socket.socket:
+        return wrap_tls(
+            s, self._context(), self._connect_cache, self._host, self._port
+        )
+
+    def _context(self) -> ssl.SSLContext:
+        if self._ssl_context is None:
+            self._ssl_context = default_ssl_context()
+        return self._ssl_context
+
+    def _store_session(self) -> None:
+        store_tls_session(
+            self._socket, self._context(), self._connect_cache, self._host,
+            self._port
+        )
+
     def _send_packet(self, data: Dict[str, Any]) -> None:
-        packet = json.dumps(data, indent=self.JSON_INDENT)
-        self._socket.send(packet.encode(self.ENCODING))
-        time.sleep(self.SLEEP_INTERVAL)
+        packet = self._codec.encode(data)
+        self._rate_limiter.acquire()
+        self._socket.sendall(packet)
 
     def _get_response(self) -> Dict[str, Any]:
-        content = []
-        while True:
-            response = self._socket.recv(self.CHUNK_SIZE)
-            end_idx = response.find(self.END_TOKEN)
-            if end_idx != -1:
-                content.append(response[:end_idx])
-                break
-            content.append(response)
+        content = self._frame_reader.read_frame(self._socket)
         return self._response_to_dict(content)
 
-    def _response_to_dict(self, content: List[bytes]) -> Dict[str, Any]:
-        # TODO: Raise
-        mapped = map(
-            lambda x: x.decode(self.ENCODING), itertools.chain(content)
+    def _send_packet_measured(self, data: Dict[str, Any], span: Span) -> None:
+        packet = self._codec.encode(data)
+        span.mark('encode')
+        self._rate_limiter.acquire()
+        span.mark('rate_limit')
+        self._socket.sendall(packet)
+        span.mark('send')
+        span.bytes_sent = len(packet)
+
+    def _get_response_measured(self, span: Span) -> Dict[str, Any]:
+        reader = self._frame_reader
+        content = reader.next_frame()
+        if content is None:
+            # Waits for the first bytes of the response
+            reader.receive(self._socket)
+            span.mark('server')
+            content = reader.read_frame(self._socket)
+        else:
+            span.mark('server')
+        span.mark('receive')
+        span.bytes_received = len(content) + len(self.END_TOKEN)
+        response = self._response_to_dict(content)
+        span.mark('decode')
+        return response
+
+
+class AsyncConnector(BaseConnector):
+    """
+    asyncio counterpart of SyncConnector.
+    Commands sent through one connector are serialized, use several
+    connectors to run commands concurrently.
+    A command cancelled after it was sent closes the connection, as its
+    response would otherwise be read by the next command.
+    """
+    READ_LIMIT = 2 ** 27
+
+    def __init__(
+            self,
+            rate_limiter: Optional[RateLimiter] = None,
+            codec: Optional[JsonCodec] = None,
+            metrics: Optional[Metrics] = None
+    ) -> None:
+        super().__init__(
+            rate_limiter=rate_limiter, codec=codec, metrics=metrics
         )
-        return json.loads(''.join(mapped))
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._in_flight = False
 
-    @staticmethod
-    def _raise_if_wrong_status(response: Dict[str, Any]) -> None:
-        if response.get('status', True):
-            return
-        error_code = response.get('errorCode', 'Unknown Error')
-        description = response.get('errorDescr', 'Unknown Description')
-        raise XtbApiError(code=error_code, description=description)
+    async def connect(self, host: str, port: int) -> None:
+        if self.is_connected():
+            raise XtbSocketError('Tried to connect() without calling close()')
+
+        self._reader, self._writer = await asyncio.open_connection(
+            host, port, ssl=self._create_ssl_context(), limit=self.READ_LIMIT
+        )
+        self._lock = asyncio.Lock()
+        self._in_flight = False
+
+    async def close(self) -> None:
+        if self._writer is None:
+            raise XtbSocketError('Tried to close() without calling connect()')
+
+        writer = self._writer
+        self._reader = self._writer = None
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (ConnectionError, ssl.SSLError):
+            pass
+
+    def is_connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def handle_command(
+            self,
+            *,
+            command: str,
+            arguments: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+
+        if self._writer is None:
+            raise XtbSocketError(
+                'Tried to use the API without calling connect() first'
+            )
+
+        if self._metrics is not None:
+            return await self._handle_command_measured(command, arguments)
+
+        async with self._lock:
+            self._check_in_sync()
+            try:
+                await self._send_packet(self._build_packet(command, arguments))
+                response = await self._get_response()
+            except BaseException:
+                self._close_if_in_flight()
+                raise
+        self._raise_if_wrong_status(response)
+        return response
+
+    async def _handle_command_measured(
+            self,
+            command: str,
+            arguments: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        span = Span(command)
+        try:
+            async with self._lock:
+                self._check_in_sync()
+                try:
+                    await self._send_packet_measured(
+                        self._build_packet(command, arguments), span
+                    )
+                    response = await self._get_response_measured(span)
+                except BaseException:
+                    self._close_if_in_flight()
+                    raise
+            self._raise_if_wrong_status(response)
+        except Exception as ex:
+            span.error = type(ex).__name__
+            raise
+        finally:
+            self._metrics.record(span)
+        return response
+
+    def _create_ssl_context(self) -> ssl.SSLContext:
+        return ssl.create_default_context()
+
+    def _check_in_sync(self) -> None:
+        if self._writer.is_closing():
+            raise XtbSocketError(
+                'The connection was closed, reconnect with close() and '
+                'connect()'
+            )
+
+    def _close_if_in_flight(self) -> None:
+        # The response of a sent command is still on its way
+        if self._in_flight:
+            self._in_flight = False
+            self._writer.close()
+
+    async def _send_packet(self, data: Dict[str, Any]) -> None:
+        packet = self._codec.encode(data)
+        delay = self._rate_limiter.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._in_flight = True
+        self._writer.write(packet)
+        await self._writer.drain()
+
+    async def _get_response(self) -> Dict[str, Any]:
+        try:
+            content = await self._reader.readuntil(self.END_TOKEN)
+        except asyncio.IncompleteReadError as ex:
+            raise XtbSocketError(
+                'The connection was closed by the server'
+            ) from ex
+        self._in_flight = False
+        return self._response_to_dict(content[:-len(self.END_TOKEN)])
+
+    async def _send_packet_measured(
+            self,
+            data: Dict[str, Any],
+            span: Span
+    ) -> None:
+        packet = self._codec.encode(data)
+        span.mark('encode')
+        delay = self._rate_limiter.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        span.mark('rate_limit')
+        self._in_flight = True
+        self._writer.write(packet)
+        await self._writer.drain()
+        span.mark('send')
+        span.bytes_sent = len(packet)
+
+    async def _get_response_measured(self, span: Span) -> Dict[str, Any]:
+        # The stream reader does not expose the arrival of the first
+        # bytes, 'server' includes receiving the response
+        try:
+            content = await self._reader.readuntil(self.END_TOKEN)
+        except asyncio.IncompleteReadError as ex:
+            raise XtbSocketError(
+                'The connection was closed by the server'
+            ) from ex
+        self._in_flight = False
+        span.mark('server')
+        span.bytes_received = len(content)
+        response = self._response_to_dict(content[:-len(self.END_TOKEN)])
+        span.mark('decode')
+        return response
@@ -26,3 +26,10 @@ class XtbSocketError(XtbException):
     Raised for the client-side socket errors
     """
     pass
+
+
+class XtbReplayError(XtbException):
+    """
+    Raised by the replay connector for requests missing in the recording
+    """
+    pass
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from typing import Any, Callable, NamedTuple, Optional, Tuple, TypeVar
+
+from xtb import XtbApi
+from xtb.exceptions import XtbException, XtbSocketError
+from xtb.pool import create_session, discard_session
+
+T = TypeVar('T')
+
+# XtbApi methods that only read data and can be sent again safely
+IDEMPOTENT_METHODS = frozenset(
+    [name for name in dir(XtbApi) if name.startswith('get_')]
+    + ['ping', 'trade_transaction_status']
+)
+
+
+class FailoverStats(NamedTuple):
+    """
+    Snapshot of the failover counters, times are in seconds
+    """
+    failovers: int
+    replays: int
+    standby_ready: bool
+    last_failover_time: float
+    max_failover_time: float
+
+
+class ResilientSession:
+    """
+    Logged in XtbApi session backed by a hot standby connection.
+    The standby is connected and logged in up front and kept warm by
+    a background thread that pings it every ping_interval seconds.
+    When a call on the active session fails with a socket error the
+    standby takes its place, idempotent (read) calls are replayed on it
+    and other calls, e.g. trade_transaction, re-raise the error since
+    the server may have executed them. A new standby is then prepared
+    in the background.
+    XtbApi methods can be called on the session directly:
+        with ResilientSession(user, password) as session:
+            session.get_symbol('EURUSD')
+    The streaming session id changes on failover, on_failover is called
+    with the new session to e.g. restart the streaming client.
+    """
+    PING_INTERVAL = 30.0
+
+    def __init__(
+            self,
+            user: str,
+            password: str,
+            *,
+            app_name: Optional[str] = None,
+            api_factory: Callable[[], XtbApi] = XtbApi,
+            ping_interval: float = PING_INTERVAL,
+            on_failover: Optional[Callable[[XtbApi], None]] = None
+    ) -> None:
+        """
+        api_factory creates not yet connected XtbApi instances, see
+        XtbApiPool
+        """
+        self._user = user
+        self._password = password
+        self._app_name = app_name
+        self._api_factory = api_factory
+        self._ping_interval = ping_interval
+        self._on_failover = on_failover
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._active: Optional[XtbApi] = None
+        self._standby: Optional[XtbApi] = None
+        # The failed session being replaced and the event set once done
+        self._swapping: Optional[Tuple[XtbApi, threading.Event]] = None
+        self._keeper: Optional[threading.Thread] = None
+        self._is_open = False
+        self._failovers = 0
+        self._replays = 0
+        self._last_failover_time = 0.0
+        self._max_failover_time = 0.0
+
+    def __enter__(self) -> ResilientSession:
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        attribute = getattr(self.api, name)
+        if not callable(attribute):
+            return attribute
+        idempotent = name in IDEMPOTENT_METHODS
+
+        @functools.wraps(attribute)
+        def call(*args, **kwargs):
+            return self.run(
+                lambda api: getattr(api, name)(*args, **kwargs),
+                idempotent=idempotent
+            )
+        return call
+
+    @property
+    def api(self) -> XtbApi:
+        """
+        The active session
+        """
+        active = self._active
+        if active is None:
+            raise XtbSocketError('Tried to use the session without open()')
+        return active
+
+    def open(self) -> None:
+        """
+        Connects and logs in the active and the standby sessions
+        Raises:
+            XtbSocketError if open() was called more than once before close()
+        """
+        if self._is_open:
+            raise XtbSocketError('Tried to open() without calling close()')
+        active = self._create_session()
+        try:
+            standby = self._create_session()
+        except Exception:
+            discard_session(active)
+            raise
+        with self._lock:
+            self._active, self._standby = active, standby
+            self._is_open = True
+        self._wake.clear()
+        self._keeper = threading.Thread(
+            target=self._keep_standby, name='xtb-standby', daemon=True
+        )
+        self._keeper.start()
+
+    def close(self) -> None:
+        with self._lock:
+            self._is_open = False
+            sessions = [self._active, self._standby]
+            self._active = self._standby = None
+        self._wake.set()
+        if self._keeper is not None:
+            self._keeper.join()
+            self._keeper = None
+        for api in sessions:
+            if api is not None:
+                discard_session(api)
+
+    def run(self, func: Callable[[XtbApi], T], idempotent: bool) -> T:
+        """
+        Calls func with the active session, failing over to the standby
+        on socket errors. func is called again on the new session only
+        if it is idempotent.
+        """
+        api = self.api
+        try:
+            return func(api)
+        except (XtbSocketError, OSError):
+            replacement = self._failover(api)
+            if not idempotent:
+                raise
+        with self._lock:
+            self._replays += 1
+        return func(replacement)
+
+    def stats(self) -> FailoverStats:
+        with self._lock:
+            return FailoverStats(
+                failovers=self._failovers,
+                replays=self._replays,
+                standby_ready=self._standby is not None,
+                last_failover_time=self._last_failover_time,
+                max_failover_time=self._max_failover_time
+            )
+
+    def _failover(self, failed: XtbApi) -> XtbApi:
+        started = time.perf_counter()
+        while True:
+            with self._lock:
+                if self._active is not failed:
+                    # Another thread has already swapped the sessions
+                    return self.api
+                swapping = self._swapping
+                if swapping is None or swapping[0] is not failed:
+                    done = threading.Event()
+                    self._swapping = (failed, done)
+                    standby, self._standby = self._standby, None
+                    break
+            # Waits for the thread replacing the same session
+            swapping[1].wait()
+        try:
+            if standby is None:
+                standby = self._create_session()
+        except BaseException:
+            with self._lock:
+                self._swapping = None
+            done.set()
+            raise
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._active = standby
+            self._swapping = None
+            self._failovers += 1
+            self._last_failover_time = elapsed
+            self._max_failover_time = max(self._max_failover_time, elapsed)
+        done.set()
+        self._wake.set()
+        discard_session(failed)
+        if self._on_failover is not None:
+            self._on_failover(standby)
+        return standby
+
+    def _keep_standby(self) -> None:
+        while True:
+            self._wake.wait(self._ping_interval)
+            self._wake.clear()
+            with self._lock:
+                if not self._is_open:
+                    return
+                standby = self._standby
+            if standby is not None and self._is_alive(standby):
+                continue
+            if standby is not None:
+                with self._lock:
+                    if self._standby is not standby:
+                        # Taken over by a failover meanwhile
+                        continue
+                    self._standby = None
+                discard_session(standby)
+            try:
+                replacement = self._create_session()
+            except (XtbException, OSError):
+                continue
+            with self._lock:
+                if self._is_open and self._standby is None:
+                    self._standby, replacement = replacement, None
+            if replacement is not None:
+                discard_session(replacement)
+
+    @staticmethod
+    def _is_alive(api: XtbApi) -> bool:
+        try:
+            return bool(api.ping())
+        except (XtbException, OSError):
+            return False
+
+    def _create_session(self) -> XtbApi:
+        return create_session(
+            self._api_factory, self._user, self._password, self._app_name
+        )
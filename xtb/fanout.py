@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from operator import methodcaller
+from typing import (
+    Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Union
+)
+
+from xtb import XtbApi
+from xtb.exceptions import XtbSocketError
+from xtb.pool import create_session, discard_session
+
+Command = Union[str, Callable[[XtbApi], Any]]
+
+
+class Account(NamedTuple):
+    """
+    Credentials of one account, name identifies it in the results
+    """
+    name: str
+    user: str
+    password: str
+    app_name: Optional[str] = None
+
+
+class AccountResult(NamedTuple):
+    """
+    Outcome of a command on one account, seconds is the time spent
+    on the account including a reconnect
+    """
+    account: str
+    result: Any
+    error: Optional[BaseException]
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _Session:
+    __slots__ = ('account', 'api', 'lock')
+
+    def __init__(self, account: Account) -> None:
+        self.account = account
+        self.api: Optional[XtbApi] = None
+        self.lock = threading.Lock()
+
+
+class FanOut:
+    """
+    Runs the same command on many accounts concurrently.
+    Every account has its own logged in XtbApi session, so each account
+    keeps its own rate limit. Commands on one account are serialized,
+    at most max_workers accounts are served at once.
+    A session that raised a socket error is closed and logged in again
+    on its next command.
+    """
+
+    def __init__(
+            self,
+            accounts: Iterable[Account],
+            *,
+            api_factory: Callable[[], XtbApi] = XtbApi,
+            max_workers: int = 8
+    ) -> None:
+        """
+        api_factory creates not yet connected XtbApi instances, e.g.
+        functools.partial(XtbApi, host=..., rate_limiter=...).
+        """
+        self._api_factory = api_factory
+        self._sessions: Dict[str, _Session] = {}
+        for account in accounts:
+            if account.name in self._sessions:
+                raise ValueError(f'Duplicate account name {account.name}')
+            self._sessions[account.name] = _Session(account)
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix='xtb-fanout'
+        )
+
+    def __enter__(self) -> FanOut:
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    @property
+    def accounts(self) -> List[str]:
+        return list(self._sessions)
+
+    def open(self) -> Dict[str, AccountResult]:
+        """
+        Connects and logs in all the accounts concurrently.
+        Accounts that failed are retried by their next command.
+        """
+        return self.run(lambda api: True)
+
+    def close(self) -> None:
+        """
+        Logs out and closes all the sessions
+        """
+        self._executor.shutdown(wait=True)
+        for session in self._sessions.values():
+            with session.lock:
+                self._discard(session)
+
+    def run(
+            self,
+            command: Command,
+            *args: Any,
+            accounts: Optional[Iterable[str]] = None,
+            timeout: Optional[float] = None,
+            **kwargs: Any
+    ) -> Dict[str, AccountResult]:
+        """
+        Runs the command on the accounts, all of them by default.
+        command is the name of an XtbApi method called with args and
+        kwargs, e.g. run('get_trades', opened_only=True), or a callable
+        taking the XtbApi session.
+        Returns the results by account name in the order of the accounts.
+        Accounts not done within timeout seconds get a TimeoutError,
+        their command still completes in the background.
+        Raises:
+            KeyError for unknown account names
+        """
+        if isinstance(command, str):
+            command = methodcaller(command, *args, **kwargs)
+        names = list(self._sessions if accounts is None else accounts)
+        unknown = [name for name in names if name not in self._sessions]
+        if unknown:
+            # Nothing is submitted, so no command is left running
+            raise KeyError(f'Unknown accounts: {", ".join(unknown)}')
+        futures = {
+            account: self._executor.submit(
+                self._run_on, self._sessions[account], command
+            )
+            for account in names
+        }
+        wait(futures.values(), timeout)
+        results = {}
+        for account, future in futures.items():
+            if future.done():
+                results[account] = future.result()
+            else:
+                results[account] = AccountResult(
+                    account=account,
+                    result=None,
+                    error=TimeoutError(f'{account} did not finish in time'),
+                    seconds=timeout
+                )
+        return results
+
+    def _run_on(
+            self,
+            session: _Session,
+            command: Callable[[XtbApi], Any]
+    ) -> AccountResult:
+        started = time.perf_counter()
+        result, error = None, None
+        with session.lock:
+            try:
+                if session.api is None:
+                    account = session.account
+                    session.api = create_session(
+                        self._api_factory, account.user, account.password,
+                        account.app_name
+                    )
+                result = command(session.api)
+            except (XtbSocketError, OSError) as ex:
+                self._discard(session)
+                error = ex
+            except Exception as ex:
+                error = ex
+        return AccountResult(
+            account=session.account.name,
+            result=result,
+            error=error,
+            seconds=time.perf_counter() - started
+        )
+
+    @staticmethod
+    def _discard(session: _Session) -> None:
+        api, session.api = session.api, None
+        if api is not None:
+            discard_session(api)
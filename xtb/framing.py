@@ -0,0 +1,97 @@
+import socket
+from typing import Optional
+
+from xtb.exceptions import XtbSocketError
+
+
+class FrameReader:
+    """
+    Splits the incoming byte stream into terminator separated frames.
+    Data is received with recv_into() into a single reusable buffer, only
+    the newly received bytes are scanned for the terminator and any bytes
+    following it are kept for the next frame.
+    """
+
+    def __init__(self, terminator: bytes, chunk_size: int = 8192) -> None:
+        self._terminator = terminator
+        self._chunk_size = chunk_size
+        self._buffer = bytearray(chunk_size)
+        self._start = 0
+        self._end = 0
+        self._scan_from = 0
+
+    def pending(self) -> int:
+        """
+        Returns the number of received bytes that were not consumed yet
+        """
+        return self._end - self._start
+
+    def reset(self) -> None:
+        """
+        Drops any buffered data, e.g. after reconnecting
+        """
+        self._start = self._end = self._scan_from = 0
+
+    def read_frame(self, sock: socket.socket) -> bytes:
+        """
+        Returns the next frame without the terminator
+        Raises:
+            XtbSocketError if the connection was closed by the peer
+        """
+        while True:
+            frame = self.next_frame()
+            if frame is not None:
+                return frame
+            self.receive(sock)
+
+    def next_frame(self) -> Optional[bytes]:
+        """
+        Returns the next complete frame from the buffered data or None
+        """
+        idx = self._buffer.find(self._terminator, self._scan_from, self._end)
+        if idx == -1:
+            # The terminator may be split between this and the next chunk
+            self._scan_from = max(
+                self._start, self._end - len(self._terminator) + 1
+            )
+            return None
+        with memoryview(self._buffer) as view:
+            frame = bytes(view[self._start:idx])
+        self._start = self._scan_from = idx + len(self._terminator)
+        if self._start == self._end:
+            self.reset()
+        return frame
+
+    def feed(self, data: bytes) -> None:
+        """
+        Appends already received data to the buffer
+        """
+        self._make_room(len(data))
+        self._buffer[self._end:self._end + len(data)] = data
+        self._end += len(data)
+
+    def receive(self, sock: socket.socket) -> None:
+        """
+        Blocks until more data arrives and appends it to the buffer
+        Raises:
+            XtbSocketError if the connection was closed by the peer
+        """
+        self._make_room(self._chunk_size)
+        with memoryview(self._buffer) as view:
+            received = sock.recv_into(view[self._end:])
+        if not received:
+            raise XtbSocketError('The connection was closed by the server')
+        self._end += received
+
+    def _make_room(self, size: int) -> None:
+        if len(self._buffer) - self._end >= size:
+            return
+        if self._start:
+            # Move the unconsumed data to the front of the buffer
+            pending = self._end - self._start
+            self._buffer[:pending] = self._buffer[self._start:self._end]
+            self._scan_from -= self._start
+            self._start, self._end = 0, pending
+        missing = size - (len(self._buffer) - self._end)
+        if missing > 0:
+            self._buffer.extend(bytes(max(missing, len(self._buffer))))
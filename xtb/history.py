@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+)
+
+from xtb import records
+from xtb.exceptions import XtbException
+from xtb.pool import XtbApiPool
+
+# done windows, total windows, candles received so far
+ProgressCallback = Callable[[int, int, int], None]
+
+
+# ChartResponse record or raw dictionary (DecodeMode.RAW)
+ChartLike = Union[records.ChartResponse, Dict[str, Any]]
+
+
+def _rate_infos(chart: ChartLike) -> list:
+    if isinstance(chart, dict):
+        return chart['rateInfos']
+    return chart.rateInfos
+
+
+def _ctm(rate_info: Any) -> int:
+    if isinstance(rate_info, dict):
+        return records.timestamp_ms(rate_info['ctm'])
+    return records.timestamp_ms(rate_info.ctm)
+
+
+class HistoryResult(NamedTuple):
+    """
+    Result of a history download, the chart has the type returned by
+    the decode mode of the pool's sessions
+    """
+    chart: ChartLike
+    windows: int
+    retries: int
+    seconds: float
+
+    @property
+    def candles(self) -> int:
+        return len(_rate_infos(self.chart))
+
+    @property
+    def candles_per_second(self) -> float:
+        return self.candles / self.seconds if self.seconds else 0.0
+
+
+def split_windows(
+        start: int,
+        end: int,
+        period: int,
+        window_candles: int
+) -> List[Tuple[int, int]]:
+    """
+    Splits the [start, end] range (epoch milliseconds) into consecutive
+    windows of at most window_candles candles of the period
+    """
+    if end <= start:
+        return []
+    span = period * 60_000 * window_candles
+    return [
+        (window_start, min(window_start + span, end))
+        for window_start in range(start, end, span)
+    ]
+
+
+class HistoryDownloader:
+    """
+    Downloads long chart histories with getChartRangeRequest.
+    The requested range is split into windows that are fetched
+    concurrently on the sessions of an XtbApiPool, failed windows are
+    retried and the candles are merged into one ordered series without
+    duplicates.
+    """
+    WINDOW_CANDLES = 10_000
+
+    def __init__(
+            self,
+            pool: XtbApiPool,
+            *,
+            max_workers: Optional[int] = None,
+            window_candles: int = WINDOW_CANDLES,
+            retries: int = 3,
+            retry_delay: float = 0.5
+    ) -> None:
+        """
+        max_workers defaults to the pool size.
+        Failed windows are retried up to `retries` times, waiting
+        retry_delay * attempt seconds between attempts.
+        """
+        self._pool = pool
+        self._max_workers = max_workers or pool.stats().size
+        self._window_candles = window_candles
+        self._retries = retries
+        self._retry_delay = retry_delay
+
+    def download(
+            self,
+            symbol: str,
+            period: int,
+            start: int,
+            end: int,
+            progress: Optional[ProgressCallback] = None
+    ) -> HistoryResult:
+        """
+        Returns the candles of the symbol between start and end
+        (epoch milliseconds, inclusive).
+        Raises:
+            The last error of a window that failed after all retries
+        """
+        windows = split_windows(start, end, period, self._window_candles)
+        started = time.perf_counter()
+        lock = threading.Lock()
+        state = {'done': 0, 'candles': 0, 'retries': 0}
+
+        def fetch(window: Tuple[int, int]) -> ChartLike:
+            chart, retries = self._fetch_window(symbol, period, *window)
+            with lock:
+                state['done'] += 1
+                state['candles'] += len(_rate_infos(chart))
+                state['retries'] += retries
+                done, candles = state['done'], state['candles']
+            if progress is not None:
+                progress(done, len(windows), candles)
+            return chart
+
+        with ThreadPoolExecutor(self._max_workers) as executor:
+            charts = list(executor.map(fetch, windows))
+
+        return HistoryResult(
+            chart=self._merge(charts, start, end),
+            windows=len(windows),
+            retries=state['retries'],
+            seconds=time.perf_counter() - started
+        )
+
+    def _fetch_window(
+            self,
+            symbol: str,
+            period: int,
+            start: int,
+            end: int
+    ) -> Tuple[ChartLike, int]:
+        attempt = 0
+        while True:
+            try:
+                with self._pool.session() as api:
+                    chart = api.get_chart_range_request(
+                        end=end, period=period, start=start,
+                        symbol=symbol, ticks=0
+                    )
+                return chart, attempt
+            except (XtbException, OSError):
+                attempt += 1
+                if attempt > self._retries:
+                    raise
+                time.sleep(self._retry_delay * attempt)
+
+    @staticmethod
+    def _merge(
+            charts: List[ChartLike],
+            start: int,
+            end: int
+    ) -> ChartLike:
+        # The candles were decoded already, they are reused as they are
+        rate_infos: Dict[int, Any] = {}
+        for chart in charts:
+            for rate_info in _rate_infos(chart):
+                ctm = _ctm(rate_info)
+                if start <= ctm <= end:
+                    rate_infos[ctm] = rate_info
+        merged = [rate_infos[ctm] for ctm in sorted(rate_infos)]
+        if not charts:
+            return records.ChartResponse.construct(
+                digits=0, exemode=0, rateInfos=merged
+            )
+        first = charts[0]
+        if isinstance(first, dict):
+            return dict(first, rateInfos=merged)
+        return first.copy(update={'rateInfos': merged})
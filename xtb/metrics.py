@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# Upper bounds of the latency buckets in seconds, the last bucket is +Inf
+BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Phases recorded by the connectors, in order
+PHASES = ('encode', 'rate_limit', 'send', 'server', 'receive', 'decode')
+# Phases recorded by XtbApi and AsyncXtbApi around the connector
+API_PHASES = ('validate', 'total')
+
+
+class Span:
+    """
+    Timing of a single command. The connector calls mark() at the end
+    of every phase, the phase lasted since the previous mark.
+    Spans are passed to the Metrics hooks once the command finished.
+    """
+    __slots__ = (
+        'command', 'started_at', 'phases', 'bytes_sent', 'bytes_received',
+        'error', '_last'
+    )
+
+    def __init__(self, command: str) -> None:
+        self.command = command
+        # Wall clock start, for exporting the span to a tracing system
+        self.started_at = time.time()
+        self.phases: Dict[str, float] = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.error: Optional[str] = None
+        self._last = time.perf_counter()
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last
+        self._last = now
+
+    @property
+    def duration(self) -> float:
+        return sum(self.phases.values())
+
+
+Hook = Callable[[Span], None]
+
+
+class HistogramSnapshot(NamedTuple):
+    """
+    Latency histogram, counts[i] is the number of observations not above
+    BUCKETS[i] (and above the previous bound), counts[-1] the ones above
+    the last bound
+    """
+    counts: Tuple[int, ...]
+    count: int
+    sum: float
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """
+        Returns the upper bound of the bucket holding the q-quantile
+        """
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank and seen:
+                return bound
+        return 0.0
+
+
+class _Histogram:
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> HistogramSnapshot:
+        return HistogramSnapshot(tuple(self.counts), self.count, self.sum)
+
+
+class CommandStats(NamedTuple):
+    """
+    Snapshot of the metrics of one command
+    """
+    calls: int
+    errors: Dict[str, int]
+    bytes_sent: int
+    bytes_received: int
+    cache_hits: int
+    phases: Dict[str, HistogramSnapshot]
+
+
+class _CommandMetrics:
+    __slots__ = (
+        'calls', 'errors', 'bytes_sent', 'bytes_received', 'cache_hits',
+        'phases'
+    )
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors: Dict[str, int] = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.cache_hits = 0
+        self.phases: Dict[str, _Histogram] = {}
+
+    def observe(self, phase: str, value: float) -> None:
+        histogram = self.phases.get(phase)
+        if histogram is None:
+            histogram = self.phases[phase] = _Histogram()
+        histogram.observe(value)
+
+    def snapshot(self) -> CommandStats:
+        return CommandStats(
+            calls=self.calls,
+            errors=dict(self.errors),
+            bytes_sent=self.bytes_sent,
+            bytes_received=self.bytes_received,
+            cache_hits=self.cache_hits,
+            phases={
+                phase: histogram.snapshot()
+                for phase, histogram in self.phases.items()
+            }
+        )
+
+
+class Metrics:
+    """
+    Per command latency histograms of the request phases (see PHASES),
+    byte, error and cache hit counters.
+    Pass an instance as XtbApi(metrics=...) or to a connector; without
+    it the connectors skip the instrumentation entirely.
+    XtbApi also records the API_PHASES: 'validate', building the records
+    from the decoded response, and 'total', the whole call including
+    cache lookups and validation.
+    Hooks are called with every finished Span, e.g. to export it to
+    a tracing system. Errors raised by hooks are counted and ignored.
+    """
+
+    def __init__(self, hooks: Optional[List[Hook]] = None) -> None:
+        self._lock = threading.Lock()
+        self._commands: Dict[str, _CommandMetrics] = {}
+        self._hooks: List[Hook] = list(hooks or [])
+        self.hook_errors = 0
+
+    def add_hook(self, hook: Hook) -> None:
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Hook) -> None:
+        self._hooks.remove(hook)
+
+    def record(self, span: Span) -> None:
+        """
+        Adds a finished command span
+        """
+        with self._lock:
+            metrics = self._command(span.command)
+            metrics.calls += 1
+            metrics.bytes_sent += span.bytes_sent
+            metrics.bytes_received += span.bytes_received
+            if span.error is not None:
+                metrics.errors[span.error] = \
+                    metrics.errors.get(span.error, 0) + 1
+            for phase, value in span.phases.items():
+                metrics.observe(phase, value)
+        for hook in self._hooks:
+            try:
+                hook(span)
+            except Exception:  # noqa
+                with self._lock:
+                    self.hook_errors += 1
+
+    def observe(self, command: str, phase: str, value: float) -> None:
+        with self._lock:
+            self._command(command).observe(phase, value)
+
+    def cache_hit(self, command: str) -> None:
+        with self._lock:
+            self._command(command).cache_hits += 1
+
+    def snapshot(self) -> Dict[str, CommandStats]:
+        with self._lock:
+            return {
+                command: metrics.snapshot()
+                for command, metrics in self._commands.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._commands.clear()
+
+    def prometheus_text(self, prefix: str = 'xtb') -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format
+        """
+        return to_prometheus(self.snapshot(), prefix)
+
+    def _command(self, command: str) -> _CommandMetrics:
+        metrics = self._commands.get(command)
+        if metrics is None:
+            metrics = self._commands[command] = _CommandMetrics()
+        return metrics
+
+
+def _labels(**labels: str) -> str:
+    escaped = (
+        (name, value.replace('\\', r'\\').replace('"', r'\"')
+         .replace('\n', r'\n'))
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def to_prometheus(
+        snapshot: Dict[str, CommandStats],
+        prefix: str = 'xtb'
+) -> str:
+    """
+    Formats a Metrics.snapshot() in the Prometheus text format
+    """
+    lines = []
+    counters = (
+        ('calls_total', 'Commands sent', lambda s: s.calls),
+        ('sent_bytes_total', 'Bytes sent', lambda s: s.bytes_sent),
+        ('received_bytes_total', 'Bytes received',
+         lambda s: s.bytes_received),
+        ('cache_hits_total', 'Responses served from the cache',
+         lambda s: s.cache_hits),
+    )
+    for name, help_text, value in counters:
+        metric = f'{prefix}_command_{name}'
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} counter')
+        for command, stats in sorted(snapshot.items()):
+            lines.append(f'{metric}{_labels(command=command)} {value(stats)}')
+
+    metric = f'{prefix}_command_errors_total'
+    lines.append(f'# HELP {metric} Failed commands by error type')
+    lines.append(f'# TYPE {metric} counter')
+    for command, stats in sorted(snapshot.items()):
+        for error, count in sorted(stats.errors.items()):
+            labels = _labels(command=command, error=error)
+            lines.append(f'{metric}{labels} {count}')
+
+    metric = f'{prefix}_command_phase_seconds'
+    lines.append(f'# HELP {metric} Duration of the command phases')
+    lines.append(f'# TYPE {metric} histogram')
+    for command, stats in sorted(snapshot.items()):
+        for phase, histogram in sorted(stats.phases.items()):
+            cumulative = 0
+            bounds = [repr(b) for b in BUCKETS] + ['+Inf']
+            for bound, count in zip(bounds, histogram.counts):
+                cumulative += count
+                labels = _labels(command=command, phase=phase, le=bound)
+                lines.append(f'{metric}_bucket{labels} {cumulative}')
+            labels = _labels(command=command, phase=phase)
+            lines.append(f'{metric}_sum{labels} {histogram.sum!r}')
+            lines.append(f'{metric}_count{labels} {histogram.count}')
+    return '\n'.join(lines) + '\n'
+
+
+def start_http_exporter(
+        metrics: Metrics,
+        port: int = 9464,
+        host: str = '127.0.0.1'
+) -> ThreadingHTTPServer:
+    """
+    Serves metrics.prometheus_text() on http://host:port/metrics from
+    a daemon thread. Call shutdown() on the returned server to stop it.
+    Only local clients can connect by default, pass host='0.0.0.0' to
+    let a remote Prometheus scrape the metrics.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header(
+                'Content-Type', 'text/plain; version=0.0.4; charset=utf-8'
+            )
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(
+        target=server.serve_forever, name='xtb-metrics', daemon=True
+    ).start()
+    return server
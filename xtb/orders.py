@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Iterable, List, NamedTuple, Optional
+
+from xtb import XtbApi, records
+from xtb.streaming import StreamingClient, Subscription
+
+FINAL_STATUSES = frozenset([
+    records.RequestStatus.ERROR,
+    records.RequestStatus.ACCEPTED,
+    records.RequestStatus.REJECTED,
+])
+
+
+class OrderResult(NamedTuple):
+    """
+    Final status of a submitted order.
+    price is the price of the streamed status, or for a polled status
+    the ask of a buy and the bid of a sell order.
+    submit_time is the tradeTransaction round trip, accept_time the time
+    from submitting until the final status was known, both in seconds.
+    """
+    order: int
+    request_status: int
+    message: Optional[str]
+    price: Optional[float]
+    submit_time: float
+    accept_time: float
+    via_stream: bool
+    polls: int
+
+    @property
+    def accepted(self) -> bool:
+        return self.request_status == records.RequestStatus.ACCEPTED
+
+
+class OrderStats(NamedTuple):
+    """
+    Snapshot of the executor counters, times are in seconds
+    """
+    submitted: int
+    accepted: int
+    rejected: int
+    failed: int
+    mean_accept_time: float
+    max_accept_time: float
+
+
+def _price(status: Any, cmd: int) -> Optional[float]:
+    if isinstance(status, records.StreamingTradeStatus):
+        return status.price
+    # BUY, BUY_LIMIT and BUY_STOP are even, the sell commands odd
+    return status.ask if cmd % 2 == 0 else status.bid
+
+
+class _Waiter:
+    __slots__ = ('event', 'status')
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.status: Any = None
+
+
+class OrderExecutor:
+    """
+    Submits orders with trade_transaction and resolves futures with
+    their final status.
+    With a connected StreamingClient the statuses come from the
+    tradeStatus stream. Orders without a final status on the stream
+    within stream_timeout seconds, and all orders when there is no
+    streaming client, are polled with trade_transaction_status: first
+    right after submitting, then waiting poll_initial seconds, growing
+    by poll_factor up to poll_max.
+    At most max_workers orders are in flight at once.
+    The api must return records, not the dictionaries of DecodeMode.RAW.
+    """
+    EARLY_STATUSES = 1024
+
+    def __init__(
+            self,
+            api: XtbApi,
+            streaming: Optional[StreamingClient] = None,
+            *,
+            max_workers: int = 4,
+            timeout: float = 30.0,
+            stream_timeout: float = 2.0,
+            poll_initial: float = 0.05,
+            poll_factor: float = 2.0,
+            poll_max: float = 1.0
+    ) -> None:
+        self._api = api
+        self._timeout = timeout
+        self._stream_timeout = stream_timeout
+        self._poll_initial = poll_initial
+        self._poll_factor = poll_factor
+        self._poll_max = poll_max
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix='xtb-orders'
+        )
+        self._lock = threading.Lock()
+        self._waiting: dict = {}
+        # Final statuses streamed before tradeTransaction returned
+        self._early: 'OrderedDict[int, Any]' = OrderedDict()
+        self._accept_times: List[float] = []
+        self._submitted = 0
+        self._accepted = 0
+        self._rejected = 0
+        self._failed = 0
+        self._subscription: Optional[Subscription] = None
+        if streaming is not None:
+            self._subscription = streaming.subscribe_trade_status(
+                callback=self._on_status
+            )
+
+    def __enter__(self) -> OrderExecutor:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def submit(self, trade_info: records.TradeInfo) -> Future:
+        """
+        Returns a future resolved with an OrderResult, or failing with
+        the error of trade_transaction or TimeoutError
+        """
+        with self._lock:
+            self._submitted += 1
+        return self._executor.submit(self._execute, trade_info)
+
+    def submit_many(
+            self,
+            trade_infos: Iterable[records.TradeInfo]
+    ) -> List[Future]:
+        """
+        Submits a batch of orders, max_workers of them run concurrently
+        """
+        return [self.submit(trade_info) for trade_info in trade_infos]
+
+    def accept_times(self) -> List[float]:
+        with self._lock:
+            return list(self._accept_times)
+
+    def stats(self) -> OrderStats:
+        with self._lock:
+            times = self._accept_times
+            return OrderStats(
+                submitted=self._submitted,
+                accepted=self._accepted,
+                rejected=self._rejected,
+                failed=self._failed,
+                mean_accept_time=sum(times) / len(times) if times else 0.0,
+                max_accept_time=max(times, default=0.0)
+            )
+
+    def close(self) -> None:
+        """
+        Waits for the submitted orders and stops listening to the stream
+        """
+        self._executor.shutdown(wait=True)
+        if self._subscription is not None:
+            self._subscription.close()
+            self._subscription = None
+
+    def _execute(self, trade_info: records.TradeInfo) -> OrderResult:
+        started = time.perf_counter()
+        try:
+            order = self._api.trade_transaction(trade_info=trade_info).order
+            submit_time = time.perf_counter() - started
+            waiter = _Waiter()
+            with self._lock:
+                waiter.status = self._early.pop(order, None)
+                self._waiting[order] = waiter
+            try:
+                result = self._wait(
+                    trade_info, order, waiter, started, submit_time
+                )
+            finally:
+                with self._lock:
+                    self._waiting.pop(order, None)
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        with self._lock:
+            self._accept_times.append(result.accept_time)
+            if result.accepted:
+                self._accepted += 1
+            else:
+                self._rejected += 1
+        return result
+
+    def _wait(
+            self,
+            trade_info: records.TradeInfo,
+            order: int,
+            waiter: _Waiter,
+            started: float,
+            submit_time: float
+    ) -> OrderResult:
+        if waiter.status is None and self._subscription is not None:
+            waiter.event.wait(self._stream_timeout)
+        status, via_stream, polls = waiter.status, True, 0
+        delay = self._poll_initial
+        deadline = started + self._timeout
+        while status is None:
+            polled = self._api.trade_transaction_status(order=order)
+            polls += 1
+            if polled.request_status in FINAL_STATUSES:
+                status, via_stream = polled, False
+                break
+            if time.perf_counter() + delay > deadline:
+                raise TimeoutError(f'No final status for order {order}')
+            # Wakes up early if the status arrives on the stream
+            waiter.event.wait(delay)
+            status = waiter.status
+            delay = min(delay * self._poll_factor, self._poll_max)
+        return OrderResult(
+            order=order,
+            request_status=status.request_status,
+            message=status.message,
+            price=_price(status, trade_info.cmd),
+            submit_time=submit_time,
+            accept_time=time.perf_counter() - started,
+            via_stream=via_stream,
+            polls=polls
+        )
+
+    def _on_status(self, status: records.StreamingTradeStatus) -> None:
+        if status.request_status not in FINAL_STATUSES:
+            return
+        with self._lock:
+            waiter = self._waiting.get(status.order)
+            if waiter is None:
+                self._early[status.order] = status
+                while len(self._early) > self.EARLY_STATUSES:
+                    self._early.popitem(last=False)
+                return
+            waiter.status = status
+        waiter.event.set()
@@ -0,0 +1,217 @@
+import functools
+import itertools
+import socket
+import ssl
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+
+from xtb.codec import JsonCodec
+from xtb.connector import ConnectCache, SyncConnector
+from xtb.exceptions import XtbSocketError
+from xtb.metrics import Metrics, Span
+from xtb.ratelimit import RateLimiter
+
+
+class PipelinedConnector(SyncConnector):
+    """
+    Connector that keeps many requests in flight on one connection.
+    Every command carries a generated customTag and a background thread
+    reads the responses and resolves the matching futures, so commands
+    sent from several threads (or with submit()) do not wait for each
+    other's round trips. Sends still go through the rate limiter.
+    Use it with XtbApi(connector=PipelinedConnector).
+    With metrics the 'server' phase lasts until the future is resolved,
+    it includes receiving and decoding the response.
+    """
+
+    def __init__(
+            self,
+            rate_limiter: Optional[RateLimiter] = None,
+            codec: Optional[JsonCodec] = None,
+            max_in_flight: Optional[int] = None,
+            metrics: Optional[Metrics] = None,
+            *,
+            ssl_context: Optional[ssl.SSLContext] = None,
+            connect_cache: Optional[ConnectCache] = None,
+            connect_timeout: float = SyncConnector.CONNECT_TIMEOUT
+    ) -> None:
+        super().__init__(
+            rate_limiter=rate_limiter, codec=codec, metrics=metrics,
+            ssl_context=ssl_context, connect_cache=connect_cache,
+            connect_timeout=connect_timeout
+        )
+        self._tags = itertools.count(1)
+        self._pending: Dict[str, Future] = OrderedDict()
+        self._pending_lock = threading.Lock()
+        self._in_flight = None
+        if max_in_flight is not None:
+            self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._reader: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+
+    def connect(self, host: str, port: int) -> None:
+        if self._socket is not None and self._error is not None:
+            # The reader has ended, drop the lost connection
+            self.close()
+        super().connect(host, port)
+        self._error = None
+        self._reader = threading.Thread(
+            target=self._read_loop, name='xtb-pipeline-reader', daemon=True
+        )
+        self._reader.start()
+
+    def close(self) -> None:
+        if self._socket is None:
+            raise XtbSocketError('Tried to close() without calling connect()')
+
+        sock, self._socket = self._socket, None
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+        if self._reader is not threading.current_thread():
+            self._reader.join()
+        self._reader = None
+
+    def is_connected(self) -> bool:
+        """
+        False once the reader has ended, e.g. the server closed the
+        connection
+        """
+        return self._socket is not None and self._error is None
+
+    def handle_command(
+            self,
+            *,
+            command: str,
+            arguments: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        return self.submit(command=command, arguments=arguments).result()
+
+    def submit(
+            self,
+            *,
+            command: str,
+            arguments: Optional[Dict[str, Any]] = None
+    ) -> Future:
+        """
+        Sends the command and returns a future resolved with the response.
+        The future fails with XtbApiError for error responses and with
+        XtbSocketError if the connection is lost.
+        """
+        if self._socket is None:
+            raise XtbSocketError(
+                'Tried to use the API without calling connect() first'
+            )
+
+        if self._in_flight is not None:
+            self._in_flight.acquire()
+        tag = str(next(self._tags))
+        data = self._build_packet(command, arguments)
+        data['customTag'] = tag
+        future = Future()
+        future.add_done_callback(self._on_done)
+        span = None
+        if self._metrics is not None:
+            span = Span(command)
+            future.add_done_callback(
+                functools.partial(self._record_span, span)
+            )
+        with self._pending_lock:
+            # The reader fails the pending futures under the same lock
+            error = self._error
+            if error is None:
+                self._pending[tag] = future
+        if error is not None:
+            future.set_exception(XtbSocketError('The connection was lost'))
+            raise XtbSocketError('The connection was lost') from error
+        try:
+            with self._lock:
+                if span is None:
+                    self._send_packet(data)
+                else:
+                    self._send_packet_measured(data, span)
+        except Exception as ex:
+            self._resolve(tag, error=XtbSocketError(str(ex)))
+            raise
+        return future
+
+    def pending(self) -> int:
+        """
+        Returns the number of requests waiting for a response
+        """
+        with self._pending_lock:
+            return len(self._pending)
+
+    def _on_done(self, future: Future) -> None:
+        if self._in_flight is not None:
+            self._in_flight.release()
+
+    def _record_span(self, span: Span, future: Future) -> None:
+        error = future.exception()
+        if error is None:
+            span.mark('server')
+        else:
+            span.error = type(error).__name__
+        self._metrics.record(span)
+
+    def _read_loop(self) -> None:
+        sock = self._socket
+        try:
+            while True:
+                response = self._get_response_from(sock)
+                self._dispatch(response)
+        except Exception as ex:  # noqa
+            self._fail_pending(
+                ex, XtbSocketError('The connection was closed')
+            )
+
+    def _get_response_from(self, sock: socket.socket) -> Dict[str, Any]:
+        content = self._frame_reader.read_frame(sock)
+        return self._response_to_dict(content)
+
+    def _dispatch(self, response: Dict[str, Any]) -> None:
+        tag = response.get('customTag')
+        if tag is None:
+            # The server answers in order, so an untagged response
+            # belongs to the oldest request
+            with self._pending_lock:
+                tag = next(iter(self._pending), None)
+            if tag is None:
+                return
+        try:
+            self._raise_if_wrong_status(response)
+        except Exception as ex:
+            self._resolve(tag, error=ex)
+        else:
+            self._resolve(tag, response=response)
+
+    def _resolve(
+            self,
+            tag: str,
+            response: Optional[Dict[str, Any]] = None,
+            error: Optional[BaseException] = None
+    ) -> None:
+        with self._pending_lock:
+            future = self._pending.pop(tag, None)
+        if future is None:
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(response)
+
+    def _fail_pending(
+            self,
+            cause: BaseException,
+            error: BaseException
+    ) -> None:
+        with self._pending_lock:
+            self._error = cause
+            futures = list(self._pending.values())
+            self._pending.clear()
+        for future in futures:
+            future.set_exception(error)
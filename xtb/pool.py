@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from xtb import XtbApi
+from xtb.exceptions import XtbApiError, XtbException, XtbSocketError
+
+
+def create_session(
+        api_factory: Callable[[], XtbApi],
+        user: str,
+        password: str,
+        app_name: Optional[str] = None
+) -> XtbApi:
+    """
+    Connects and logs in a new session, it is closed again if the login
+    fails
+    """
+    api = api_factory()
+    api.connect()
+    try:
+        api.login(user, password, app_name)
+    except Exception:
+        api.close()
+        raise
+    return api
+
+
+def discard_session(api: XtbApi) -> None:
+    """
+    Logs out and closes a session, ignoring the errors of a session that
+    is already broken
+    """
+    if not api.is_connected():
+        return
+    try:
+        api.close()
+    except (XtbException, OSError):
+        pass
+
+
+class PoolStats(NamedTuple):
+    """
+    Snapshot of the pool usage
+    """
+    size: int
+    idle: int
+    in_use: int
+    acquisitions: int
+    waits: int
+    total_wait_time: float
+    max_wait_time: float
+    replaced: int
+
+
+class XtbApiPool:
+    """
+    Thread-safe pool of connected and logged in XtbApi sessions.
+    Sessions are handed out with session() and returned automatically.
+    A session whose with block raised anything but an XtbApiError, or
+    that fails the ping health check, is closed and replaced by a new one.
+    """
+
+    def __init__(
+            self,
+            user: str,
+            password: str,
+            size: int = 4,
+            *,
+            app_name: Optional[str] = None,
+            api_factory: Callable[[], XtbApi] = XtbApi,
+            health_check_interval: float = 30.0
+    ) -> None:
+        """
+        api_factory creates not yet connected XtbApi instances, e.g.
+        functools.partial(XtbApi, host=..., rate_limiter=...).
+        Sessions idle for longer than health_check_interval seconds are
+        pinged before being handed out.
+        """
+        if size < 1:
+            raise ValueError('size must be at least 1')
+        self._user = user
+        self._password = password
+        self._size = size
+        self._app_name = app_name
+        self._api_factory = api_factory
+        self._health_check_interval = health_check_interval
+        self._condition = threading.Condition()
+        self._idle: List[XtbApi] = []
+        self._last_used: Dict[int, float] = {}
+        self._in_use = 0
+        self._missing = 0
+        self._is_open = False
+        self._acquisitions = 0
+        self._waits = 0
+        self._total_wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._replaced = 0
+
+    def __enter__(self) -> XtbApiPool:
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def open(self) -> None:
+        """
+        Connects and logs in all the sessions
+        Raises:
+            XtbSocketError if open() was called more than once before close()
+        """
+        with self._condition:
+            if self._is_open:
+                raise XtbSocketError('Tried to open() without calling close()')
+            self._is_open = True
+            self._missing = 0
+        try:
+            for _ in range(self._size):
+                api = self._create_session()
+                with self._condition:
+                    self._idle.append(api)
+                    self._condition.notify()
+        except Exception:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """
+        Logs out and closes the idle sessions. Sessions in use are closed
+        when they are returned.
+        """
+        with self._condition:
+            self._is_open = False
+            sessions, self._idle = self._idle, []
+            self._condition.notify_all()
+        for api in sessions:
+            self._discard(api)
+
+    @contextmanager
+    def session(self, timeout: Optional[float] = None) -> Iterator[XtbApi]:
+        """
+        Returns a logged in session for the duration of the with block
+        Raises:
+            TimeoutError if no session became available within the timeout
+        """
+        api = self.acquire(timeout)
+        broken = False
+        try:
+            yield api
+        except XtbApiError:
+            # The server answered with an error, the session is in sync
+            raise
+        except BaseException:
+            # Anything else may have interrupted a command between send
+            # and receive and left its response unread
+            broken = True
+            raise
+        finally:
+            self.release(api, broken=broken)
+
+    def acquire(self, timeout: Optional[float] = None) -> XtbApi:
+        """
+        Takes a session out of the pool. Prefer session().
+        Raises:
+            TimeoutError if no session became available within the timeout
+        """
+        started = time.monotonic()
+        api = None
+        with self._condition:
+            waited = False
+            while self._is_open and not self._idle and not self._missing:
+                waited = True
+                remaining = None
+                if timeout is not None:
+                    remaining = timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        raise TimeoutError('No session available in the pool')
+                self._condition.wait(remaining)
+            if not self._is_open:
+                raise XtbSocketError('Tried to use the pool without open()')
+            if self._idle:
+                api = self._idle.pop()
+            else:
+                self._missing -= 1
+            self._in_use += 1
+            self._acquisitions += 1
+            if waited:
+                wait_time = time.monotonic() - started
+                self._waits += 1
+                self._total_wait_time += wait_time
+                self._max_wait_time = max(self._max_wait_time, wait_time)
+        try:
+            if api is None:
+                return self._recreate()
+            return self._checked(api)
+        except Exception:
+            with self._condition:
+                self._in_use -= 1
+                self._missing += 1
+                self._condition.notify()
+            raise
+
+    def release(self, api: XtbApi, broken: bool = False) -> None:
+        """
+        Returns a session taken with acquire() to the pool.
+        Broken sessions are closed and recreated by a later acquire().
+        """
+        with self._condition:
+            self._in_use -= 1
+            keep = self._is_open and not broken
+            if keep:
+                self._last_used[id(api)] = time.monotonic()
+                self._idle.append(api)
+            elif self._is_open:
+                self._missing += 1
+            self._condition.notify()
+        if not keep:
+            self._discard(api)
+
+    def stats(self) -> PoolStats:
+        with self._condition:
+            return PoolStats(
+                size=self._size,
+                idle=len(self._idle),
+                in_use=self._in_use,
+                acquisitions=self._acquisitions,
+                waits=self._waits,
+                total_wait_time=self._total_wait_time,
+                max_wait_time=self._max_wait_time,
+                replaced=self._replaced
+            )
+
+    def _create_session(self) -> XtbApi:
+        api = create_session(
+            self._api_factory, self._user, self._password, self._app_name
+        )
+        with self._condition:
+            self._last_used[id(api)] = time.monotonic()
+        return api
+
+    def _checked(self, api: XtbApi) -> XtbApi:
+        with self._condition:
+            last_used = self._last_used.get(id(api), 0.0)
+        if time.monotonic() - last_used < self._health_check_interval:
+            return api
+        try:
+            if api.ping():
+                return api
+        except (XtbException, OSError):
+            pass
+        self._discard(api)
+        return self._recreate()
+
+    def _recreate(self) -> XtbApi:
+        api = self._create_session()
+        with self._condition:
+            self._replaced += 1
+        return api
+
+    def _discard(self, api: XtbApi) -> None:
+        with self._condition:
+            self._last_used.pop(id(api), None)
+        discard_session(api)
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import bisect
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from xtb import records
+
+
+class QuoteHistory(NamedTuple):
+    """
+    Recent quotes of a symbol, oldest first.
+    The timestamps are epoch milliseconds.
+    """
+    timestamps: array
+    bids: array
+    asks: array
+    bid_volumes: array
+    ask_volumes: array
+
+
+class _Ring:
+    """
+    Preallocated ring buffer of the quotes of one symbol.
+    It has a single writer. `started` is bumped before a slot is
+    overwritten and `count` after, so readers can detect slots that
+    changed while they were copying them without taking a lock.
+    """
+    __slots__ = (
+        'size', 'started', 'count', 'timestamps', 'bids', 'asks',
+        'bid_volumes', 'ask_volumes'
+    )
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.started = 0
+        self.count = 0
+        self.timestamps = array('q', bytes(8 * size))
+        self.bids = array('d', bytes(8 * size))
+        self.asks = array('d', bytes(8 * size))
+        self.bid_volumes = array('d', bytes(8 * size))
+        self.ask_volumes = array('d', bytes(8 * size))
+
+    def append(
+            self,
+            timestamp: int,
+            bid: float,
+            ask: float,
+            bid_volume: float,
+            ask_volume: float
+    ) -> None:
+        slot = self.count % self.size
+        self.started += 1
+        self.timestamps[slot] = timestamp
+        self.bids[slot] = bid
+        self.asks[slot] = ask
+        self.bid_volumes[slot] = bid_volume
+        self.ask_volumes[slot] = ask_volume
+        self.count += 1
+
+    def snapshot(self, last: Optional[int]) -> QuoteHistory:
+        end = self.count
+        length = min(end, self.size)
+        if last is not None:
+            length = min(length, last)
+        start = end - length
+        columns = [
+            self._copy(column, start, end)
+            for column in (
+                self.timestamps, self.bids, self.asks,
+                self.bid_volumes, self.ask_volumes
+            )
+        ]
+        # Drop the oldest entries if the writer reused their slots
+        # while they were being copied
+        overwritten = self.started - self.size - start
+        if overwritten > 0:
+            columns = [column[overwritten:] for column in columns]
+        return QuoteHistory(*columns)
+
+    def _copy(self, column: array, start: int, end: int) -> array:
+        first, last = start % self.size, end % self.size
+        if end - start == self.size or (last <= first and end > start):
+            return column[first:] + column[:last]
+        return column[first:last]
+
+
+class QuoteBook:
+    """
+    Latest quote of every symbol plus a fixed-size history of recent
+    bid/ask prices and volumes, fed with Tick records e.g. by
+        client.subscribe_tick_prices('EURUSD', callback=book.update)
+    Only top of the book ticks (level 0) are kept.
+    The book expects a single writer. Readers on other threads need no
+    locking: latest() is a dictionary lookup and history() copies the
+    ring buffer and discards the entries overwritten meanwhile.
+    """
+    HISTORY_SIZE = 1024
+
+    def __init__(self, history_size: int = HISTORY_SIZE) -> None:
+        if history_size < 1:
+            raise ValueError('history_size must be at least 1')
+        self._history_size = history_size
+        self._latest: Dict[str, records.Tick] = {}
+        self._rings: Dict[str, _Ring] = {}
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._latest
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    def symbols(self) -> List[str]:
+        return list(self._latest)
+
+    def update(self, tick: records.Tick) -> None:
+        if tick.level != 0:
+            return
+        ring = self._rings.get(tick.symbol)
+        if ring is None:
+            ring = _Ring(self._history_size)
+            self._rings[tick.symbol] = ring
+        ring.append(
+            records.timestamp_ms(tick.timestamp), tick.bid, tick.ask,
+            tick.bid_volume, tick.ask_volume
+        )
+        self._latest[tick.symbol] = tick
+
+    def update_many(self, ticks: Iterable[records.Tick]) -> None:
+        """
+        Feeds e.g. the quotations of get_tick_prices
+        """
+        for tick in ticks:
+            self.update(tick)
+
+    def latest(self, symbol: str) -> Optional[records.Tick]:
+        return self._latest.get(symbol)
+
+    def bid_ask(self, symbol: str) -> Optional[Tuple[float, float]]:
+        tick = self._latest.get(symbol)
+        return None if tick is None else (tick.bid, tick.ask)
+
+    def history(
+            self,
+            symbol: str,
+            last: Optional[int] = None,
+            since: Optional[int] = None
+    ) -> QuoteHistory:
+        """
+        Returns at most the `last` recent quotes of the symbol, only the
+        ones at or after `since` (epoch ms) if given
+        """
+        ring = self._rings.get(symbol)
+        if ring is None:
+            return QuoteHistory(
+                array('q'), array('d'), array('d'), array('d'), array('d')
+            )
+        history = ring.snapshot(last)
+        if since is not None:
+            skip = bisect.bisect_left(history.timestamps, since)
+            if skip:
+                history = QuoteHistory(*(c[skip:] for c in history))
+        return history
@@ -0,0 +1,126 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Hashable
+
+
+Clock = Callable[[], float]
+
+
+class RateLimiter(ABC):
+    """
+    Base class for the request rate limiters.
+    A limiter decides how long a request has to wait before it can be sent
+    without exceeding the xAPI request frequency limit.
+    See http://developers.xstore.pro/documentation/#connection-validation
+    """
+
+    @abstractmethod
+    def reserve(self) -> float:
+        """
+        Reserves the next send slot.
+        Returns the number of seconds the caller has to wait before sending
+        """
+
+    def acquire(self) -> float:
+        """
+        Blocks until the request can be sent.
+        Returns the number of seconds spent waiting
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class NoRateLimiter(RateLimiter):
+    """
+    Never waits. Useful for tests and for connections to local servers
+    """
+
+    def reserve(self) -> float:
+        return 0.0
+
+
+class IntervalRateLimiter(RateLimiter):
+    """
+    Keeps at least `interval` seconds between consecutive sends.
+    Only waits if the previous send happened less than `interval` ago.
+    """
+
+    def __init__(
+            self,
+            interval: float = 0.2,
+            clock: Clock = time.monotonic
+    ) -> None:
+        self._interval = interval
+        self._clock = clock
+        self._next_send = float('-inf')
+        self._lock = threading.Lock()
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = self._clock()
+            send_at = max(now, self._next_send)
+            self._next_send = send_at + self._interval
+        return send_at - now
+
+
+class TokenBucketRateLimiter(RateLimiter):
+    """
+    Allows bursts of up to `burst` requests, refilled at `rate` requests
+    per second.
+    """
+
+    def __init__(
+            self,
+            rate: float = 5.0,
+            burst: int = 5,
+            clock: Clock = time.monotonic
+    ) -> None:
+        if rate <= 0 or burst < 1:
+            raise ValueError('rate must be positive and burst at least 1')
+        self._rate = rate
+        self._burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = self._clock()
+            elapsed = now - self._updated
+            self._tokens = min(
+                self._burst, self._tokens + elapsed * self._rate
+            )
+            self._updated = now
+            # Tokens may go negative - that is the debt the caller sleeps off
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self._rate
+
+
+_shared_limiters: Dict[Hashable, RateLimiter] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_rate_limiter(
+        key: Hashable,
+        factory: Callable[[], RateLimiter] = IntervalRateLimiter
+) -> RateLimiter:
+    """
+    Returns the limiter registered under `key`, creating it with `factory`
+    on first use. Pass the same key (e.g. the account id) to every
+    connector that talks to the same account so they share a single budget.
+    """
+    with _shared_lock:
+        limiter = _shared_limiters.get(key)
+        if limiter is None:
+            limiter = _shared_limiters[key] = factory()
+        return limiter
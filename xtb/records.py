@@ -1,27 +1,212 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict, List, Optional, TypeVar
+from enum import Enum, IntEnum
+from typing import (
+    Any, Dict, Iterator, List, Optional, Sequence, Tuple, Type, TypeVar,
+    Union, overload
+)
 
 from pydantic import BaseModel, Field
+from pydantic.fields import SHAPE_LIST, ModelField
+
+
+class DecodeMode(str, Enum):
+    """
+    How the server responses are turned into records.
+    VALIDATE runs the full pydantic validation and coercion.
+    TRUSTED builds the records without validation: aliases and nested
+    records are applied but the values are kept as received, e.g.
+    timestamps stay epoch milliseconds instead of datetime objects.
+    RAW returns the decoded dictionaries untouched.
+    """
+    VALIDATE = 'validate'
+    TRUSTED = 'trusted'
+    RAW = 'raw'
+
+
+def timestamp_ms(value: Any) -> int:
+    """
+    Returns the epoch milliseconds of a datetime, or of a timestamp kept
+    as received by DecodeMode.TRUSTED and RAW
+    """
+    if isinstance(value, datetime):
+        return round(value.timestamp() * 1000)
+    return int(value)
+
+
+# field name, raw key, nested record type, is list, field
+_TrustedPlan = List[Tuple[str, str, Optional[type], bool, ModelField]]
+_trusted_plans: Dict[type, _TrustedPlan] = {}
 
 
 class BaseRecord(BaseModel):
     @classmethod
-    def from_dict(cls, dictionary: Dict[Any, Any]):
+    def from_dict(
+            cls,
+            dictionary: Dict[Any, Any],
+            mode: DecodeMode = DecodeMode.VALIDATE
+    ):
+        if mode is DecodeMode.TRUSTED:
+            return cls.construct_trusted(dictionary)
+        if mode is DecodeMode.RAW:
+            return dictionary
         return cls(**dictionary)  # noqa
 
     @classmethod
-    def create_collection_from(cls, value: Dict[Any, Any]) -> List[Generic]:
+    def create_collection_from(
+            cls,
+            value: List[Dict[Any, Any]],
+            lazy: bool = False,
+            key: Optional[str] = None,
+            mode: DecodeMode = DecodeMode.VALIDATE
+    ) -> Union[List[Generic], LazyRecordList[Generic]]:
         """
-        Casts the dictionary to the list of this type
+        Casts the dictionary to the list of this type.
+        With lazy=True returns a LazyRecordList that creates the records
+        on first access, key is the raw field used by LazyRecordList.get()
         """
+        if mode is DecodeMode.RAW:
+            return value
+        if lazy:
+            return LazyRecordList(cls, value, key=key, mode=mode)
+        if mode is DecodeMode.TRUSTED:
+            return list(map(cls.construct_trusted, value))
         return list(map(cls.from_dict, value))
 
+    @classmethod
+    def construct_trusted(cls, dictionary: Dict[Any, Any]):
+        """
+        Creates the record without validation, see DecodeMode.TRUSTED
+        """
+        values = {}
+        fields_set = set()
+        for name, key, nested, is_list, field in cls._trusted_plan():
+            if key in dictionary:
+                value = dictionary[key]
+            elif name in dictionary:
+                value = dictionary[name]
+            else:
+                if not field.required:
+                    # Same defaults as the validating mode, None if Optional
+                    values[name] = field.get_default()
+                continue
+            fields_set.add(name)
+            if nested is not None and value is not None:
+                if is_list:
+                    value = list(map(nested.construct_trusted, value))
+                else:
+                    value = nested.construct_trusted(value)
+            values[name] = value
+        record = cls.__new__(cls)
+        object.__setattr__(record, '__dict__', values)
+        object.__setattr__(record, '__fields_set__', fields_set)
+        return record
+
+    @classmethod
+    def _trusted_plan(cls) -> _TrustedPlan:
+        plan = _trusted_plans.get(cls)
+        if plan is None:
+            plan = []
+            for name, field in cls.__fields__.items():
+                nested = None
+                if isinstance(field.type_, type) and \
+                        issubclass(field.type_, BaseRecord):
+                    nested = field.type_
+                plan.append((
+                    name, field.alias, nested, field.shape == SHAPE_LIST,
+                    field
+                ))
+            _trusted_plans[cls] = plan
+        return plan
+
 
 Generic = TypeVar('Generic', bound=BaseRecord)
 
 
+class LazyRecordList(Sequence[Generic]):
+    """
+    Read-only sequence of records created from the raw dictionaries on
+    first access. Created records are cached, so every element is
+    validated at most once.
+    """
+
+    def __init__(
+            self,
+            record_type: Type[Generic],
+            raw: List[Dict[Any, Any]],
+            key: Optional[str] = None,
+            mode: DecodeMode = DecodeMode.VALIDATE
+    ) -> None:
+        self._record_type = record_type
+        self._mode = mode
+        self._raw = raw
+        self._records: List[Optional[Generic]] = [None] * len(raw)
+        self._key = key
+        self._index: Optional[Dict[Any, int]] = None
+
+    @property
+    def raw(self) -> List[Dict[Any, Any]]:
+        """
+        The raw dictionaries as received from the server
+        """
+        return self._raw
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    @overload
+    def __getitem__(self, index: int) -> Generic:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Generic]:
+        ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._record(i) for i in range(len(self._raw))[index]]
+        if index < 0:
+            index += len(self._raw)
+        if not 0 <= index < len(self._raw):
+            raise IndexError('LazyRecordList index out of range')
+        return self._record(index)
+
+    def __iter__(self) -> Iterator[Generic]:
+        for i in range(len(self._raw)):
+            yield self._record(i)
+
+    def __repr__(self) -> str:
+        return (
+            f'LazyRecordList({self._record_type.__name__}, '
+            f'{len(self._raw)} items)'
+        )
+
+    def get(self, value: Any, default: Optional[Generic] = None):
+        """
+        Returns the record whose key field equals value.
+        The lookup index is built on the first call.
+        Raises:
+            ValueError if the list was created without a key
+        """
+        if self._key is None:
+            raise ValueError('LazyRecordList was created without a key')
+        if self._index is None:
+            key = self._key
+            self._index = {item[key]: i for i, item in enumerate(self._raw)}
+        index = self._index.get(value)
+        if index is None:
+            return default
+        return self._record(index)
+
+    def _record(self, index: int) -> Generic:
+        record = self._records[index]
+        if record is None:
+            record = self._record_type.from_dict(self._raw[index], self._mode)
+            self._records[index] = record
+        return record
+
+
 class Calendar(BaseRecord):
     """
     Values for single Calendar record
@@ -65,6 +250,52 @@ class ChartRateInfo(BaseRecord):
 ChartResponse.update_forward_refs()
 
 
+class Period(IntEnum):
+    """
+    Chart periods in minutes
+    See http://developers.xstore.pro/documentation/#CHART_LAST_INFO_RECORD
+    """
+    M1 = 1
+    M5 = 5
+    M15 = 15
+    M30 = 30
+    H1 = 60
+    H4 = 240
+    D1 = 1440
+    W1 = 10080
+    MN1 = 43200
+
+
+class MarginMode(IntEnum):
+    """
+    Values of Symbol.marginMode
+    See http://developers.xstore.pro/documentation/#SYMBOL_RECORD
+    """
+    FOREX = 101
+    CFD_LEVERAGED = 102
+    CFD = 103
+
+
+class RequestStatus(IntEnum):
+    """
+    Values of TradeStatus.request_status
+    See http://developers.xstore.pro/documentation/#tradeTransactionStatus
+    """
+    ERROR = 0
+    PENDING = 1
+    ACCEPTED = 3
+    REJECTED = 4
+
+
+class ProfitMode(IntEnum):
+    """
+    Values of Symbol.profitMode
+    See http://developers.xstore.pro/documentation/#SYMBOL_RECORD
+    """
+    FOREX = 5
+    CFD = 6
+
+
 class Commission(BaseRecord):
     """
     Values for Commision 
@@ -336,6 +567,15 @@ class TradeInfo(BaseRecord):
     type: int
     volume: float
 
+    def to_arguments(self) -> Dict[str, Any]:
+        """
+        Returns the tradeTransaction arguments with the xAPI field names
+        and the expiration in epoch milliseconds
+        """
+        info = self.dict(by_alias=True)
+        info['expiration'] = timestamp_ms(self.expiration)
+        return {'tradeTransInfo': info}
+
 
 class TradeOrder(BaseRecord):
     """
@@ -356,3 +596,87 @@ class TradeStatus(BaseRecord):
     message: Optional[str]
     order: int
     request_status: int = Field(alias='requestStatus')
+
+
+class StreamingCandle(ChartRateInfo):
+    """
+    A candle received from the streaming API
+    See http://developers.xstore.pro/documentation/#STREAMING_CANDLE_RECORD
+    """
+    quoteId: int
+    symbol: str
+
+
+class StreamingTrade(BaseRecord):
+    """
+    A trade update received from the streaming API
+    See http://developers.xstore.pro/documentation/#STREAMING_TRADE_RECORD
+    """
+    close_price: float
+    close_time: Optional[datetime]
+    closed: bool
+    cmd: int
+    comment: str
+    commission: Optional[float]
+    custom_comment: Optional[str] = Field(alias='customComment')
+    digits: int
+    expiration: Optional[datetime]
+    margin_rate: float
+    offset: int
+    open_price: float
+    open_time: datetime
+    order: int
+    order2: int
+    position: int
+    profit: Optional[float]
+    sl: float = 0
+    state: str
+    storage: float
+    symbol: Optional[str]
+    tp: float = 0
+    type: int
+    volume: float
+
+
+class StreamingTradeStatus(BaseRecord):
+    """
+    A transaction status update received from the streaming API
+    See http://developers.xstore.pro/documentation/#STREAMING_TRADE_STATUS_RECORD
+    """
+    custom_comment: Optional[str] = Field(alias='customComment')
+    message: Optional[str]
+    order: int
+    price: Optional[float]
+    request_status: int = Field(alias='requestStatus')
+
+
+class StreamingBalance(BaseRecord):
+    """
+    Account indicators received from the streaming API
+    See http://developers.xstore.pro/documentation/#STREAMING_BALANCE_RECORD
+    """
+    balance: float
+    credit: float
+    equity: float
+    margin: float
+    margin_free: float = Field(alias='marginFree')
+    margin_level: float = Field(alias='marginLevel')
+
+
+class StreamingNews(BaseRecord):
+    """
+    A news item received from the streaming API
+    See http://developers.xstore.pro/documentation/#STREAMING_NEWS_RECORD
+    """
+    body: str
+    key: str
+    time: datetime
+    title: str
+
+
+class KeepAlive(BaseRecord):
+    """
+    A keep alive message received from the streaming API
+    See http://developers.xstore.pro/documentation/#STREAMING_KEEP_ALIVE_RECORD
+    """
+    timestamp: datetime
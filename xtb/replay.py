@@ -0,0 +1,233 @@
+import json
+import ssl
+import struct
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from xtb.codec import JsonCodec
+from xtb.connector import BaseConnector, ConnectCache, SyncConnector
+from xtb.exceptions import XtbReplayError, XtbSocketError
+from xtb.metrics import Metrics
+from xtb.ratelimit import RateLimiter
+
+FILE_MAGIC = b'XTBREC\x01\x00'
+
+# flags, key size, response size
+RECORD_HEADER = struct.Struct('<BxxxII')
+COMPRESSED = 1
+
+# Commands matched without their arguments, so no credentials are stored
+ARGUMENTS_NOT_RECORDED = frozenset(['login'])
+
+
+def request_key(command: str, arguments: Optional[Dict[str, Any]]) -> bytes:
+    """
+    Returns the canonical form of a request used to match the responses
+    """
+    if command in ARGUMENTS_NOT_RECORDED or not arguments:
+        arguments = None
+    return json.dumps(
+        [command, arguments], sort_keys=True, separators=(',', ':')
+    ).encode()
+
+
+class RecordingConnector(SyncConnector):
+    """
+    SyncConnector that appends every request and its raw response to
+    a recording file for ReplayConnector:
+        XtbApi(connector=functools.partial(RecordingConnector, path=...))
+    Responses larger than compress_threshold bytes are zlib compressed.
+    """
+
+    def __init__(
+            self,
+            rate_limiter: Optional[RateLimiter] = None,
+            codec: Optional[JsonCodec] = None,
+            metrics: Optional[Metrics] = None,
+            *,
+            path: str,
+            compress_threshold: int = 4096,
+            ssl_context: Optional[ssl.SSLContext] = None,
+            connect_cache: Optional[ConnectCache] = None,
+            connect_timeout: float = SyncConnector.CONNECT_TIMEOUT
+    ) -> None:
+        super().__init__(
+            rate_limiter=rate_limiter, codec=codec, metrics=metrics,
+            ssl_context=ssl_context, connect_cache=connect_cache,
+            connect_timeout=connect_timeout
+        )
+        self._path = path
+        self._compress_threshold = compress_threshold
+        self._record_lock = threading.Lock()
+        self._last_frame: Optional[bytes] = None
+        self._file = None
+
+    def connect(self, host: str, port: int) -> None:
+        super().connect(host, port)
+        self._file = open(self._path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(FILE_MAGIC)
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def handle_command(
+            self,
+            *,
+            command: str,
+            arguments: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        with self._record_lock:
+            self._last_frame = None
+            try:
+                return super().handle_command(
+                    command=command, arguments=arguments
+                )
+            finally:
+                if self._last_frame is not None:
+                    self._record(command, arguments, self._last_frame)
+
+    def _response_to_dict(self, content: bytes) -> Dict[str, Any]:
+        self._last_frame = content
+        return super()._response_to_dict(content)
+
+    def _record(
+            self,
+            command: str,
+            arguments: Optional[Dict[str, Any]],
+            frame: bytes
+    ) -> None:
+        flags = 0
+        if len(frame) > self._compress_threshold:
+            frame = zlib.compress(frame)
+            flags |= COMPRESSED
+        key = request_key(command, arguments)
+        self._file.write(RECORD_HEADER.pack(flags, len(key), len(frame)))
+        self._file.write(key)
+        self._file.write(frame)
+        self._file.flush()
+
+
+class ReplayConnector(BaseConnector):
+    """
+    Connector answering from a recording made with RecordingConnector,
+    without any network access or rate limiting:
+        XtbApi(connector=functools.partial(ReplayConnector, path=...))
+    Requests are matched by command and arguments. Repeated requests get
+    the recorded responses in order, after the last one it is repeated
+    unless strict is set.
+    Raises XtbReplayError for requests that were not recorded.
+    """
+
+    def __init__(
+            self,
+            rate_limiter: Optional[RateLimiter] = None,
+            codec: Optional[JsonCodec] = None,
+            metrics: Optional[Metrics] = None,
+            *,
+            path: str,
+            strict: bool = False
+    ) -> None:
+        super().__init__(
+            rate_limiter=rate_limiter, codec=codec, metrics=metrics
+        )
+        self._strict = strict
+        self._is_connected = False
+        self._lock = threading.Lock()
+        with open(path, 'rb') as f:
+            self._data = f.read()
+        if not self._data.startswith(FILE_MAGIC):
+            raise ValueError(f'{path} is not a recording')
+        # key -> (flags, offset, size) of its responses in recorded order
+        self._index: Dict[bytes, List[Tuple[int, int, int]]] = {}
+        self._positions: Dict[bytes, int] = {}
+        self._frames: Dict[int, bytes] = {}
+        self._read_index()
+
+    def __len__(self) -> int:
+        return sum(len(responses) for responses in self._index.values())
+
+    def connect(self, host: str, port: int) -> None:
+        if self._is_connected:
+            raise XtbSocketError('Tried to connect() without calling close()')
+        self._is_connected = True
+
+    def close(self) -> None:
+        if not self._is_connected:
+            raise XtbSocketError('Tried to close() without calling connect()')
+        self._is_connected = False
+
+    def is_connected(self) -> bool:
+        return self._is_connected
+
+    def rewind(self) -> None:
+        """
+        Starts replaying every request from its first response again
+        """
+        with self._lock:
+            self._positions.clear()
+
+    def handle_command(
+            self,
+            *,
+            command: str,
+            arguments: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+
+        if not self._is_connected:
+            raise XtbSocketError(
+                'Tried to use the API without calling connect() first'
+            )
+
+        key = request_key(command, arguments)
+        with self._lock:
+            responses = self._index.get(key)
+            if responses is None:
+                raise XtbReplayError(
+                    f'No recorded response for {key.decode()}'
+                )
+            position = self._positions.get(key, 0)
+            if position >= len(responses):
+                if self._strict:
+                    raise XtbReplayError(
+                        f'All responses for {key.decode()} were replayed'
+                    )
+                position = len(responses) - 1
+            self._positions[key] = position + 1
+            frame = self._frame(*responses[position])
+        response = self._response_to_dict(frame)
+        self._raise_if_wrong_status(response)
+        return response
+
+    def _frame(self, flags: int, offset: int, size: int) -> bytes:
+        frame = self._frames.get(offset)
+        if frame is None:
+            frame = self._data[offset:offset + size]
+            if flags & COMPRESSED:
+                frame = zlib.decompress(frame)
+            self._frames[offset] = frame
+        return frame
+
+    def _read_index(self) -> None:
+        offset = len(FILE_MAGIC)
+        size = len(self._data)
+        while offset + RECORD_HEADER.size <= size:
+            flags, key_size, frame_size = \
+                RECORD_HEADER.unpack_from(self._data, offset)
+            key_offset = offset + RECORD_HEADER.size
+            frame_offset = key_offset + key_size
+            if frame_offset + frame_size > size:
+                # Cut short while recording
+                break
+            key = self._data[key_offset:frame_offset]
+            self._index.setdefault(key, []).append(
+                (flags, frame_offset, frame_size)
+            )
+            offset = frame_offset + frame_size
+
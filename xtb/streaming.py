@@ -0,0 +1,437 @@
+from __future__ import annotations
+
+import queue
+import socket
+import ssl
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Type
+
+from xtb import records
+from xtb.codec import JsonCodec, StdlibCodec
+from xtb.connector import (
+    DEFAULT_CONNECT_CACHE, BaseConnector, ConnectCache, SyncConnector,
+    create_connection, default_ssl_context, store_tls_session, wrap_tls
+)
+from xtb.exceptions import XtbSocketError
+from xtb.framing import FrameReader
+from xtb.ratelimit import IntervalRateLimiter, RateLimiter
+
+Callback = Callable[[records.BaseRecord], None]
+
+_CLOSED = object()
+
+
+class Subscription:
+    """
+    A single streaming subscription.
+    Updates are either passed to the callback (called on the reader
+    thread, so it should return quickly) or queued and consumed by
+    iterating over the subscription.
+    """
+
+    def __init__(
+            self,
+            client: StreamingClient,
+            command: str,
+            record_type: Type[records.BaseRecord],
+            symbol: Optional[str] = None,
+            callback: Optional[Callback] = None
+    ) -> None:
+        self.command = command
+        self.record_type = record_type
+        self.symbol = symbol
+        self._client = client
+        self._callback = callback
+        self._queue: queue.Queue = queue.Queue()
+        self._error: Optional[BaseException] = None
+        self._closed = False
+
+    def __enter__(self) -> Subscription:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __iter__(self) -> Iterator[records.BaseRecord]:
+        return self
+
+    def __next__(self) -> records.BaseRecord:
+        item = self.get()
+        if item is None:
+            raise StopIteration
+        return item
+
+    def get(
+            self,
+            timeout: Optional[float] = None
+    ) -> Optional[records.BaseRecord]:
+        """
+        Returns the next update or None if the subscription was closed.
+        Raises:
+            queue.Empty if no update arrived within the timeout
+            The error that terminated the stream, if any
+        """
+        item = self._queue.get(timeout=timeout)
+        if item is _CLOSED:
+            self._queue.put(_CLOSED)
+            if self._error is not None:
+                raise self._error
+            return None
+        return item
+
+    def close(self) -> None:
+        """
+        Stops the subscription. The server stream is stopped once the last
+        subscription using it is closed.
+        """
+        if self._closed:
+            return
+        self._client._unsubscribe(self)
+        self._finish()
+
+    def _matches(self, data: Dict[str, Any]) -> bool:
+        return self.symbol is None or data.get('symbol') == self.symbol
+
+    def _publish(self, record: records.BaseRecord) -> None:
+        if self._callback is not None:
+            self._callback(record)
+        else:
+            self._queue.put(record)
+
+    def _finish(self, error: Optional[BaseException] = None) -> None:
+        self._closed = True
+        self._error = error
+        self._queue.put(_CLOSED)
+
+
+class StreamingClient:
+    """
+    Client for the xAPI streaming port.
+    Requires the streamSessionId returned by XtbApi.login().
+    Updates that fail validation and errors raised by callbacks are
+    counted in dispatch_errors and do not end the subscriptions.
+    See http://developers.xstore.pro/documentation/#streaming-commands
+    """
+    PING_INTERVAL = 60.0
+
+    # data command: (subscribe command, stop command, record type)
+    STREAMS = {
+        'tickPrices': (
+            'getTickPrices', 'stopTickPrices', records.Tick
+        ),
+        'candle': ('getCandles', 'stopCandles', records.StreamingCandle),
+        'trade': ('getTrades', 'stopTrades', records.StreamingTrade),
+        'tradeStatus': (
+            'getTradeStatus', 'stopTradeStatus', records.StreamingTradeStatus
+        ),
+        'balance': ('getBalance', 'stopBalance', records.StreamingBalance),
+        'news': ('getNews', 'stopNews', records.StreamingNews),
+        'keepAlive': ('getKeepAlive', 'stopKeepAlive', records.KeepAlive),
+    }
+
+    def __init__(
+            self,
+            stream_session_id: str,
+            host: str = 'xapi.xtb.com',
+            port: int = 5125,
+            rate_limiter: Optional[RateLimiter] = None,
+            codec: Optional[JsonCodec] = None,
+            *,
+            ssl_context: Optional[ssl.SSLContext] = None,
+            connect_cache: Optional[ConnectCache] = None,
+            connect_timeout: float = SyncConnector.CONNECT_TIMEOUT
+    ) -> None:
+        """
+        ssl_context, connect_cache and connect_timeout are used like by
+        SyncConnector, so the streaming connection shares the resolved
+        addresses and TLS sessions of the request connection.
+        """
+        self._stream_session_id = stream_session_id
+        self._host = host
+        self._port = port
+        self._ssl_context = ssl_context if ssl_context is not None \
+            else default_ssl_context()
+        self._connect_cache = connect_cache if connect_cache is not None \
+            else DEFAULT_CONNECT_CACHE
+        self._connect_timeout = connect_timeout
+        if rate_limiter is None:
+            rate_limiter = IntervalRateLimiter(BaseConnector.REQUEST_INTERVAL)
+        self._rate_limiter = rate_limiter
+        self._codec = codec if codec is not None else StdlibCodec()
+        self._socket: Optional[socket.socket] = None
+        self._frame_reader = FrameReader(BaseConnector.END_TOKEN)
+        self._send_lock = threading.Lock()
+        self._subscriptions_lock = threading.Lock()
+        self._subscriptions: Dict[str, List[Subscription]] = {}
+        self._stopped = threading.Event()
+        self._threads: List[threading.Thread] = []
+        # Updates that could not be decoded or whose callback raised
+        self.dispatch_errors = 0
+        self.last_dispatch_error: Optional[BaseException] = None
+
+    def __enter__(self) -> StreamingClient:
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def connect(self) -> None:
+        """
+        Connects to the streaming port and starts the reader thread
+        Raises:
+            XtbSocketError if connect() was called more than once before close()
+        """
+        if self.is_connected():
+            raise XtbSocketError('Tried to connect() without calling close()')
+
+        self._socket = create_connection(
+            self._host, self._port, self._wrap_socket, self._connect_cache,
+            self._connect_timeout
+        )
+        self._store_session()
+        self._frame_reader.reset()
+        self._stopped.clear()
+        self._threads = [
+            threading.Thread(
+                target=self._read_loop, name='xtb-stream-reader', daemon=True
+            ),
+            threading.Thread(
+                target=self._ping_loop, name='xtb-stream-ping', daemon=True
+            ),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def close(self) -> None:
+        """
+        Closes the connection and ends all subscriptions
+        Raises:
+            XtbSocketError if close() was called before connect()
+        """
+        if not self.is_connected():
+            raise XtbSocketError('Tried to close() without calling connect()')
+
+        self._stopped.set()
+        self._store_session()
+        sock, self._socket = self._socket, None
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        self._finish_all()
+
+    def is_connected(self) -> bool:
+        return self._socket is not None
+
+    def subscribe_tick_prices(
+            self,
+            symbol: str,
+            *,
+            min_arrival_time: Optional[int] = None,
+            max_level: Optional[int] = None,
+            callback: Optional[Callback] = None
+    ) -> Subscription:
+        """
+        Subscribes to the quotations of the symbol, yields records.Tick
+        See http://developers.xstore.pro/documentation/#streamgetTickPrices
+        """
+        args = {'symbol': symbol}
+        if min_arrival_time is not None:
+            args['minArrivalTime'] = min_arrival_time
+        if max_level is not None:
+            args['maxLevel'] = max_level
+        return self._subscribe('tickPrices', args, symbol, callback)
+
+    def subscribe_candles(
+            self,
+            symbol: str,
+            *,
+            callback: Optional[Callback] = None
+    ) -> Subscription:
+        """
+        Subscribes to the M1 candles of the symbol,
+        yields records.StreamingCandle
+        See http://developers.xstore.pro/documentation/#streamgetCandles
+        """
+        return self._subscribe('candle', {'symbol': symbol}, symbol, callback)
+
+    def subscribe_trades(
+            self,
+            *,
+            callback: Optional[Callback] = None
+    ) -> Subscription:
+        """
+        Subscribes to the changes of the user trades,
+        yields records.StreamingTrade
+        See http://developers.xstore.pro/documentation/#streamgetTrades
+        """
+        return self._subscribe('trade', {}, None, callback)
+
+    def subscribe_trade_status(
+            self,
+            *,
+            callback: Optional[Callback] = None
+    ) -> Subscription:
+        """
+        Subscribes to the transaction statuses,
+        yields records.StreamingTradeStatus
+        See http://developers.xstore.pro/documentation/#streamgetTradeStatus
+        """
+        return self._subscribe('tradeStatus', {}, None, callback)
+
+    def subscribe_balance(
+            self,
+            *,
+            callback: Optional[Callback] = None
+    ) -> Subscription:
+        """
+        Subscribes to the account indicators, yields records.StreamingBalance
+        See http://developers.xstore.pro/documentation/#streamgetBalance
+        """
+        return self._subscribe('balance', {}, None, callback)
+
+    def subscribe_news(
+            self,
+            *,
+            callback: Optional[Callback] = None
+    ) -> Subscription:
+        """
+        Subscribes to the news, yields records.StreamingNews
+        See http://developers.xstore.pro/documentation/#streamgetNews
+        """
+        return self._subscribe('news', {}, None, callback)
+
+    def subscribe_keep_alive(
+            self,
+            *,
+            callback: Optional[Callback] = None
+    ) -> Subscription:
+        """
+        Subscribes to the keep alive messages, yields records.KeepAlive
+        See http://developers.xstore.pro/documentation/#streamgetKeepAlive
+        """
+        return self._subscribe('keepAlive', {}, None, callback)
+
+    def ping(self) -> None:
+        """
+        Keeps the streaming session alive
+        See http://developers.xstore.pro/documentation/#streamping
+        """
+        self._send('ping', {})
+
+    def _wrap_socket(self, s: socket.socket) -> socket.socket:
+        return wrap_tls(
+            s, self._ssl_context, self._connect_cache, self._host, self._port
+        )
+
+    def _store_session(self) -> None:
+        store_tls_session(
+            self._socket, self._ssl_context, self._connect_cache,
+            self._host, self._port
+        )
+
+    def _subscribe(
+            self,
+            stream: str,
+            args: Dict[str, Any],
+            symbol: Optional[str],
+            callback: Optional[Callback]
+    ) -> Subscription:
+        if self._socket is None:
+            raise XtbSocketError(
+                'Tried to use the API without calling connect() first'
+            )
+        start_command, _, record_type = self.STREAMS[stream]
+        subscription = Subscription(
+            self, stream, record_type, symbol=symbol, callback=callback
+        )
+        with self._subscriptions_lock:
+            self._subscriptions.setdefault(stream, []).append(subscription)
+        self._send(start_command, args)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        stream = subscription.command
+        with self._subscriptions_lock:
+            remaining = self._subscriptions.get(stream, [])
+            if subscription in remaining:
+                remaining.remove(subscription)
+            still_used = any(
+                s.symbol == subscription.symbol for s in remaining
+            )
+        if still_used or self._socket is None:
+            return
+        args = {}
+        if subscription.symbol is not None:
+            args['symbol'] = subscription.symbol
+        self._send(self.STREAMS[stream][1], args)
+
+    def _send(self, command: str, args: Dict[str, Any]) -> None:
+        data = {'command': command, 'streamSessionId': self._stream_session_id}
+        data.update(args)
+        packet = self._codec.encode(data)
+        with self._send_lock:
+            self._rate_limiter.acquire()
+            sock = self._socket
+            if sock is None:
+                raise XtbSocketError(
+                    'Tried to use the API without calling connect() first'
+                )
+            sock.sendall(packet)
+
+    def _read_loop(self) -> None:
+        sock = self._socket
+        error = None
+        try:
+            while not self._stopped.is_set():
+                frame = self._frame_reader.read_frame(sock)
+                self._dispatch(self._codec.decode(frame))
+        except Exception as ex:  # noqa
+            if not self._stopped.is_set():
+                error = ex
+        self._finish_all(error)
+
+    def _dispatch(self, message: Dict[str, Any]) -> None:
+        BaseConnector._raise_if_wrong_status(message)
+        stream = message.get('command')
+        data = message.get('data')
+        if data is None:
+            return
+        with self._subscriptions_lock:
+            subscriptions = list(self._subscriptions.get(stream, ()))
+        record = None
+        for subscription in subscriptions:
+            if not subscription._matches(data):
+                continue
+            # A bad update or a failing callback must not stop the reader
+            try:
+                if record is None:
+                    record = subscription.record_type.from_dict(data)
+                subscription._publish(record)
+            except Exception as ex:  # noqa
+                with self._subscriptions_lock:
+                    self.dispatch_errors += 1
+                    self.last_dispatch_error = ex
+                if record is None:
+                    return
+
+    def _ping_loop(self) -> None:
+        while not self._stopped.wait(self.PING_INTERVAL):
+            try:
+                self.ping()
+            except (OSError, XtbSocketError):
+                return
+
+    def _finish_all(self, error: Optional[BaseException] = None) -> None:
+        with self._subscriptions_lock:
+            subscriptions = [
+                s for group in self._subscriptions.values() for s in group
+            ]
+            self._subscriptions.clear()
+        for subscription in subscriptions:
+            subscription._finish(error)
@@ -0,0 +1,410 @@
+from __future__ import annotations
+
+import bisect
+import json
+import mmap
+import os
+import queue
+import struct
+import threading
+import zlib
+from typing import (
+    Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+)
+
+from xtb import records
+from xtb.columnar import np, require_numpy
+
+FILE_MAGIC = b'XTBTICK\x01'
+
+# compression, tick count, symbol table size, payload size,
+# first timestamp, last timestamp (epoch ms)
+CHUNK_HEADER = struct.Struct('<BxxxIIIqq')
+
+TICK_ROW = struct.Struct('<qHiddddqddd')
+TICK_FIELDS = (
+    'timestamp', 'symbol', 'level', 'ask', 'bid', 'high', 'low',
+    'ask_volume', 'bid_volume', 'spread_raw', 'spread_table'
+)
+
+NO_COMPRESSION = 0
+ZLIB_COMPRESSION = 1
+COMPRESSIONS = {None: NO_COMPRESSION, 'zlib': ZLIB_COMPRESSION}
+
+TickLike = Union[records.Tick, Dict[str, Any]]
+
+
+def _tick_values(tick: TickLike) -> tuple:
+    """
+    Returns symbol, timestamp and the numeric fields of a Tick record
+    or of a raw tick dictionary (DecodeMode.RAW)
+    """
+    if isinstance(tick, dict):
+        return (
+            tick['symbol'], records.timestamp_ms(tick['timestamp']),
+            tick['level'], tick['ask'], tick['bid'], tick['high'],
+            tick['low'], tick['askVolume'], tick['bidVolume'],
+            tick['spreadRaw'], tick['spreadTable']
+        )
+    return (
+        tick.symbol, records.timestamp_ms(tick.timestamp), tick.level,
+        tick.ask, tick.bid, tick.high, tick.low, tick.ask_volume,
+        tick.bid_volume, tick.spread_raw, tick.spread_table
+    )
+
+
+def encode_chunk(ticks: List[TickLike], compression: Optional[str]) -> bytes:
+    """
+    Encodes the ticks as a chunk: header, JSON symbol table and
+    fixed-width rows, the rows optionally compressed
+    """
+    symbols: Dict[str, int] = {}
+    rows = []
+    first = last = None
+    for values in map(_tick_values, ticks):
+        symbol, timestamp = values[0], values[1]
+        index = symbols.setdefault(symbol, len(symbols))
+        rows.append(TICK_ROW.pack(timestamp, index, *values[2:]))
+        first = timestamp if first is None else min(first, timestamp)
+        last = timestamp if last is None else max(last, timestamp)
+    payload = b''.join(rows)
+    method = COMPRESSIONS[compression]
+    if method == ZLIB_COMPRESSION:
+        payload = zlib.compress(payload)
+    table = json.dumps(list(symbols), separators=(',', ':')).encode()
+    header = CHUNK_HEADER.pack(
+        method, len(rows), len(table), len(payload), first or 0, last or 0
+    )
+    return header + table + payload
+
+
+def _complete_size(file: Any) -> int:
+    """
+    Returns the size of the magic and the completely written chunks of
+    an open tick file
+    """
+    size = os.fstat(file.fileno()).st_size
+    offset = len(FILE_MAGIC)
+    while offset + CHUNK_HEADER.size <= size:
+        file.seek(offset)
+        _, _, table_size, payload_size, _, _ = CHUNK_HEADER.unpack(
+            file.read(CHUNK_HEADER.size)
+        )
+        end = offset + CHUNK_HEADER.size + table_size + payload_size
+        if end > size:
+            break
+        offset = end
+    return offset
+
+
+class TickRecorder:
+    """
+    Writes ticks to a chunked binary file on a background thread.
+    record() only puts the tick on a queue, so it can be used directly
+    as a streaming callback:
+        client.subscribe_tick_prices('EURUSD', callback=recorder.record)
+    A chunk is written once chunk_ticks ticks are collected or after
+    flush_interval seconds. Existing files are appended to, after
+    cutting off a chunk left incomplete by a crash.
+    """
+    CHUNK_TICKS = 4096
+
+    _STOP = object()
+
+    def __init__(
+            self,
+            path: str,
+            *,
+            chunk_ticks: int = CHUNK_TICKS,
+            compression: Optional[str] = None,
+            flush_interval: float = 1.0
+    ) -> None:
+        """
+        compression is None or 'zlib'
+        Raises:
+            ValueError if the file exists and is not a tick file
+        """
+        if compression not in COMPRESSIONS:
+            raise ValueError(f'Unknown compression: {compression}')
+        self._path = path
+        self._chunk_ticks = chunk_ticks
+        self._compression = compression
+        self._flush_interval = flush_interval
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._error: Optional[BaseException] = None
+        self._recorded = 0
+        self._written = 0
+        self._chunks = 0
+        self._file = open(path, 'a+b')
+        self._file.seek(0)
+        magic = self._file.read(len(FILE_MAGIC))
+        if not FILE_MAGIC.startswith(magic):
+            self._file.close()
+            raise ValueError(f'{path} is not a tick file')
+        if magic == FILE_MAGIC:
+            # Writes always go to the end of the file
+            self._file.truncate(_complete_size(self._file))
+        else:
+            self._file.truncate(0)
+            self._file.write(FILE_MAGIC)
+            self._file.flush()
+        self._thread = threading.Thread(
+            target=self._run, name='xtb-tick-recorder', daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self) -> TickRecorder:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    @property
+    def recorded(self) -> int:
+        return self._recorded
+
+    @property
+    def written(self) -> int:
+        return self._written
+
+    @property
+    def chunks(self) -> int:
+        return self._chunks
+
+    def record(self, tick: TickLike) -> None:
+        self._raise_if_failed()
+        self._recorded += 1
+        self._queue.put(tick)
+
+    def record_many(self, ticks: Iterable[TickLike]) -> None:
+        for tick in ticks:
+            self.record(tick)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """
+        Blocks until every tick recorded so far is written to the file
+        """
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+        self._raise_if_failed()
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        self._file.close()
+        self._raise_if_failed()
+
+    def _run(self) -> None:
+        pending: List[TickLike] = []
+        while True:
+            try:
+                item = self._queue.get(timeout=self._flush_interval)
+            except queue.Empty:
+                self._write(pending)
+                continue
+            if item is self._STOP:
+                self._write(pending)
+                return
+            if isinstance(item, threading.Event):
+                self._write(pending)
+                item.set()
+                continue
+            pending.append(item)
+            if len(pending) >= self._chunk_ticks:
+                self._write(pending)
+
+    def _write(self, pending: List[TickLike]) -> None:
+        if not pending or self._error is not None:
+            pending.clear()
+            return
+        try:
+            self._file.write(encode_chunk(pending, self._compression))
+            self._file.flush()
+        except Exception as e:
+            self._error = e
+        else:
+            self._written += len(pending)
+            self._chunks += 1
+        pending.clear()
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+
+class TickChunk(NamedTuple):
+    """
+    Index entry of a chunk
+    """
+    offset: int
+    count: int
+    compression: int
+    symbols: List[str]
+    payload_offset: int
+    payload_size: int
+    first: int
+    last: int
+
+
+class TickReader:
+    """
+    Reads a file written by TickRecorder through a memory map.
+    The chunk headers form the time index: seeking to a timestamp skips
+    every chunk that ends before it without touching its rows.
+    A chunk cut short by a crash is ignored, and cut off by the next
+    TickRecorder of the file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._map: Any = b''
+        if size:
+            self._map = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        if size and self._map[:len(FILE_MAGIC)] != FILE_MAGIC:
+            self.close()
+            raise ValueError(f'{path} is not a tick file')
+        self.chunks = self._read_index(size)
+        # Chunks hold ticks in arrival order, so their time ranges may
+        # overlap a little; bisect on the running maximum instead.
+        self._last_max: List[int] = []
+        for chunk in self.chunks:
+            self._last_max.append(
+                max(chunk.last, self._last_max[-1])
+                if self._last_max else chunk.last
+            )
+
+    def __enter__(self) -> TickReader:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return sum(chunk.count for chunk in self.chunks)
+
+    def close(self) -> None:
+        if isinstance(self._map, mmap.mmap):
+            try:
+                self._map.close()
+            except BufferError:
+                # Blocks still reference the rows, the map is released
+                # together with them
+                pass
+        self._file.close()
+
+    def ticks(
+            self,
+            start: Optional[int] = None,
+            end: Optional[int] = None,
+            symbols: Optional[Iterable[str]] = None,
+            mode: records.DecodeMode = records.DecodeMode.VALIDATE
+    ) -> Iterator[Any]:
+        """
+        Yields the ticks between start and end (epoch ms, inclusive) in
+        file order as records.Tick, or as dictionaries in RAW mode
+        """
+        wanted = set(symbols) if symbols is not None else None
+        for chunk in self._chunks_between(start, end):
+            for row in TICK_ROW.iter_unpack(self._payload(chunk)):
+                timestamp, index = row[0], row[1]
+                symbol = chunk.symbols[index]
+                if (start is not None and timestamp < start) or \
+                        (end is not None and timestamp > end) or \
+                        (wanted is not None and symbol not in wanted):
+                    continue
+                tick = {
+                    'symbol': symbol, 'timestamp': timestamp,
+                    'level': row[2], 'ask': row[3], 'bid': row[4],
+                    'high': row[5], 'low': row[6], 'askVolume': row[7],
+                    'bidVolume': row[8], 'spreadRaw': row[9],
+                    'spreadTable': row[10]
+                }
+                yield records.Tick.from_dict(tick, mode)
+
+    def blocks(
+            self,
+            start: Optional[int] = None,
+            end: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yields one dictionary of NumPy columns per chunk, keyed by the
+        Tick field names. Rows of uncompressed chunks are not copied.
+        """
+        require_numpy()
+        dtype = _dtype()
+        for chunk in self._chunks_between(start, end):
+            rows = np.frombuffer(
+                self._payload(chunk), dtype=dtype, count=chunk.count
+            )
+            if start is not None or end is not None:
+                timestamps = rows['timestamp']
+                selected = np.ones(chunk.count, dtype=bool)
+                if start is not None:
+                    selected &= timestamps >= start
+                if end is not None:
+                    selected &= timestamps <= end
+                if not selected.all():
+                    rows = rows[selected]
+            if not len(rows):
+                continue
+            block = {name: rows[name] for name in TICK_FIELDS}
+            block['symbol'] = np.array(chunk.symbols)[rows['symbol']]
+            yield block
+
+    def _chunks_between(
+            self,
+            start: Optional[int],
+            end: Optional[int]
+    ) -> Iterator[TickChunk]:
+        first = 0 if start is None else bisect.bisect_left(
+            self._last_max, start
+        )
+        for chunk in self.chunks[first:]:
+            if start is not None and chunk.last < start:
+                continue
+            if end is not None and chunk.first > end:
+                continue
+            yield chunk
+
+    def _payload(self, chunk: TickChunk) -> Any:
+        view = memoryview(self._map)[
+            chunk.payload_offset:chunk.payload_offset + chunk.payload_size
+        ]
+        if chunk.compression == ZLIB_COMPRESSION:
+            return zlib.decompress(view)
+        return view
+
+    def _read_index(self, size: int) -> List[TickChunk]:
+        chunks = []
+        offset = len(FILE_MAGIC)
+        while offset + CHUNK_HEADER.size <= size:
+            compression, count, table_size, payload_size, first, last = \
+                CHUNK_HEADER.unpack_from(self._map, offset)
+            table_offset = offset + CHUNK_HEADER.size
+            payload_offset = table_offset + table_size
+            if payload_offset + payload_size > size:
+                break
+            symbols = json.loads(
+                bytes(self._map[table_offset:payload_offset])
+            )
+            chunks.append(TickChunk(
+                offset=offset, count=count, compression=compression,
+                symbols=symbols, payload_offset=payload_offset,
+                payload_size=payload_size, first=first, last=last
+            ))
+            offset = payload_offset + payload_size
+        return chunks
+
+
+def _dtype():
+    return np.dtype([
+        ('timestamp', '<i8'), ('symbol', '<u2'), ('level', '<i4'),
+        ('ask', '<f8'), ('bid', '<f8'), ('high', '<f8'), ('low', '<f8'),
+        ('ask_volume', '<i8'), ('bid_volume', '<f8'),
+        ('spread_raw', '<f8'), ('spread_table', '<f8')
+    ])
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from xtb import XtbApi, records
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS trades (
+    "order" INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    symbol TEXT,
+    open_time INTEGER,
+    close_time INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trades_position ON trades (position);
+CREATE INDEX IF NOT EXISTS trades_close_time ON trades (close_time);
+CREATE INDEX IF NOT EXISTS trades_symbol
+    ON trades (symbol, close_time);
+CREATE TABLE IF NOT EXISTS sync_state (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+'''
+
+UPSERT = '''
+INSERT INTO trades ("order", position, symbol, open_time, close_time, data)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT ("order") DO UPDATE SET
+    position = excluded.position,
+    symbol = excluded.symbol,
+    open_time = excluded.open_time,
+    close_time = excluded.close_time,
+    data = excluded.data
+'''
+
+
+class SyncResult(NamedTuple):
+    """
+    Result of one TradeStore.sync(), start and end are the fetched
+    window in epoch milliseconds
+    """
+    start: int
+    end: int
+    fetched: int
+    inserted: int
+    updated: int
+    seconds: float
+
+
+class TradeStore:
+    """
+    Local copy of the closed trades in a SQLite database.
+    sync() downloads only the trades closed since the last sync, going
+    back `overlap` milliseconds to pick up late updates, and upserts them
+    by order number. The history is then answered from the database.
+    The trades are kept as received from the server and decoded with
+    decode_mode when read.
+    """
+    OVERLAP = 15 * 60_000
+
+    def __init__(
+            self,
+            path: str,
+            *,
+            overlap: int = OVERLAP,
+            decode_mode: records.DecodeMode = records.DecodeMode.VALIDATE
+    ) -> None:
+        """
+        path is the database file, ':memory:' for a temporary store.
+        overlap is in milliseconds.
+        """
+        self._overlap = overlap
+        self._decode_mode = decode_mode
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.executescript(SCHEMA)
+
+    def __enter__(self) -> TradeStore:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self._db.execute('SELECT COUNT(*) FROM trades').fetchone()
+        return row[0]
+
+    @property
+    def watermark(self) -> Optional[int]:
+        """
+        End of the last synced window in epoch milliseconds
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM sync_state WHERE name = 'watermark'"
+            ).fetchone()
+        return row[0] if row else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def sync(
+            self,
+            api: XtbApi,
+            *,
+            since: Optional[int] = None,
+            end: Optional[int] = None
+    ) -> SyncResult:
+        """
+        Fetches the trades closed between the watermark minus the overlap
+        and end (defaults to now) and stores them.
+        since sets the start of the first sync or overrides the watermark.
+        Raises:
+            ValueError: if the store was never synced and since is None
+        """
+        started = time.perf_counter()
+        if end is None:
+            end = int(time.time() * 1000)
+        if since is None:
+            watermark = self.watermark
+            if watermark is None:
+                raise ValueError('since is required for the first sync')
+            since = max(watermark - self._overlap, 0)
+        trades = api.get_trades_history(start=since, end=end, lazy=True)
+        # Lazy lists keep the raw dictionaries, RAW mode returns them
+        raw = trades.raw if isinstance(trades, records.LazyRecordList) \
+            else trades
+        inserted, updated = self.upsert(raw)
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT INTO sync_state (name, value) '
+                "VALUES ('watermark', ?) "
+                'ON CONFLICT (name) DO UPDATE SET '
+                'value = MAX(value, excluded.value)',
+                (end,)
+            )
+        return SyncResult(
+            start=since,
+            end=end,
+            fetched=len(raw),
+            inserted=inserted,
+            updated=updated,
+            seconds=time.perf_counter() - started
+        )
+
+    def upsert(
+            self,
+            trades: Sequence[Dict[str, Any]]
+    ) -> Tuple[int, int]:
+        """
+        Stores the raw trade dictionaries, replacing the stored trades
+        with the same order.
+        Returns the number of inserted and changed trades.
+        """
+        rows = [
+            (
+                trade['order'], trade['position'], trade.get('symbol'),
+                trade.get('open_time'), trade.get('close_time'),
+                json.dumps(trade, sort_keys=True, separators=(',', ':'))
+            )
+            for trade in trades
+        ]
+        with self._lock, self._db:
+            stored = self._stored_data([row[0] for row in rows])
+            changed = [row for row in rows if stored.get(row[0]) != row[5]]
+            self._db.executemany(UPSERT, changed)
+        inserted = sum(1 for row in changed if row[0] not in stored)
+        return inserted, len(changed) - inserted
+
+    def get(self, order: int) -> Optional[records.Trade]:
+        """
+        Returns the stored trade with the order number
+        """
+        found = self._select('WHERE "order" = ?', (order,))
+        return found[0] if found else None
+
+    def history(
+            self,
+            *,
+            start: Optional[int] = None,
+            end: Optional[int] = None,
+            symbol: Optional[str] = None,
+            position: Optional[int] = None,
+            lazy: bool = False
+    ) -> Sequence[records.Trade]:
+        """
+        Returns the stored trades closed between start and end (epoch
+        milliseconds, inclusive) ordered by close time, like
+        XtbApi.get_trades_history
+        """
+        conditions: List[str] = []
+        params: List[Any] = []
+        for condition, value in (
+                ('close_time >= ?', start), ('close_time <= ?', end),
+                ('symbol = ?', symbol), ('position = ?', position)
+        ):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        where = f'WHERE {" AND ".join(conditions)} ' if conditions else ''
+        return self._select(
+            where + 'ORDER BY close_time, "order"', tuple(params), lazy
+        )
+
+    def _stored_data(self, orders: List[int]) -> Dict[int, str]:
+        stored: Dict[int, str] = {}
+        # Stays below the SQLite limit of bound parameters
+        for i in range(0, len(orders), 500):
+            chunk = orders[i:i + 500]
+            stored.update(self._db.execute(
+                'SELECT "order", data FROM trades WHERE "order" IN '
+                f'({",".join("?" * len(chunk))})',
+                chunk
+            ))
+        return stored
+
+    def _select(
+            self,
+            clause: str,
+            params: tuple,
+            lazy: bool = False
+    ) -> Sequence[records.Trade]:
+        with self._lock:
+            rows = self._db.execute(
+                f'SELECT data FROM trades {clause}', params
+            ).fetchall()
+        return records.Trade.create_collection_from(
+            [json.loads(row[0]) for row in rows], lazy=lazy, key='order',
+            mode=self._decode_mode
+        )